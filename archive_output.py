@@ -0,0 +1,260 @@
+#!/usr/bin/env python3
+"""
+Archive Output
+Streaming file writers and the batch output layouts used for large rosters,
+instead of three loose files per customer in one flat output/ directory:
+
+  sharded - output/batch_<ts>/ab/cd/<customer>/..., two levels of hash-prefix
+            directories so no directory grows past a few hundred entries
+  zip     - one deflate-compressed zip per chunk of customers
+  tar     - one uncompressed tar per chunk of customers
+
+Each chunk is written by the worker process that rendered it, so bundles are
+built in parallel. Every file is recorded in the batch's index.sqlite
+(customer, kind, bundle, byte offset, size, digest), so one customer's files
+are read with a single seek without listing directories or opening whole
+archives.
+
+Usage: python3 archive_output.py output/batch_<ts> CUSTOMER_ID [--kind html_checklist] [--extract DIR]
+"""
+
+import argparse
+import gzip
+import hashlib
+import sqlite3
+import struct
+import sys
+import tarfile
+import tempfile
+import time
+import zipfile
+import zlib
+from pathlib import Path
+
+# Rendered chunks are encoded into a buffer of this size before each write to disk
+STREAM_BUFFER = 64 * 1024
+COMPRESSION_SUFFIXES = {None: "", 'gzip': ".gz"}
+
+LAYOUTS = ('flat', 'sharded', 'zip', 'tar')
+INDEX_NAME = "index.sqlite"
+
+# Tar members must be sized before they are added; smaller files are spooled in memory
+SPOOL_LIMIT = 1024 * 1024
+
+# Fixed part of a zip local file header; name and extra field lengths are its last two fields
+ZIP_LOCAL_HEADER = 30
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS artifacts (
+    customer_id TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    location TEXT NOT NULL,
+    member TEXT,
+    method TEXT NOT NULL,
+    offset INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    length INTEGER NOT NULL,
+    compression TEXT,
+    sha256 TEXT NOT NULL,
+    PRIMARY KEY (customer_id, kind)
+);
+"""
+
+INDEX_COLUMNS = ('customer_id', 'kind', 'location', 'member', 'method', 'offset', 'size', 'length',
+                 'compression', 'sha256')
+
+def write_chunks(raw, chunks, compression=None):
+    """Write rendered chunks into an open binary file through a fixed-size buffer
+
+    Memory stays at one buffer however long the document is. Returns the content digest
+    of the uncompressed text (the same value content_digest() gives for the joined string)
+    and its length in bytes.
+    """
+    digest = hashlib.sha256()
+    out = gzip.GzipFile(fileobj=raw, mode='wb') if compression == 'gzip' else raw
+    buf = bytearray()
+    length = 0
+    for chunk in chunks:
+        data = chunk.encode('utf-8')
+        digest.update(data)
+        length += len(data)
+        buf += data
+        if len(buf) >= STREAM_BUFFER:
+            out.write(buf)
+            buf.clear()
+    if buf:
+        out.write(buf)
+    if out is not raw:
+        out.close()
+    return digest.hexdigest()[:16], length
+
+def write_stream(path, chunks, compression=None):
+    """Write rendered chunks to a file, optionally gzip-compressed; returns the content digest"""
+    with open(path, 'wb') as raw:
+        return write_chunks(raw, chunks, compression)[0]
+
+def shard_dir(root, customer_id, slug):
+    """root/ab/cd/<slug>, with ab/cd taken from a hash of the customer id"""
+    prefix = hashlib.sha1(str(customer_id).encode('utf-8')).hexdigest()
+    return Path(root) / prefix[:2] / prefix[2:4] / slug
+
+class ShardedWriter:
+    """Writes each customer's files into a hash-sharded directory tree"""
+
+    def __init__(self, batch_dir, part, compression=None):
+        self.batch_dir = Path(batch_dir)
+        self.compression = compression
+
+    def add(self, customer_id, slug, kind, filename, chunks):
+        directory = shard_dir(self.batch_dir, customer_id, slug)
+        directory.mkdir(parents=True, exist_ok=True)
+        path = directory / filename
+        with open(path, 'wb') as raw:
+            digest, length = write_chunks(raw, chunks, self.compression)
+            size = raw.tell()
+        return _row(customer_id, kind, path.relative_to(self.batch_dir).as_posix(), None, 'file', 0, size,
+                    length, self.compression, digest)
+
+    def close(self):
+        pass
+
+class ZipBundle:
+    """One zip per chunk of customers; members are deflated while they are streamed in"""
+
+    def __init__(self, batch_dir, part, compression=None):
+        self.location = f"part-{part:05d}.zip"
+        self.zip = zipfile.ZipFile(Path(batch_dir) / self.location, 'w', compression=zipfile.ZIP_DEFLATED)
+
+    def add(self, customer_id, slug, kind, filename, chunks):
+        member = f"{slug}/{filename}"
+        info = zipfile.ZipInfo(member, date_time=time.localtime()[:6])
+        info.compress_type = zipfile.ZIP_DEFLATED
+        with self.zip.open(info, 'w') as out:
+            digest, length = write_chunks(out, chunks)
+        return _row(customer_id, kind, self.location, member, 'zip', info.header_offset, info.compress_size,
+                    length, None, digest)
+
+    def close(self):
+        self.zip.close()
+
+class TarBundle:
+    """One uncompressed tar per chunk of customers, so members can be read by offset"""
+
+    def __init__(self, batch_dir, part, compression=None):
+        self.location = f"part-{part:05d}.tar"
+        self.tar = tarfile.open(Path(batch_dir) / self.location, 'w', format=tarfile.PAX_FORMAT)
+        self.compression = compression
+
+    def add(self, customer_id, slug, kind, filename, chunks):
+        member = f"{slug}/{filename}"
+        with tempfile.SpooledTemporaryFile(max_size=SPOOL_LIMIT) as spool:
+            digest, length = write_chunks(spool, chunks, self.compression)
+            info = tarfile.TarInfo(member)
+            info.size = spool.tell()
+            info.mtime = int(time.time())
+            spool.seek(0)
+            self.tar.addfile(info, spool)
+        # addfile leaves the tar offset just past the member's data, padded to a whole block
+        blocks = -(-info.size // tarfile.BLOCKSIZE) * tarfile.BLOCKSIZE
+        return _row(customer_id, kind, self.location, member, 'tar', self.tar.offset - blocks, info.size,
+                    length, self.compression, digest)
+
+    def close(self):
+        self.tar.close()
+
+BUNDLES = {
+    'sharded': ShardedWriter,
+    'zip': ZipBundle,
+    'tar': TarBundle,
+}
+
+def open_bundle(layout, batch_dir, part, compression=None):
+    """Writer for one chunk of customers in the given layout"""
+    return BUNDLES[layout](batch_dir, part, compression)
+
+def _row(customer_id, kind, location, member, method, offset, size, length, compression, digest):
+    return dict(zip(INDEX_COLUMNS, (str(customer_id), kind, location, member, method, offset, size, length,
+                                    compression, digest)))
+
+class ArchiveIndex:
+    """index.sqlite of a batch directory: where every customer's files are stored"""
+
+    def __init__(self, batch_dir):
+        self.path = Path(batch_dir) / INDEX_NAME
+        self.conn = sqlite3.connect(str(self.path))
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript(SCHEMA)
+
+    def add(self, rows):
+        with self.conn:
+            self.conn.executemany(
+                f"INSERT OR REPLACE INTO artifacts ({', '.join(INDEX_COLUMNS)}) "
+                f"VALUES ({', '.join('?' * len(INDEX_COLUMNS))})",
+                [tuple(row[column] for column in INDEX_COLUMNS) for row in rows])
+
+    def lookup(self, customer_id, kind=None):
+        query = f"SELECT {', '.join(INDEX_COLUMNS)} FROM artifacts WHERE customer_id = ?"
+        params = [str(customer_id)]
+        if kind:
+            query += " AND kind = ?"
+            params.append(kind)
+        return [dict(zip(INDEX_COLUMNS, row)) for row in self.conn.execute(query, params)]
+
+    def count(self):
+        return self.conn.execute("SELECT COUNT(DISTINCT customer_id) FROM artifacts").fetchone()[0]
+
+    def close(self):
+        self.conn.close()
+
+def read_artifact(batch_dir, row):
+    """Contents of one indexed file, read with a single seek into its bundle"""
+    with open(Path(batch_dir) / row['location'], 'rb') as f:
+        if row['method'] == 'zip':
+            f.seek(row['offset'])
+            header = f.read(ZIP_LOCAL_HEADER)
+            name_length, extra_length = struct.unpack('<HH', header[26:30])
+            f.seek(row['offset'] + ZIP_LOCAL_HEADER + name_length + extra_length)
+            data = zlib.decompress(f.read(row['size']), -zlib.MAX_WBITS)
+        else:
+            f.seek(row['offset'])
+            data = f.read(row['size'])
+    if row['compression'] == 'gzip':
+        data = gzip.decompress(data)
+    return data
+
+def main():
+    parser = argparse.ArgumentParser(description="Read one customer's files from a batch output directory")
+    parser.add_argument('batch_dir', help="output/batch_<timestamp> directory")
+    parser.add_argument('customer_id')
+    parser.add_argument('--kind', help="Print only this file (email_template, html_checklist, text_checklist)")
+    parser.add_argument('--extract', metavar='DIR', help="Write the customer's files into DIR")
+    args = parser.parse_args()
+
+    if not (Path(args.batch_dir) / INDEX_NAME).exists():
+        print(f"Error: No {INDEX_NAME} in {args.batch_dir}")
+        sys.exit(1)
+    index = ArchiveIndex(args.batch_dir)
+    rows = index.lookup(args.customer_id, args.kind)
+    index.close()
+    if not rows:
+        print(f"Error: No files for customer {args.customer_id}")
+        sys.exit(1)
+
+    if args.kind and not args.extract:
+        sys.stdout.write(read_artifact(args.batch_dir, rows[0]).decode('utf-8'))
+        return
+    for row in rows:
+        where = f"{row['location']}:{row['member']}" if row['member'] else row['location']
+        print(f"  {row['kind']:<16} {row['length']:>9} bytes  {where} @ {row['offset']}")
+        if args.extract:
+            name = Path(row['member'] or row['location']).name
+            if row['compression'] == 'gzip' and name.endswith(".gz"):
+                name = name[:-3]
+            target = Path(args.extract) / name
+            target.parent.mkdir(parents=True, exist_ok=True)
+            target.write_bytes(read_artifact(args.batch_dir, row))
+    if args.extract:
+        print(f"\n✓ Extracted {len(rows)} file(s) to {args.extract}")
+
+if __name__ == "__main__":
+    main()
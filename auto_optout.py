@@ -4,41 +4,88 @@ Automated Data Broker Opt-Out Tool
 Uses Selenium to automate the opt-out process for data brokers
 """
 
+import argparse
+import itertools
 import json
-import time
 import sys
+import time
 from pathlib import Path
 from datetime import datetime
 from selenium import webdriver
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.chrome.options import Options
-from selenium.common.exceptions import TimeoutException, NoSuchElementException
+from selenium.common.exceptions import TimeoutException
+
+from broker_registry import load_registry
+from cdp_backend import DEFAULT_TABS, run_async_pool
+from circuit_breaker import DEFAULT_COOLDOWN, DEFAULT_MAX_TRIPS, DEFAULT_RETRIES, DEFAULT_THRESHOLD, CircuitBreakers
+from form_fill import discover_fields, fill_fields, match_fields, page_blockers
+from optout_pool import run_pool
+from page_waits import DEFAULT_STRATEGY, DEFAULT_TIMEOUT, WAIT_STRATEGIES, navigate, time_saved
+from recipes import get_plans
+from resource_blocking import PROFILES, apply_profile, default_profile, page_weight, resolve_profile
+from results_journal import ResultsJournal, customer_key
+from review_queue import ReviewQueue
+from scheduler import DEFAULT_BROKER_RATE, JobScheduler, broker_rates, parse_broker_rate
+from screenshot_writer import SCREENSHOT_FORMATS, ScreenshotWriter
+from status_store import StatusStore
+from timing import SpanRecorder, format_breakdown, stage_breakdown, write_trace
 
 class AutoOptOutTool:
-    def __init__(self, headless=False):
+    def __init__(self, headless=False, interactive=True, wait_strategy=DEFAULT_STRATEGY, page_timeout=DEFAULT_TIMEOUT,
+                 driver_pool=None, screenshot_format='png', screenshot_max_width=None,
+                 journal=None, status_store=None, review_queue=None, resource_profile=None,
+                 trace_file=None, trace_format='chrome', broker_rate=None, breakers=None):
         self.script_dir = Path(__file__).parent
         self.data_file = self.script_dir / "data_brokers.json"
         self.log_dir = self.script_dir / "logs"
         self.log_dir.mkdir(exist_ok=True)
         self.brokers = self.load_brokers()
         self.driver = None
+        # Optional DriverPool shared across customers to keep browsers warm
+        self.driver_pool = driver_pool
+        self.screenshot_format = screenshot_format
+        self.screenshot_max_width = screenshot_max_width
+        self.screenshots = None
+        # Optional ResultsJournal: every result is appended as soon as a broker finishes
+        self.journal = journal
+        # Optional StatusStore: results are also written to the removal status database
+        self.status_store = status_store
+        self.page_screenshots = []
+        # Optional ReviewQueue: human-only steps are deferred here in unattended runs
+        self.review_queue = review_queue
+        self.run_started = None
         self.headless = headless
+        # Worker-pool runs have nobody at the keyboard, so manual steps are reported instead
+        self.interactive = interactive
+        self.wait_strategy = wait_strategy
+        self.page_timeout = page_timeout
+        self.page_timing = None
+        # Blocks images, fonts and trackers (by default only without a person watching);
+        # brokers may override with "resource_blocking"
+        self.resource_profile = resource_profile or default_profile(interactive)
+        # Per-stage spans of the broker in progress; saved with each result
+        self.timer = SpanRecorder()
+        # Optional Chrome trace / OTLP file written alongside the results
+        self.trace_file = trace_file
+        self.trace_format = trace_format
+        # Jobs per second per broker domain (None: no limit); see scheduler.py
+        self.broker_rate = broker_rate
+        # Optional CircuitBreakers shared by the run: retries failed brokers and parks ones that keep failing
+        self.breakers = breakers
         self.results = []
+        # Brokers with dedicated handlers, keyed by name for O(1) dispatch
+        self.special_handlers = {
+            "WhitePages": self.process_whitepages,
+        }
+        # Brokers with a "recipe" in data_brokers.json, compiled once per broker list
+        self.recipes = get_plans(self.brokers)
         
     def load_brokers(self):
         """Load data broker information"""
-        try:
-            with open(self.data_file, 'r') as f:
-                return json.load(f)
-        except FileNotFoundError:
-            print(f"Error: {self.data_file} not found")
-            sys.exit(1)
+        return load_registry(self.data_file)
     
-    def init_driver(self):
-        """Initialize Chrome/Chromium driver"""
-        print("Initializing browser...")
+    def create_driver(self):
+        """Start a new Chrome/Chromium process (raises on failure)"""
         options = Options()
         if self.headless:
             options.add_argument('--headless')
@@ -47,11 +94,22 @@ class AutoOptOutTool:
         options.add_argument('--disable-blink-features=AutomationControlled')
         options.add_experimental_option("excludeSwitches", ["enable-automation"])
         options.add_experimental_option('useAutomationExtension', False)
+        # Return from driver.get at DOMContentLoaded; open_page decides when the page is ready
+        options.page_load_strategy = 'eager'
         
+        driver = webdriver.Chrome(options=options)
+        driver.execute_script("Object.defineProperty(navigator, 'webdriver', {get: () => undefined})")
+        return driver
+    
+    def init_driver(self):
+        """Initialize Chrome/Chromium driver, reusing a warm browser when pooled"""
         try:
-            self.driver = webdriver.Chrome(options=options)
-            self.driver.execute_script("Object.defineProperty(navigator, 'webdriver', {get: () => undefined})")
-            print("✓ Browser initialized\n")
+            if self.driver_pool:
+                self.driver = self.driver_pool.acquire()
+            else:
+                print("Initializing browser...")
+                self.driver = self.create_driver()
+                print("✓ Browser initialized\n")
         except Exception as e:
             print(f"Error initializing browser: {e}")
             print("\nPlease install ChromeDriver:")
@@ -60,79 +118,96 @@ class AutoOptOutTool:
             sys.exit(1)
     
     def close_driver(self):
-        """Close the browser"""
-        if self.driver:
+        """Close the browser, or hand it back to the pool for the next customer"""
+        if self.driver_pool:
+            self.driver_pool.release(self.driver)
+        elif self.driver:
             self.driver.quit()
+        self.driver = None
     
     def take_screenshot(self, broker_name, stage=""):
-        """Take a screenshot for logging"""
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        filename = f"{broker_name.replace(' ', '_')}_{stage}_{timestamp}.png"
-        filepath = self.log_dir / filename
+        """Take a screenshot for logging (written to disk in the background)"""
+        if self.screenshots is None:
+            self.screenshots = ScreenshotWriter(self.log_dir, self.screenshot_format, self.screenshot_max_width)
+        filepath = self.screenshots.path_for(broker_name, stage)
         try:
-            self.driver.save_screenshot(str(filepath))
+            with self.timer.span('screenshot'):
+                png = self.driver.get_screenshot_as_png()
+            if not self.screenshots.submit(png, filepath):
+                print(f"  Warning: Screenshot queue is full, dropped the {broker_name} {stage} screenshot")
+                return None
+            self.page_screenshots.append(str(filepath))
             return str(filepath)
         except Exception as e:
             print(f"  Warning: Could not save screenshot: {e}")
             return None
     
+    def flush_screenshots(self):
+        """Wait for queued screenshots to reach disk and stop the writer"""
+        if self.screenshots is not None:
+            self.screenshots.close()
+            print(self.screenshots.summary())
+            self.screenshots = None
+    
+    def open_page(self, url, broker=None):
+        """Navigate to a URL and wait until it is ready instead of sleeping"""
+        profile = resolve_profile(broker, self.resource_profile)
+        with self.timer.span('block_resources'):
+            apply_profile(self.driver, profile)
+        start = time.perf_counter()
+        self.page_timing = navigate(self.driver, url, broker, self.wait_strategy, self.page_timeout)
+        get_time = self.page_timing['load_time'] - self.page_timing['ready_wait']
+        self.timer.add('driver.get', start, get_time)
+        self.timer.add('wait', start + get_time, self.page_timing['ready_wait'])
+        self.page_timing['resource_profile'] = profile
+        self.page_timing['bytes_transferred'], self.page_timing['requests'] = page_weight(self.driver)
+        if self.page_timing['timed_out']:
+            print(f"  ℹ Page not ready after {self.page_timeout}s, continuing anyway")
+    
     def wait_for_user(self, message):
-        """Pause and wait for user to complete manual steps"""
+        """Pause and wait for user to complete manual steps
+        
+        Returns False without blocking when running non-interactively.
+        """
+        if not self.interactive:
+            print(f"  ⏸️  Manual step needed: {message}")
+            return False
         print(f"\n⏸️  {message}")
-        input("Press Enter when ready to continue...")
+        with self.timer.span('user_wait'):
+            input("Press Enter when ready to continue...")
+        return True
     
-    def process_spokeo(self, user_info):
-        """Automated opt-out for Spokeo"""
-        print("Processing Spokeo...")
-        try:
-            self.driver.get("https://www.spokeo.com/optout")
-            time.sleep(3)
-            self.take_screenshot("Spokeo", "landing")
-            
-            # User needs to search for themselves first
-            self.wait_for_user("Please search for yourself on Spokeo and copy the URL of your profile")
-            profile_url = input("Paste your Spokeo profile URL here: ").strip()
-            
-            if profile_url:
-                # Try to fill opt-out form
-                try:
-                    url_input = WebDriverWait(self.driver, 10).until(
-                        EC.presence_of_element_located((By.NAME, "url"))
-                    )
-                    url_input.send_keys(profile_url)
-                    
-                    email_input = self.driver.find_element(By.NAME, "email")
-                    email_input.send_keys(user_info['email'])
-                    
-                    self.take_screenshot("Spokeo", "form_filled")
-                    
-                    self.wait_for_user("Please complete any CAPTCHA and click submit")
-                    self.take_screenshot("Spokeo", "submitted")
-                    
-                    return {"status": "success", "message": "Opt-out submitted"}
-                except Exception as e:
-                    return {"status": "manual", "message": f"Requires manual completion: {e}"}
-            else:
-                return {"status": "skipped", "message": "No profile URL provided"}
-                
-        except Exception as e:
-            self.take_screenshot("Spokeo", "error")
-            return {"status": "error", "message": str(e)}
+    def defer(self, broker, user_info, reason):
+        """Hand a step that needs a person to the review queue instead of blocking"""
+        with self.timer.span('defer'):
+            blockers = page_blockers(self.driver)
+            if blockers:
+                reason = f"{reason} ({', '.join(blockers)})"
+            if self.review_queue is None:
+                return {"status": "manual", "message": f"Requires manual completion: {reason}"}
+            try:
+                page_url = self.driver.current_url
+            except Exception:
+                page_url = None
+            screenshot = self.page_screenshots[-1] if self.page_screenshots else None
+            self.review_queue.defer(broker, user_info, reason, page_url, screenshot)
+            return {"status": "manual", "message": f"Deferred for review: {reason}"}
     
     def process_whitepages(self, user_info):
         """Automated opt-out for WhitePages"""
         print("Processing WhitePages...")
         try:
-            self.driver.get("https://www.whitepages.com/suppression_requests")
-            time.sleep(3)
+            self.open_page("https://www.whitepages.com/suppression_requests", self.brokers.get("WhitePages"))
             self.take_screenshot("WhitePages", "landing")
             
-            self.wait_for_user("Please search for yourself on WhitePages and note your listing")
+            if not self.wait_for_user("Please search for yourself on WhitePages and note your listing"):
+                return self.defer(self.brokers.get("WhitePages"), user_info, "listing search")
             
             # Try to automate form
             try:
                 # Form fields vary, so this is semi-automated
-                self.wait_for_user("Please fill out the opt-out form and submit")
+                if not self.wait_for_user("Please fill out the opt-out form and submit"):
+                    return self.defer(self.brokers.get("WhitePages"), user_info, "opt-out form")
                 self.take_screenshot("WhitePages", "submitted")
                 return {"status": "success", "message": "Opt-out submitted"}
             except Exception as e:
@@ -146,41 +221,30 @@ class AutoOptOutTool:
         """Generic processor for brokers that need manual interaction"""
         print(f"Processing {broker['name']}...")
         try:
-            self.driver.get(broker['opt_out_url'])
-            time.sleep(3)
+            self.open_page(broker['opt_out_url'], broker)
             self.take_screenshot(broker['name'], "landing")
             
-            # Try to auto-fill common form fields
+            # Try to auto-fill common form fields (one scripted discovery, one scripted fill)
             try:
-                # Look for common field names
-                common_name_fields = ['name', 'full_name', 'fullname', 'fname', 'first_name']
-                common_email_fields = ['email', 'email_address', 'e-mail']
-                
-                for field_name in common_name_fields:
-                    try:
-                        field = self.driver.find_element(By.NAME, field_name)
-                        field.send_keys(user_info['name'])
-                        print(f"  ✓ Filled name field")
-                        break
-                    except NoSuchElementException:
-                        continue
-                
-                for field_name in common_email_fields:
-                    try:
-                        field = self.driver.find_element(By.NAME, field_name)
-                        field.send_keys(user_info['email'])
-                        print(f"  ✓ Filled email field")
-                        break
-                    except NoSuchElementException:
-                        continue
+                with self.timer.span('discover_fields'):
+                    matches = match_fields(discover_fields(self.driver), user_info)
+                with self.timer.span('fill'):
+                    fill_fields(self.driver, matches)
+                filled = [label for label, _, _ in matches]
+                for label in filled:
+                    print(f"  ✓ Filled {label} field")
                 
-                self.take_screenshot(broker['name'], "form_filled")
+                if filled:
+                    self.take_screenshot(broker['name'], "form_filled")
+                else:
+                    print(f"  ℹ Could not auto-fill any fields (may require search first)")
                 
             except Exception as e:
-                print(f"  Could not auto-fill: {e}")
+                print(f"  ℹ Auto-fill error: {e}")
             
             # Ask user to complete
-            self.wait_for_user(f"Please complete the opt-out process for {broker['name']}")
+            if not self.wait_for_user(f"Please complete the opt-out process for {broker['name']}"):
+                return self.defer(broker, user_info, "opt-out process")
             self.take_screenshot(broker['name'], "completed")
             
             return {"status": "success", "message": "Opt-out process completed"}
@@ -189,10 +253,46 @@ class AutoOptOutTool:
             self.take_screenshot(broker['name'], "error")
             return {"status": "error", "message": str(e)}
     
+    def process_recipe(self, plan, broker, user_info):
+        """Run a broker's compiled recipe from data_brokers.json"""
+        print(f"Processing {broker['name']} (recipe)...")
+        try:
+            return plan.run(self, broker, user_info)
+        except Exception as e:
+            self.take_screenshot(broker['name'], "error")
+            return {"status": "error", "message": str(e)}
+    
+    def process_broker(self, broker, user_info):
+        """Dispatch a broker to its dedicated handler, its recipe or the generic processor"""
+        self.page_timing = None
+        self.page_screenshots = []
+        self.timer.reset()
+        handler = self.special_handlers.get(broker['name'])
+        plan = self.recipes.get(broker['name'])
+        if handler:
+            result = handler(user_info)
+        elif plan:
+            result = self.process_recipe(plan, broker, user_info)
+        else:
+            result = self.process_generic(broker, user_info)
+        if self.page_timing:
+            result.update(self.page_timing)
+        if self.page_screenshots:
+            result['screenshots'] = self.page_screenshots
+        return self.timer.finish(result)
+    
+    def record_result(self, result):
+        """Keep a result and append it to the journal straight away"""
+        self.results.append(result)
+        if self.journal:
+            self.journal.append(result)
+    
     def run_automated_optout(self, user_info, broker_list=None):
         """Run automated opt-out for all brokers"""
         if broker_list is None:
             broker_list = self.brokers
+        customer = customer_key(user_info)
+        self.run_started = time.monotonic()
         
         print("\n" + "="*80)
         print("AUTOMATED DATA BROKER OPT-OUT")
@@ -205,27 +305,41 @@ class AutoOptOutTool:
         
         self.init_driver()
         
-        for idx, broker in enumerate(broker_list, 1):
-            print(f"\n[{idx}/{len(broker_list)}] {broker['name']}")
+        # Brokers go through the scheduler so one that is cooling down does not hold up the rest
+        scheduler = JobScheduler(self.broker_rate, broker_rates(broker_list), breakers=self.breakers)
+        for broker in broker_list:
+            if self.journal and self.journal.is_done(customer, broker['name']):
+                print(f"  ✓ {broker['name']}: already completed in a previous run (resumed)")
+                self.results.append(self.journal.completed[(customer, broker['name'])])
+                continue
+            scheduler.add(user_info, broker)
+        total = len(scheduler)
+        
+        for idx in itertools.count(1):
+            job = scheduler.get()
+            if job is None:
+                break
+            broker = job.broker
+            attempt = f" (attempt {job.attempts})" if job.attempts > 1 else ""
+            print(f"\n[{idx}/{total}] {broker['name']}{attempt}")
             print("-" * 80)
             
-            # Special handlers for specific brokers
-            if broker['name'] == "Spokeo":
-                result = self.process_spokeo(user_info)
-            elif broker['name'] == "WhitePages":
-                result = self.process_whitepages(user_info)
-            else:
-                result = self.process_generic(broker, user_info)
+            result = self.process_broker(broker, user_info)
+            if scheduler.done(job, result):
+                print(f"  ✗ {result['message']}; retrying after a backoff")
+                continue
+            result['attempts'] = job.attempts
             
             result['broker'] = broker['name']
+            result['customer'] = customer
             result['timestamp'] = datetime.now().isoformat()
-            self.results.append(result)
+            self.record_result(result)
             
             print(f"  Status: {result['status']}")
             print(f"  {result['message']}")
             
-            # Ask if user wants to continue
-            if idx < len(broker_list):
+            # Ask if user wants to continue (never in unattended mode)
+            if self.interactive and len(scheduler):
                 response = input(f"\nContinue to next broker? (y/n/q to quit): ").strip().lower()
                 if response == 'q':
                     print("\nStopping automation...")
@@ -235,6 +349,9 @@ class AutoOptOutTool:
                     continue
         
         self.close_driver()
+        self.flush_screenshots()
+        if self.journal:
+            self.journal.close()
         self.save_results()
         self.print_summary()
     
@@ -247,10 +364,19 @@ class AutoOptOutTool:
             json.dump({
                 'timestamp': timestamp,
                 'total_processed': len(self.results),
-                'results': self.results
+                'results': self.results,
+                'breakers': self.breakers.export() if self.breakers else {}
             }, f, indent=2)
         
         print(f"\n✓ Results saved to: {results_file}")
+        
+        if self.trace_file:
+            write_trace(self.results, self.trace_file, self.trace_format)
+            print(f"✓ Trace written to: {self.trace_file}")
+        
+        if self.status_store:
+            self.status_store.record_results(self.results)
+            print(f"✓ Status database updated: {self.status_store.db_path}")
     
     def print_summary(self):
         """Print summary of results"""
@@ -269,6 +395,27 @@ class AutoOptOutTool:
         print(f"✗ Errors: {errors}")
         print(f"○ Skipped: {skipped}")
         
+        if self.run_started:
+            elapsed = time.monotonic() - self.run_started
+            if elapsed > 0:
+                print(f"Throughput: {len(self.results) / elapsed * 3600:.0f} brokers/hour ({elapsed:.0f}s)")
+        
+        timed = [r for r in self.results if 'load_time' in r]
+        if timed:
+            load_total = sum(r['load_time'] for r in timed)
+            print(f"\nPage loads: {load_total:.1f}s total, {load_total / len(timed):.2f}s average")
+            print(f"Time saved vs fixed 3s waits: {time_saved(timed):.1f}s")
+        
+        totals = stage_breakdown(self.results)
+        if totals:
+            print(f"Time breakdown: {format_breakdown(totals)}")
+        
+        weighed = [r for r in self.results if r.get('bytes_transferred') is not None]
+        if weighed:
+            total_bytes = sum(r['bytes_transferred'] for r in weighed)
+            print(f"Data transferred: {total_bytes / 1024 / 1024:.1f} MB "
+                  f"({total_bytes / len(weighed) / 1024:.0f} KB per page)")
+        
         if manual > 0:
             print("\nBrokers requiring manual follow-up:")
             for r in self.results:
@@ -281,11 +428,101 @@ class AutoOptOutTool:
                 if r['status'] == 'error':
                     print(f"  - {r['broker']}: {r['message']}")
         
+        if self.breakers:
+            print("\n" + self.breakers.summary())
+        
         print("\n" + "="*80)
         print(f"\nScreenshots saved in: {self.log_dir}")
         print("="*80 + "\n")
 
 def main():
+    parser = argparse.ArgumentParser(description="Automated Data Broker Opt-Out Tool")
+    parser.add_argument('--roster', metavar='FILE',
+                        help="Run every customer in a CSV or JSONL roster through a pool of headless browsers")
+    parser.add_argument('--workers', type=int, default=4,
+                        help="Number of concurrent headless browsers for --roster (default: 4)")
+    parser.add_argument('--backend', choices=('selenium', 'cdp'), default='selenium',
+                        help="Automation backend for --roster; cdp drives many tabs from one async loop (needs websockets)")
+    parser.add_argument('--tabs', type=int, default=DEFAULT_TABS,
+                        help=f"Concurrent tabs for --backend cdp (default: {DEFAULT_TABS})")
+    parser.add_argument('--wait', choices=WAIT_STRATEGIES, default=DEFAULT_STRATEGY,
+                        help=f"How to decide a page is ready (default: {DEFAULT_STRATEGY})")
+    parser.add_argument('--page-timeout', type=float, default=DEFAULT_TIMEOUT,
+                        help=f"Maximum seconds to wait for a page (default: {DEFAULT_TIMEOUT})")
+    parser.add_argument('--block-resources', choices=list(PROFILES),
+                        help="Skip images, fonts and ad/analytics hosts while loading pages "
+                             "(default: none when interactive, full with --unattended or --roster)")
+    parser.add_argument('--screenshot-format', choices=SCREENSHOT_FORMATS, default='png',
+                        help="Screenshot encoding; webp/jpeg need Pillow (default: png)")
+    parser.add_argument('--screenshot-max-width', type=int, default=None,
+                        help="Downscale screenshots wider than this many pixels (needs Pillow)")
+    parser.add_argument('--broker-rate', default=DEFAULT_BROKER_RATE,
+                        help=f"Jobs per broker domain, e.g. 6/min, or 'none' (default: {DEFAULT_BROKER_RATE})")
+    parser.add_argument('--retries', type=int, default=DEFAULT_RETRIES,
+                        help=f"Retry a broker that errors this many times, with backoff (default: {DEFAULT_RETRIES})")
+    parser.add_argument('--breaker-threshold', type=int, default=DEFAULT_THRESHOLD,
+                        help=f"Park a broker's jobs after this many errors in a row, 0 to never (default: {DEFAULT_THRESHOLD})")
+    parser.add_argument('--breaker-cooldown', type=float, default=DEFAULT_COOLDOWN,
+                        help=f"Seconds a tripped broker is parked before a probe job (default: {DEFAULT_COOLDOWN:.0f})")
+    parser.add_argument('--breaker-max-trips', type=int, default=DEFAULT_MAX_TRIPS,
+                        help=f"Give up on a broker for the run after this many trips in a row (default: {DEFAULT_MAX_TRIPS})")
+    parser.add_argument('--trace', metavar='FILE',
+                        help="Also write per-stage timings as a Chrome trace (chrome://tracing) or OTLP/JSON file")
+    parser.add_argument('--trace-format', choices=('chrome', 'otlp'), default='chrome')
+    parser.add_argument('--unattended', action='store_true',
+                        help="Never prompt during automation; steps that need a person go to the review queue")
+    parser.add_argument('--resume', action='store_true',
+                        help="Skip (customer, broker) pairs already completed in the previous run's journal")
+    parser.add_argument('--discover', action='store_true',
+                        help="Before a --roster run, search brokers for each customer's profile URL (see discovery.py)")
+    parser.add_argument('--relisted', metavar='FILE',
+                        help="With --roster, run only the pairs in a monitor.py jobs file (logs/relisted_jobs.jsonl)")
+    args = parser.parse_args()
+    try:
+        broker_rate = parse_broker_rate(args.broker_rate)
+    except ValueError as e:
+        parser.error(str(e))
+    log_dir = Path(__file__).parent / "logs"
+    tool_options = {
+        'wait_strategy': args.wait,
+        'page_timeout': args.page_timeout,
+        'screenshot_format': args.screenshot_format,
+        'screenshot_max_width': args.screenshot_max_width,
+        'status_store': StatusStore(),
+        'review_queue': ReviewQueue(log_dir),
+        'resource_profile': args.block_resources,
+        'trace_file': args.trace,
+        'trace_format': args.trace_format,
+        'broker_rate': broker_rate,
+        'breakers': CircuitBreakers(args.retries, args.breaker_threshold, args.breaker_cooldown,
+                                    max_trips=args.breaker_max_trips),
+    }
+    
+    if args.backend == 'cdp' and not args.roster:
+        parser.error("--backend cdp is only available with --roster")
+    if (args.discover or args.relisted) and not args.roster:
+        parser.error("--discover and --relisted are only available with --roster")
+    
+    if args.roster:
+        from remove_data import load_roster
+        customers = load_roster(args.roster)
+        if args.relisted:
+            from monitor import relisted_customers
+            customers = relisted_customers(customers, args.relisted, tool_options['status_store'])
+        if args.discover:
+            from discovery import discover_roster
+            customers = discover_roster(customers, load_registry(Path(__file__).parent / "data_brokers.json"))
+    
+    if args.roster and args.backend == 'cdp':
+        run_async_pool(AutoOptOutTool, customers, tabs=args.tabs,
+                       tool_options=tool_options, journal=ResultsJournal(log_dir, resume=args.resume))
+        return
+    
+    if args.roster:
+        run_pool(AutoOptOutTool, customers, workers=args.workers,
+                 tool_options=tool_options, journal=ResultsJournal(log_dir, resume=args.resume))
+        return
+    
     print("="*80)
     print("AUTOMATED DATA BROKER OPT-OUT TOOL")
     print("="*80)
@@ -318,20 +555,24 @@ def main():
         'phone': phone
     }
     
-    # Ask if headless
-    headless_choice = input("\nRun in headless mode (browser hidden)? (y/n): ").strip().lower()
-    headless = headless_choice == 'y'
-    
-    # Confirm
-    print("\nReady to start automated opt-out process.")
-    confirm = input("Continue? (y/n): ").strip().lower()
-    
-    if confirm != 'y':
-        print("Cancelled.")
-        return
+    if args.unattended:
+        headless = True
+    else:
+        # Ask if headless
+        headless_choice = input("\nRun in headless mode (browser hidden)? (y/n): ").strip().lower()
+        headless = headless_choice == 'y'
+        
+        # Confirm
+        print("\nReady to start automated opt-out process.")
+        confirm = input("Continue? (y/n): ").strip().lower()
+        
+        if confirm != 'y':
+            print("Cancelled.")
+            return
     
     # Run automation
-    tool = AutoOptOutTool(headless=headless)
+    journal = ResultsJournal(log_dir, resume=args.resume)
+    tool = AutoOptOutTool(headless=headless, interactive=not args.unattended, journal=journal, **tool_options)
     tool.run_automated_optout(user_info)
 
 if __name__ == "__main__":
@@ -0,0 +1,215 @@
+#!/usr/bin/env python3
+"""
+End-to-End Automation Benchmark
+Drives AutoOptOutTool (through the worker pool) against the local fake broker
+server and reports pages per second, p50/p95 per-broker latency and the number
+of WebDriver calls per broker. Save a baseline once and check later runs
+against it to catch performance regressions:
+
+  python3 benchmark.py --save-baseline logs/benchmark_baseline.json
+  python3 benchmark.py --check logs/benchmark_baseline.json     # exits 1 on a regression
+
+Modes:
+  recipe   - every fake broker has a recipe, so forms are filled and submitted
+  generic  - stand-ins for the web-form brokers in data_brokers.json without
+             recipes, exercising process_generic's field discovery
+
+Needs Chrome/Chromium and ChromeDriver.
+"""
+
+import argparse
+import json
+import math
+import platform
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from pathlib import Path
+
+from broker_registry import BrokerRecord, BrokerRegistry, load_registry
+from fake_broker_server import FakeBrokerServer
+from optout_pool import OptOutWorkerPool
+from resource_blocking import DEFAULT_PROFILE, PROFILES
+
+if platform.system() == "Windows":
+    from auto_optout_windows import AutoOptOutTool
+else:
+    from auto_optout import AutoOptOutTool
+
+CUSTOMER = {
+    'customer_id': 'bench',
+    'name': 'Jane Example',
+    'email': 'jane@example.com',
+    'address': '123 Main St',
+    'city': 'Springfield',
+    'state': 'IL',
+    'zip_code': '62701',
+    'phone': '555-0100',
+}
+
+DEFAULT_TOLERANCE = 0.15
+
+class CallCounter:
+    """Counts WebDriver commands (every Selenium call goes through driver.execute)"""
+
+    def __init__(self):
+        self.calls = Counter()
+        self.lock = threading.Lock()
+
+    def wrap(self, driver):
+        execute = driver.execute
+
+        def counted(command, params=None):
+            with self.lock:
+                self.calls[command] += 1
+            return execute(command, params)
+        driver.execute = counted
+        return driver
+
+    @property
+    def total(self):
+        return sum(self.calls.values())
+
+def make_tool_class(registry, log_dir, counter=None):
+    """AutoOptOutTool that uses the given brokers, keeps screenshots out of logs/ and counts WebDriver calls"""
+    class BenchmarkTool(AutoOptOutTool):
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, **kwargs)
+            self.log_dir = log_dir
+
+        def load_brokers(self):
+            return registry
+
+        def create_driver(self):
+            driver = super().create_driver()
+            return counter.wrap(driver) if counter else driver
+    return BenchmarkTool
+
+def percentile(values, pct):
+    """Nearest-rank percentile of a list of numbers"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = min(len(ordered), max(1, math.ceil(pct / 100 * len(ordered)))) - 1
+    return ordered[rank]
+
+def run_benchmark(server, brokers, workers, resource_profile):
+    """Process every broker once for the benchmark customer; returns the metrics dict"""
+    registry = BrokerRegistry((BrokerRecord(b) for b in brokers), version=f"benchmark-{len(brokers)}")
+    log_dir = Path(tempfile.mkdtemp(prefix="optout_bench_"))
+    counter = CallCounter()
+    pool = OptOutWorkerPool(make_tool_class(registry, log_dir, counter), workers=workers, headless=True,
+                            tool_options={'resource_profile': resource_profile})
+    pool.add_jobs([CUSTOMER], registry)
+    # Browser start-up is not what we are measuring
+    try:
+        drivers = [pool.driver_pool.acquire() for _ in range(pool.workers)]
+    except Exception as e:
+        print(f"Error starting the browser: {e}")
+        sys.exit(1)
+    for driver in drivers:
+        pool.driver_pool.release(driver)
+    counter.calls.clear()
+
+    start = time.perf_counter()
+    results = pool.run()
+    elapsed = time.perf_counter() - start
+    shutil.rmtree(log_dir, ignore_errors=True)
+
+    job_times = [r['job_time'] for r in results if 'job_time' in r]
+    statuses = Counter(r['status'] for r in results)
+    pages = counter.calls['get'] - len(results) + statuses['success']
+    return {
+        'jobs': len(results),
+        'elapsed': round(elapsed, 3),
+        'pages': pages,
+        'pages_per_sec': round(pages / elapsed, 3) if elapsed else 0.0,
+        'p50': round(percentile(job_times, 50), 4),
+        'p95': round(percentile(job_times, 95), 4),
+        'webdriver_calls': counter.total,
+        'webdriver_calls_per_job': round(counter.total / len(results), 2) if results else 0.0,
+        'top_calls': dict(counter.calls.most_common(6)),
+        'statuses': dict(statuses),
+        'server': server.stats,
+    }
+
+def print_report(metrics):
+    print(f"\nBrokers processed:     {metrics['jobs']} in {metrics['elapsed']:.1f}s")
+    print(f"Pages/sec:             {metrics['pages_per_sec']:.2f} ({metrics['pages']} page loads)")
+    print(f"Per-broker latency:    p50 {metrics['p50'] * 1000:.0f} ms, p95 {metrics['p95'] * 1000:.0f} ms")
+    print(f"WebDriver calls:       {metrics['webdriver_calls']} ({metrics['webdriver_calls_per_job']:.1f} per broker)")
+    print("  " + ", ".join(f"{name} {count}" for name, count in metrics['top_calls'].items()))
+    print("Results:               " + ", ".join(f"{status} {count}" for status, count in metrics['statuses'].items()))
+    print("Server:                " + ", ".join(f"{mode} {count}" for mode, count in metrics['server'].items()))
+
+def check_regressions(metrics, baseline, tolerance):
+    """Messages for every metric that got worse than the baseline by more than the tolerance"""
+    problems = []
+    if metrics['pages_per_sec'] < baseline['pages_per_sec'] * (1 - tolerance):
+        problems.append(f"pages/sec {metrics['pages_per_sec']:.2f} < baseline {baseline['pages_per_sec']:.2f}")
+    for key in ('p50', 'p95', 'webdriver_calls_per_job'):
+        if metrics[key] > baseline[key] * (1 + tolerance):
+            problems.append(f"{key} {metrics[key]} > baseline {baseline[key]}")
+    return problems
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark AutoOptOutTool against a local fake broker server")
+    parser.add_argument('--mode', choices=('recipe', 'generic'), default='recipe')
+    parser.add_argument('--brokers', type=int, default=50, help="Fake brokers in recipe mode")
+    parser.add_argument('--workers', type=int, default=2, help="Headless browsers")
+    parser.add_argument('--latency', type=float, default=0.05, help="Seconds added to every response")
+    parser.add_argument('--jitter', type=float, default=0.0, help="Up to this many extra random seconds")
+    parser.add_argument('--slow-script-ms', type=int, default=0, help="Main-thread block on every form page")
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--hang-rate', type=float, default=0.0)
+    parser.add_argument('--captcha-rate', type=float, default=0.0)
+    parser.add_argument('--no-form-rate', type=float, default=0.0)
+    parser.add_argument('--block-resources', choices=list(PROFILES), default=DEFAULT_PROFILE)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--save-baseline', metavar='FILE', help="Write the metrics as a baseline")
+    parser.add_argument('--check', metavar='FILE', help="Compare against a baseline; exit 1 on regression")
+    parser.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE,
+                        help=f"Allowed slowdown before --check fails (default: {DEFAULT_TOLERANCE:.0%})")
+    args = parser.parse_args()
+
+    server = FakeBrokerServer(latency=args.latency, jitter=args.jitter, slow_script_ms=args.slow_script_ms,
+                              error_rate=args.error_rate, hang_rate=args.hang_rate, captcha_rate=args.captcha_rate,
+                              no_form_rate=args.no_form_rate, seed=args.seed)
+    with server:
+        if args.mode == 'recipe':
+            brokers = server.brokers(args.brokers)
+        else:
+            brokers = server.mimic(load_registry(Path(__file__).parent / "data_brokers.json"))
+        print("="*80)
+        print(f"AUTOMATION BENCHMARK - {args.mode} mode, {len(brokers)} brokers, {args.workers} browser(s), "
+              f"{args.latency * 1000:.0f} ms latency")
+        print("="*80)
+        metrics = run_benchmark(server, brokers, args.workers, args.block_resources)
+    metrics['config'] = {key: value for key, value in vars(args).items() if key not in ('save_baseline', 'check')}
+    print_report(metrics)
+
+    if args.save_baseline:
+        Path(args.save_baseline).parent.mkdir(parents=True, exist_ok=True)
+        with open(args.save_baseline, 'w') as f:
+            json.dump(metrics, f, indent=2)
+        print(f"\n✓ Baseline saved to {args.save_baseline}")
+
+    if args.check:
+        with open(args.check, 'r') as f:
+            baseline = json.load(f)
+        if baseline.get('config') != metrics['config']:
+            print("\n  Warning: baseline was recorded with different settings")
+        problems = check_regressions(metrics, baseline, args.tolerance)
+        if problems:
+            print("\n✗ Performance regression:")
+            for problem in problems:
+                print(f"  - {problem}")
+            sys.exit(1)
+        print("\n✓ No regression against baseline")
+    print()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Automation Backend Benchmark
+Runs the same recipe-driven opt-outs against a local fake broker server with
+the Selenium worker pool and with the async CDP backend, and reports pages per
+second for each. Needs Chrome/Chromium, ChromeDriver and (for the CDP backend)
+the websockets package.
+
+Usage: python3 benchmark_backends.py [--jobs 100] [--workers 4] [--tabs 16] [--latency 0.05]
+"""
+
+import argparse
+import asyncio
+import shutil
+import tempfile
+import time
+from pathlib import Path
+
+from benchmark import make_tool_class
+from broker_registry import BrokerRecord, BrokerRegistry
+from cdp_backend import CDPBrowser, CDPError, AsyncOptOutTool, process_jobs
+from fake_broker_server import FakeBrokerServer
+from optout_pool import OptOutWorkerPool
+
+CUSTOMER = {'customer_id': 'bench', 'name': 'Jane Example', 'email': 'jane@example.com'}
+
+# Each job loads the form and, after submitting, the confirmation page
+PAGES_PER_JOB = 2
+
+def bench_selenium(registry, log_dir, workers):
+    pool = OptOutWorkerPool(make_tool_class(registry, log_dir), workers=workers, headless=True)
+    pool.add_jobs([CUSTOMER], registry)
+    start = time.perf_counter()
+    results = pool.run()
+    elapsed = time.perf_counter() - start
+    print(pool.driver_pool.summary())
+    return results, elapsed
+
+def bench_cdp(registry, log_dir, tabs):
+    async def run():
+        browser = await CDPBrowser.launch(headless=True)
+        tool = AsyncOptOutTool(browser, registry, log_dir)
+        try:
+            start = time.perf_counter()
+            results = await process_jobs(tool, [(CUSTOMER, broker) for broker in registry], tabs, verbose=False)
+            return results, time.perf_counter() - start
+        finally:
+            tool.screenshots.close()
+            await browser.close()
+    return asyncio.run(run())
+
+def report(name, results, elapsed):
+    succeeded = sum(1 for r in results if r['status'] == 'success')
+    pages = succeeded * PAGES_PER_JOB
+    print(f"{name:<24} {len(results):>6} {succeeded:>9} {elapsed:>9.1f}s {pages / elapsed:>10.1f}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the Selenium and CDP automation backends")
+    parser.add_argument('--jobs', type=int, default=100, help="Opt-outs per backend (one fake broker each)")
+    parser.add_argument('--workers', type=int, default=4, help="Selenium browsers")
+    parser.add_argument('--tabs', type=int, default=16, help="CDP tabs in flight")
+    parser.add_argument('--latency', type=float, default=0.05, help="Seconds added to every fake response")
+    args = parser.parse_args()
+
+    log_dir = Path(tempfile.mkdtemp(prefix="optout_bench_"))
+    with FakeBrokerServer(latency=args.latency) as server:
+        registry = BrokerRegistry((BrokerRecord(b) for b in server.brokers(args.jobs)),
+                                  version=f"benchmark-{args.jobs}")
+        print("="*80)
+        print(f"BACKEND BENCHMARK - {args.jobs} opt-outs, {args.latency * 1000:.0f} ms server latency")
+        print("="*80 + "\n")
+
+        rows = [(f"Selenium ({args.workers} browsers)", bench_selenium(registry, log_dir, args.workers))]
+        try:
+            rows.append((f"CDP async ({args.tabs} tabs)", bench_cdp(registry, log_dir, args.tabs)))
+        except CDPError as e:
+            print(f"Skipping the CDP backend: {e}")
+
+    print(f"\n{'Backend':<24} {'Jobs':>6} {'Submitted':>9} {'Time':>10} {'Pages/s':>10}")
+    print("-"*64)
+    for name, (results, elapsed) in rows:
+        report(name, results, elapsed)
+    print()
+    shutil.rmtree(log_dir, ignore_errors=True)
+
+if __name__ == "__main__":
+    main()
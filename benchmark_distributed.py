@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+"""
+Distributed Run Benchmark
+Runs work_queue.py end to end on one machine: a QueueServer on localhost stands
+in for the queue host and each node is a separate process, exactly as it would
+be on another machine. Nodes use a browser-free stand-in tool that holds a
+worker for --service-time seconds per job, so the numbers show how throughput
+scales with nodes rather than how fast Chrome is.
+
+Each run checks that every task finished exactly once. --crash-after kills the
+first node partway through a job, so its leases have to expire and be claimed
+by the others (single-node runs skip the crash). --fail-rate makes some jobs error so they are retried.
+
+Usage: python3 benchmark_distributed.py [--nodes 1,2,4] [--customers 20] [--workers 2] [--crash-after 5]
+Exits 1 if a task is lost or finished twice.
+"""
+
+import argparse
+import json
+import os
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter
+from pathlib import Path
+
+from broker_registry import BrokerRecord, BrokerRegistry
+from work_queue import TOKEN_ENV, QueueServer, SQLiteWorkQueue, run_node
+
+# Nodes check back this often while the queue is empty but leases are out
+POLL = 0.1
+
+def make_registry(count):
+    """Synthetic brokers; every other one has a recipe so tasks carry real recipe versions"""
+    brokers = []
+    for idx in range(count):
+        broker = {'name': f"Broker {idx}", 'website': f"https://broker{idx}.example",
+                  'opt_out_url': f"https://broker{idx}.example/optout"}
+        if idx % 2 == 0:
+            broker['recipe'] = [{'open': 'opt_out_url'}, {'fill': {'#name': 'name'}}, {'finish': 'Submitted'}]
+        brokers.append(broker)
+    return BrokerRegistry((BrokerRecord(b) for b in brokers), version=f"distributed-{count}")
+
+def make_tool_class(registry, service_time, fail_rate, crash_after, seed):
+    """Stand-in for AutoOptOutTool with the interface OptOutWorkerPool uses, minus the browser"""
+    class StandInTool:
+        jobs = 0
+        rng = random.Random(seed)
+
+        def __init__(self, headless=True, interactive=False, driver_pool=None, **options):
+            self.brokers = registry
+
+        def create_driver(self):
+            return object()
+
+        def init_driver(self):
+            pass
+
+        def close_driver(self):
+            pass
+
+        def flush_screenshots(self):
+            pass
+
+        def process_broker(self, broker, user_info):
+            StandInTool.jobs += 1
+            if crash_after and StandInTool.jobs > crash_after:
+                # Die holding leases, like a host that loses power mid-job
+                os._exit(3)
+            time.sleep(service_time)
+            if StandInTool.rng.random() < fail_rate:
+                return {"status": "error", "message": "Simulated page load timeout"}
+            return {"status": "success", "message": f"Stand-in opt-out for {user_info['name']}"}
+    return StandInTool
+
+def run_cluster(nodes, args, workdir):
+    """One queue, `nodes` node processes; returns the metrics dict"""
+    registry = make_registry(args.brokers)
+    queue = SQLiteWorkQueue(workdir / f"queue_{nodes}.db", args.max_attempts)
+    customers = [{'customer_id': str(idx), 'name': f"Customer {idx}", 'email': f"c{idx}@example.com"}
+                 for idx in range(args.customers)]
+    total = queue.enqueue(customers, registry)
+    with QueueServer(queue, '127.0.0.1', 0) as server:
+        start = time.perf_counter()
+        procs = []
+        for node in range(nodes):
+            command = [sys.executable, __file__, '--node', server.url, '--node-id', f"node-{node}",
+                       '--brokers', str(args.brokers), '--workers', str(args.workers),
+                       '--service-time', str(args.service_time), '--fail-rate', str(args.fail_rate),
+                       '--lease', str(args.lease), '--max-attempts', str(args.max_attempts), '--seed', str(node)]
+            # A lone node has no one to take over its leases, so only multi-node runs crash one
+            if node == 0 and args.crash_after and nodes > 1:
+                command += ['--crash-after', str(args.crash_after)]
+            # Nodes read the server's token from the environment, as real ones do
+            procs.append(subprocess.Popen(command, stdout=subprocess.DEVNULL,
+                                          env=dict(os.environ, **{TOKEN_ENV: server.token})))
+        exit_codes = [proc.wait() for proc in procs]
+        elapsed = time.perf_counter() - start
+        results = queue.results()
+        counts = queue.counts()
+        stats = dict(queue.stats)
+    queue.close()
+
+    pairs = Counter((r['customer'], r['broker']) for r in results)
+    return {
+        'nodes': nodes,
+        'tasks': total,
+        'finished': len(results),
+        'duplicates': sum(count - 1 for count in pairs.values() if count > 1),
+        'unfinished': counts.get('queued', 0) + counts.get('leased', 0),
+        'dead': counts.get('dead', 0),
+        'elapsed': round(elapsed, 2),
+        'tasks_per_hour': round(len(results) / elapsed * 3600) if elapsed else 0,
+        'statuses': dict(Counter(r['status'] for r in results)),
+        'by_node': dict(Counter(r.get('node', 'dead-letter') for r in results)),
+        'queue': stats,
+        'exit_codes': exit_codes,
+    }
+
+def node_main(args):
+    """A node process: the same run_node() a real host runs, with the stand-in tool"""
+    from work_queue import HTTPWorkQueue
+
+    tool_class = make_tool_class(make_registry(args.brokers), args.service_time, args.fail_rate,
+                                 args.crash_after, args.seed)
+    run_node(HTTPWorkQueue(args.node), tool_class, args.workers, lease=args.lease,
+             max_attempts=args.max_attempts, node_id=args.node_id, poll=POLL)
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark work_queue.py with several node processes on one machine")
+    parser.add_argument('--nodes', default="1,2,4", help="Comma-separated node counts to run (default: 1,2,4)")
+    parser.add_argument('--customers', type=int, default=20)
+    parser.add_argument('--brokers', type=int, default=10)
+    parser.add_argument('--workers', type=int, default=2, help="Stand-in browsers per node")
+    parser.add_argument('--service-time', type=float, default=0.2, help="Seconds one job occupies a worker")
+    parser.add_argument('--fail-rate', type=float, default=0.0, help="Share of jobs that error and are retried")
+    parser.add_argument('--crash-after', type=int, default=0, help="Kill the first node after this many jobs (runs with 2+ nodes)")
+    parser.add_argument('--lease', type=float, default=3.0, help="Lease seconds (short, so crashed leases expire)")
+    parser.add_argument('--max-attempts', type=int, default=3)
+    parser.add_argument('--json', metavar='FILE', help="Also write the metrics as JSON")
+    # Used by the node processes this script starts
+    parser.add_argument('--node', help=argparse.SUPPRESS)
+    parser.add_argument('--node-id', help=argparse.SUPPRESS)
+    parser.add_argument('--seed', type=int, default=0, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.node:
+        node_main(args)
+        return
+
+    workdir = Path(tempfile.mkdtemp(prefix="optout_distributed_"))
+    runs = []
+    ok = True
+    try:
+        for nodes in (int(n) for n in args.nodes.split(',')):
+            metrics = run_cluster(nodes, args, workdir)
+            runs.append(metrics)
+            print(f"\n{nodes} node(s) x {args.workers} worker(s): {metrics['finished']}/{metrics['tasks']} task(s) "
+                  f"in {metrics['elapsed']:.1f}s, {metrics['tasks_per_hour']} tasks/hour")
+            print(f"  Statuses: {metrics['statuses']}; by node: {metrics['by_node']}")
+            print(f"  Queue: {metrics['queue']}; node exit codes: {metrics['exit_codes']}")
+            if metrics['duplicates'] or metrics['unfinished'] or metrics['finished'] != metrics['tasks']:
+                print(f"  ✗ {metrics['duplicates']} duplicate(s), {metrics['unfinished']} unfinished task(s)")
+                ok = False
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    if len(runs) > 1 and runs[0]['tasks_per_hour']:
+        print("\nScaling: " + ", ".join(f"{run['nodes']} node(s) {run['tasks_per_hour'] / runs[0]['tasks_per_hour']:.2f}x"
+                                        for run in runs))
+    if args.json:
+        Path(args.json).write_text(json.dumps(runs, indent=2))
+    print("\n✓ Every task finished exactly once" if ok else "\n✗ Tasks were lost or finished twice")
+    sys.exit(0 if ok else 1)
+
+if __name__ == "__main__":
+    main()
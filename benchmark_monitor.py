@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+Re-listing Monitor Benchmark
+Runs monitor.py against the fake brokers with large, close-delimited search
+pages: no Content-Length and no ETag, so every check downloads the whole page
+and only the body hash can tell that nothing changed. The profile links sit
+after --padding bytes of filler, at the end of the page.
+
+Three passes over every enrolled pair:
+  1. first check: every page is new
+  2. nothing changed on the server: every page must hash the same as before
+  3. some people are relisted: exactly those pairs must be reported
+
+Usage: python3 benchmark_monitor.py [--customers 20] [--brokers 5] [--padding 200000] [--relist 3]
+Exits 1 if an unchanged page hashes differently or a relisting is missed.
+"""
+
+import argparse
+import random
+import shutil
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from broker_registry import BrokerRecord, BrokerRegistry
+from discovery import HTTPError
+from fake_broker_server import FakeBrokerServer
+from monitor import RelistingMonitor
+from status_store import FOLLOW_UP_DAYS, StatusStore
+
+# Far enough apart that every pair is due again on the next pass, jitter included
+PASS_DAYS = 40
+
+def make_customers(count):
+    return [{'customer_id': str(idx), 'name': f"Jane Monitor{idx}", 'email': f"jane{idx}@example.com",
+             'city': "Springfield", 'state': "IL"} for idx in range(count)]
+
+def run_pass(monitor, now):
+    """Check every due pair once; returns (outcome counts, seconds, MB downloaded)"""
+    before = dict(monitor.stats)
+    start = time.perf_counter()
+    monitor.run(now=now)
+    elapsed = time.perf_counter() - start
+    counts = {key: monitor.stats[key] - before[key] for key in before}
+    return counts, elapsed, counts.pop('bytes') / 1024 / 1024
+
+def main():
+    parser = argparse.ArgumentParser(description="Check monitor.py against large close-delimited search pages")
+    parser.add_argument('--customers', type=int, default=20)
+    parser.add_argument('--brokers', type=int, default=5)
+    parser.add_argument('--padding', type=int, default=200000, help="Bytes of filler before the search results")
+    parser.add_argument('--relist', type=int, default=3, help="Pairs relisted before the third pass")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    workdir = Path(tempfile.mkdtemp(prefix="optout_monitor_"))
+    store = StatusStore(workdir / "status.db")
+    ok = True
+    try:
+        with FakeBrokerServer(search_padding=args.padding, close_delimited=True) as server:
+            entries = server.brokers(args.brokers, recipes=False)
+            registry = BrokerRegistry((BrokerRecord(b) for b in entries), version="monitor-benchmark")
+            customers = make_customers(args.customers)
+            submitted = datetime(2026, 1, 1)
+            store.record_results([{'customer': c['customer_id'], 'broker': b['name'], 'status': 'success',
+                                   'message': "Submitted", 'timestamp': submitted.isoformat(timespec='seconds')}
+                                  for c in customers for b in entries])
+            for idx in range(1, args.brokers + 1):
+                for customer in customers:
+                    server.remove_listing(idx, customer['name'])
+
+            monitor = RelistingMonitor(store, registry, workdir, concurrency=16, host_rate="1000/s",
+                                       rng=random.Random(args.seed))
+            pairs = monitor.enroll(customers)
+            print(f"{pairs} pair(s), search pages of {args.padding / 1024:.0f} KB sent close-delimited\n")
+
+            now = submitted + timedelta(days=FOLLOW_UP_DAYS + 1)
+            first, elapsed, mb = run_pass(monitor, now)
+            print(f"Pass 1 (first check): {first['changed']} new page(s), {first['errors']} error(s) "
+                  f"in {elapsed:.1f}s, {mb:.1f} MB")
+            if first['errors'] or first['changed'] != pairs:
+                ok = False
+
+            now += timedelta(days=PASS_DAYS)
+            second, elapsed, mb = run_pass(monitor, now)
+            print(f"Pass 2 (no change):   {second['unchanged']} unchanged, {second['changed']} changed, "
+                  f"{second['relisted']} relisted in {elapsed:.1f}s, {mb:.1f} MB")
+            if second['unchanged'] != pairs:
+                print("  ✗ Unchanged pages hashed differently between fetches")
+                ok = False
+
+            rng = random.Random(args.seed)
+            relisted = rng.sample([(idx, c['name']) for idx in range(1, args.brokers + 1) for c in customers],
+                                  min(args.relist, pairs))
+            for idx, name in relisted:
+                server.relist(idx, name)
+            now += timedelta(days=PASS_DAYS)
+            third, elapsed, mb = run_pass(monitor, now)
+            print(f"Pass 3 ({len(relisted)} relisted):  {third['relisted']} relisted, {third['unchanged']} unchanged, "
+                  f"{third['changed']} changed in {elapsed:.1f}s, {mb:.1f} MB")
+            if third['relisted'] != len(relisted) or third['unchanged'] != pairs - len(relisted):
+                print("  ✗ Relisted profiles at the end of the page were missed")
+                ok = False
+    except HTTPError as e:
+        print(f"Error: {e}")
+        ok = False
+    finally:
+        store.close()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    print("\n✓ Unchanged pages matched and every relisting was found" if ok else "\n✗ Monitor check failed")
+    sys.exit(0 if ok else 1)
+
+if __name__ == "__main__":
+    main()
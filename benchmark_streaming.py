@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Streaming Writer Benchmark
+Writes the HTML and text checklists for one customer the old way (render the
+whole document into one string, then write it) and through the streaming
+renderers (chunks encoded into a fixed buffer), and reports peak Python
+allocations, write() system calls (Linux, from /proc/self/io) and time per
+customer as the broker list grows.
+
+Usage: python3 benchmark_streaming.py [--customers 20] [--gzip]
+"""
+
+import argparse
+import gzip
+import shutil
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+from archive_output import write_stream
+from benchmark_templates import CUSTOMER, synthetic_brokers
+from checklist_templates import ChecklistTemplates
+
+BROKER_COUNTS = (25, 500, 5000, 20000)
+
+def write_syscalls():
+    """Write system calls made by this process so far, or None off Linux"""
+    try:
+        with open('/proc/self/io', 'r') as f:
+            for line in f:
+                if line.startswith('syscw:'):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return None
+
+def write_joined(templates, out_dir, compression):
+    opener = gzip.open if compression == 'gzip' else open
+    with opener(out_dir / "checklist.html", 'wt') as f:
+        f.write(templates.render_html(**CUSTOMER))
+    with opener(out_dir / "checklist.txt", 'wt') as f:
+        f.write(templates.render_text(**CUSTOMER))
+
+def write_streamed(templates, out_dir, compression):
+    write_stream(out_dir / "checklist.html", templates.stream_html(**CUSTOMER), compression)
+    write_stream(out_dir / "checklist.txt", templates.stream_text(**CUSTOMER), compression)
+
+def measure(writer, templates, out_dir, customers, compression):
+    """(peak KiB allocated, write syscalls per customer, ms per customer)"""
+    tracemalloc.start()
+    writer(templates, out_dir, compression)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    calls_before = write_syscalls()
+    start = time.perf_counter()
+    for _ in range(customers):
+        writer(templates, out_dir, compression)
+    elapsed = time.perf_counter() - start
+    calls_after = write_syscalls()
+    calls = (calls_after - calls_before) / customers if calls_before is not None else None
+    return peak / 1024, calls, elapsed / customers * 1000
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark streaming checklist writers")
+    parser.add_argument('--customers', type=int, default=20, help="Customers written per measurement")
+    parser.add_argument('--gzip', action='store_true', help="Write gzip-compressed files")
+    args = parser.parse_args()
+    compression = 'gzip' if args.gzip else None
+
+    out_dir = Path(tempfile.mkdtemp(prefix="stream_bench_"))
+    print("="*80)
+    print(f"STREAMING WRITER BENCHMARK (HTML + text checklist{', gzip' if compression else ''})")
+    print("="*80)
+    print(f"\n{'Brokers':>8}  {'Mode':<9} {'Peak alloc':>12} {'write() calls':>14} {'ms/customer':>12}")
+    print("-"*62)
+    try:
+        for count in BROKER_COUNTS:
+            templates = ChecklistTemplates(synthetic_brokers(count))
+            for mode, writer in (('joined', write_joined), ('streamed', write_streamed)):
+                peak, calls, ms = measure(writer, templates, out_dir, args.customers, compression)
+                calls_text = f"{calls:.1f}" if calls is not None else "n/a"
+                print(f"{count:>8}  {mode:<9} {peak:>9.0f} KiB {calls_text:>14} {ms:>12.2f}")
+    finally:
+        shutil.rmtree(out_dir, ignore_errors=True)
+    print("\n" + "="*80 + "\n")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+"""
+Broker Registry
+Parses data_brokers.json once into compact records with O(1) lookup by name,
+method and domain. The parsed records are cached in a marshal sidecar file keyed
+by the JSON file's content hash, so startup stays flat as the list grows. The
+cache holds plain data only, so a planted sidecar cannot run code on load.
+"""
+
+import hashlib
+import json
+import marshal
+import sys
+from pathlib import Path
+from urllib.parse import urlparse
+
+CACHE_SUFFIX = ".cache"
+CACHE_FORMAT = 2
+
+class BrokerRecord:
+    """One data broker. Supports dict-style access so existing code keeps working."""
+    __slots__ = ('name', 'website', 'opt_out_url', 'method', 'email', 'domain', 'opt_out_domain', 'extra')
+
+    FIELDS = ('name', 'website', 'opt_out_url', 'method', 'email')
+
+    def __init__(self, data):
+        self.name = data['name']
+        self.website = data.get('website', '')
+        self.opt_out_url = data.get('opt_out_url', '')
+        self.method = data.get('method', 'web_form')
+        self.email = data.get('email')
+        self.domain = domain_of(self.website or self.opt_out_url)
+        self.opt_out_domain = domain_of(self.opt_out_url)
+        # Optional per-broker settings (waits, recipes, overrides, ...)
+        self.extra = {k: v for k, v in data.items() if k not in self.FIELDS} or None
+
+    def __getitem__(self, key):
+        if key in self.FIELDS:
+            return getattr(self, key)
+        if self.extra and key in self.extra:
+            return self.extra[key]
+        raise KeyError(key)
+
+    def __contains__(self, key):
+        return key in self.FIELDS or bool(self.extra and key in self.extra)
+
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def keys(self):
+        return list(self.FIELDS) + list(self.extra or ())
+
+    def to_dict(self):
+        return {key: self[key] for key in self.keys()}
+
+    def __repr__(self):
+        return f"BrokerRecord({self.name!r})"
+
+    def to_row(self):
+        """Plain tuple of every slot, for the marshal cache"""
+        return tuple(getattr(self, slot) for slot in self.__slots__)
+
+    @classmethod
+    def from_row(cls, row):
+        record = cls.__new__(cls)
+        (record.name, record.website, record.opt_out_url, record.method, record.email,
+         record.domain, record.opt_out_domain, record.extra) = row
+        return record
+
+def domain_of(url):
+    """Registrable host of a URL without the leading www."""
+    host = urlparse(url).hostname or ''
+    return host[4:] if host.startswith('www.') else host
+
+class BrokerRegistry:
+    """Indexed, list-like collection of BrokerRecord objects"""
+
+    def __init__(self, records, version=""):
+        self.records = list(records)
+        self.version = version
+        self.by_name = {}
+        self.by_method = {}
+        self.by_domain = {}
+        for record in self.records:
+            self.by_name[record.name] = record
+            self.by_method.setdefault(record.method, []).append(record)
+            for domain in {record.domain, record.opt_out_domain}:
+                if domain:
+                    self.by_domain.setdefault(domain, []).append(record)
+
+    @classmethod
+    def from_json_bytes(cls, raw):
+        version = hashlib.sha256(raw).hexdigest()[:16]
+        return cls((BrokerRecord(item) for item in json.loads(raw)), version=version)
+
+    @classmethod
+    def load(cls, data_file, use_cache=True):
+        """Load the registry, reusing the sidecar cache when the JSON content is unchanged
+
+        The content is hashed on every load: mtime and size can stay the same
+        across an edit, the hash cannot.
+        """
+        data_file = Path(data_file)
+        cache_file = data_file.with_name(data_file.name + CACHE_SUFFIX)
+        raw = data_file.read_bytes()
+        digest = hashlib.sha256(raw).hexdigest()
+
+        cached = _read_cache(cache_file) if use_cache else None
+        if cached and cached['digest'] == digest:
+            try:
+                return cls((BrokerRecord.from_row(row) for row in cached['records']), version=digest[:16])
+            except (TypeError, ValueError):
+                pass
+
+        registry = cls.from_json_bytes(raw)
+        if use_cache:
+            _write_cache(cache_file, {'format': CACHE_FORMAT, 'digest': digest,
+                                      'records': [record.to_row() for record in registry]})
+        return registry
+
+    def get(self, name):
+        """Look up a broker by exact name"""
+        return self.by_name.get(name)
+
+    def with_method(self, method):
+        return self.by_method.get(method, [])
+
+    def for_domain(self, url_or_domain):
+        """Brokers hosted on a domain (accepts a bare domain or a full URL)"""
+        domain = domain_of(url_or_domain) if '://' in url_or_domain else url_or_domain
+        if domain.startswith('www.'):
+            domain = domain[4:]
+        return self.by_domain.get(domain, [])
+
+    def select(self, names):
+        """Records for the given broker names, in the given order"""
+        return [self.by_name[name] for name in names if name in self.by_name]
+
+    def __iter__(self):
+        return iter(self.records)
+
+    def __len__(self):
+        return len(self.records)
+
+    def __getitem__(self, idx):
+        return self.records[idx]
+
+    def __contains__(self, name):
+        return name in self.by_name
+
+def _read_cache(cache_file):
+    try:
+        # loads() on the whole file: load() on a file object reads it piecemeal and is far slower
+        cached = marshal.loads(cache_file.read_bytes())
+        if isinstance(cached, dict) and cached.get('format') == CACHE_FORMAT:
+            return cached
+    except Exception:
+        pass
+    return None
+
+def _write_cache(cache_file, payload):
+    tmp_file = cache_file.with_name(cache_file.name + ".tmp")
+    try:
+        with open(tmp_file, 'wb') as f:
+            marshal.dump(payload, f)
+        tmp_file.replace(cache_file)
+    except OSError:
+        # A read-only install directory just means no cache
+        pass
+
+def load_registry(data_file):
+    """Load the broker registry or exit with the tools' usual error message"""
+    try:
+        return BrokerRegistry.load(data_file)
+    except FileNotFoundError:
+        print(f"Error: {data_file} not found")
+        sys.exit(1)
@@ -0,0 +1,578 @@
+#!/usr/bin/env python3
+"""
+Async Chrome DevTools Protocol Backend
+An optional alternative to Selenium for unattended roster runs. One asyncio
+event loop talks to one headless Chrome over a single DevTools websocket and
+drives many tabs at once, with no WebDriver HTTP hop per command. Each job gets
+its own browser context (separate cookies and storage) that is thrown away
+afterwards.
+
+Needs the websockets package (pip install websockets) and a local Chrome or
+Chromium. Manual steps are never prompted for; they go to the review queue.
+"""
+
+import asyncio
+import base64
+import itertools
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+
+try:
+    import websockets
+except ImportError:
+    websockets = None
+
+from form_fill import DISCOVER_FIELDS_JS, FILL_FIELDS_JS, FILL_SELECTORS_JS, PAGE_BLOCKERS_JS, SKIPPED_TYPES, match_fields
+from page_waits import DEFAULT_STRATEGY, DEFAULT_TIMEOUT, NETWORK_IDLE_WINDOW, POLL_INTERVAL, resolve_strategy
+from recipes import CLICK_JS, SUCCESS_JS, get_plans
+from resource_blocking import DEFAULT_PROFILE, PAGE_WEIGHT_JS, PROFILES, resolve_profile
+from results_journal import customer_key
+from scheduler import JobScheduler, broker_rates
+from screenshot_writer import ScreenshotWriter
+from timing import SpanRecorder
+
+DEFAULT_TABS = 16
+LAUNCH_TIMEOUT = 20
+
+CHROME_NAMES = ('google-chrome', 'google-chrome-stable', 'chromium', 'chromium-browser', 'chrome')
+WINDOWS_CHROME_PATHS = (
+    r"C:\Program Files\Google\Chrome\Application\chrome.exe",
+    r"C:\Program Files (x86)\Google\Chrome\Application\chrome.exe",
+)
+
+# Readiness checks for the same strategies page_waits offers Selenium
+READY_JS = {
+    'ready_state': "return document.readyState === 'complete';",
+    'form': "return Boolean(document.querySelector('form, input'));",
+    'selector': "return Boolean(document.querySelector(arguments[0]));",
+    'network_idle': "return [document.readyState, performance.getEntriesByType('resource').length];",
+}
+
+class CDPError(RuntimeError):
+    """A DevTools command failed or the page raised an exception"""
+
+class CDPConnectionClosed(CDPError):
+    """The DevTools connection is gone, so no further job can run on this browser"""
+
+def find_chrome():
+    """Path of a local Chrome/Chromium binary, or None"""
+    for name in CHROME_NAMES:
+        path = shutil.which(name)
+        if path:
+            return path
+    for path in WINDOWS_CHROME_PATHS:
+        if os.path.exists(path):
+            return path
+    return None
+
+class CDPBrowser:
+    """One headless Chrome process and its browser-level DevTools connection"""
+
+    def __init__(self, process, connection, profile_dir):
+        self.process = process
+        self.connection = connection
+        self.profile_dir = profile_dir
+        self.ids = itertools.count(1)
+        self.pending = {}
+        self.waiters = {}
+        self.commands = 0
+        self.reader = asyncio.ensure_future(self._read())
+
+    @classmethod
+    async def launch(cls, headless=True):
+        if websockets is None:
+            raise CDPError("the cdp backend needs the websockets package (pip install websockets)")
+        chrome = find_chrome()
+        if chrome is None:
+            raise CDPError("Chrome/Chromium not found")
+        profile_dir = tempfile.mkdtemp(prefix="optout_cdp_")
+        args = [chrome, '--remote-debugging-port=0', f'--user-data-dir={profile_dir}',
+                '--no-first-run', '--no-default-browser-check', '--no-sandbox', '--disable-dev-shm-usage']
+        if headless:
+            args.append('--headless=new')
+        args.append('about:blank')
+        process = await asyncio.create_subprocess_exec(*args, stdout=asyncio.subprocess.DEVNULL,
+                                                       stderr=asyncio.subprocess.DEVNULL)
+
+        # Chrome writes the chosen port and websocket path once DevTools is listening
+        port_file = Path(profile_dir) / "DevToolsActivePort"
+        deadline = time.monotonic() + LAUNCH_TIMEOUT
+        while True:
+            try:
+                port, path = port_file.read_text().split()[:2]
+                break
+            except (OSError, ValueError):
+                if time.monotonic() > deadline or process.returncode is not None:
+                    process.kill()
+                    raise CDPError("Chrome did not start its DevTools endpoint")
+                await asyncio.sleep(POLL_INTERVAL)
+        connection = await websockets.connect(f"ws://127.0.0.1:{port}{path}", max_size=None)
+        return cls(process, connection, profile_dir)
+
+    async def _read(self):
+        try:
+            async for raw in self.connection:
+                message = json.loads(raw)
+                if 'id' in message:
+                    future = self.pending.pop(message['id'], None)
+                    if future is None or future.done():
+                        continue
+                    if 'error' in message:
+                        future.set_exception(CDPError(message['error'].get('message', 'CDP error')))
+                    else:
+                        future.set_result(message.get('result', {}))
+                else:
+                    key = (message.get('sessionId'), message['method'])
+                    for future in self.waiters.pop(key, []):
+                        if not future.done():
+                            future.set_result(message.get('params', {}))
+        finally:
+            # Nothing will answer from here on: fail every command and event still waited for
+            waiting = list(self.pending.values()) + [future for futures in self.waiters.values() for future in futures]
+            self.pending.clear()
+            self.waiters.clear()
+            for future in waiting:
+                if not future.done():
+                    future.set_exception(CDPConnectionClosed("DevTools connection closed"))
+
+    async def send(self, method, params=None, session_id=None):
+        """Send one command and wait for its reply"""
+        message = {'id': next(self.ids), 'method': method, 'params': params or {}}
+        if session_id:
+            message['sessionId'] = session_id
+        if self.reader.done():
+            raise CDPConnectionClosed("DevTools connection closed")
+        future = asyncio.get_running_loop().create_future()
+        self.pending[message['id']] = future
+        self.commands += 1
+        try:
+            await self.connection.send(json.dumps(message))
+        except websockets.exceptions.ConnectionClosed as e:
+            self.pending.pop(message['id'], None)
+            raise CDPConnectionClosed(f"DevTools connection closed: {e}")
+        return await future
+
+    def expect(self, session_id, method):
+        """Future for the next event of this kind; create it before triggering the event
+
+        Pass it to forget() if the event may never come (e.g. after a timeout).
+        """
+        future = asyncio.get_running_loop().create_future()
+        self.waiters.setdefault((session_id, method), []).append(future)
+        return future
+
+    def forget(self, session_id, method, future):
+        """Drop a waiter from expect() that is no longer needed"""
+        futures = self.waiters.get((session_id, method))
+        if futures and future in futures:
+            futures.remove(future)
+            if not futures:
+                del self.waiters[(session_id, method)]
+
+    async def new_page(self):
+        """Open a tab in a fresh browser context"""
+        context = (await self.send('Target.createBrowserContext'))['browserContextId']
+        target = (await self.send('Target.createTarget', {'url': 'about:blank', 'browserContextId': context}))['targetId']
+        session = (await self.send('Target.attachToTarget', {'targetId': target, 'flatten': True}))['sessionId']
+        page = CDPPage(self, context, target, session)
+        await page.send('Page.enable')
+        return page
+
+    async def close(self):
+        try:
+            await asyncio.wait_for(self.send('Browser.close'), 5)
+        except Exception:
+            pass
+        self.reader.cancel()
+        await self.connection.close()
+        try:
+            await asyncio.wait_for(self.process.wait(), 5)
+        except asyncio.TimeoutError:
+            self.process.kill()
+        shutil.rmtree(self.profile_dir, ignore_errors=True)
+
+class CDPPage:
+    """One tab; the async counterpart of the Selenium driver calls the tools make"""
+
+    def __init__(self, browser, context_id, target_id, session_id):
+        self.browser = browser
+        self.context_id = context_id
+        self.target_id = target_id
+        self.session_id = session_id
+
+    def send(self, method, params=None):
+        return self.browser.send(method, params, self.session_id)
+
+    async def execute_script(self, script, *args):
+        """Run a WebDriver-style script body (uses arguments[] and return)"""
+        expression = f"(function() {{\n{script}\n}}).apply(null, {json.dumps(list(args))})"
+        reply = await self.send('Runtime.evaluate', {'expression': expression, 'returnByValue': True,
+                                                     'awaitPromise': True})
+        if 'exceptionDetails' in reply:
+            details = reply['exceptionDetails']
+            raise CDPError(details.get('exception', {}).get('description') or details.get('text', 'script error'))
+        return reply['result'].get('value')
+
+    async def wait_until(self, script, *args, timeout=DEFAULT_TIMEOUT):
+        """Poll a script until it returns something truthy; returns False on timeout"""
+        deadline = time.monotonic() + timeout
+        while True:
+            try:
+                if await self.execute_script(script, *args):
+                    return True
+            except CDPConnectionClosed:
+                raise
+            except CDPError:
+                # The page navigated away mid-evaluation
+                pass
+            if time.monotonic() > deadline:
+                return False
+            await asyncio.sleep(POLL_INTERVAL)
+
+    async def navigate(self, url, broker=None, strategy=DEFAULT_STRATEGY, timeout=DEFAULT_TIMEOUT):
+        """Load a URL and wait for readiness; returns the same timing fields as page_waits.navigate"""
+        strategy = resolve_strategy(broker, strategy)
+        start = time.monotonic()
+        loaded_event = self.browser.expect(self.session_id, 'Page.domContentEventFired')
+        try:
+            reply = await self.send('Page.navigate', {'url': url})
+            if reply.get('errorText'):
+                raise CDPError(f"{reply['errorText']} loading {url}")
+            await asyncio.wait_for(loaded_event, timeout)
+        except asyncio.TimeoutError:
+            pass
+        finally:
+            # The event may never fire (timeout, failed navigation); do not leave the waiter behind
+            self.browser.forget(self.session_id, 'Page.domContentEventFired', loaded_event)
+        loaded = time.monotonic()
+        ready = await self.wait_ready(broker, strategy, max(timeout - (loaded - start), 0))
+        end = time.monotonic()
+        return {
+            'load_time': round(end - start, 3),
+            'ready_wait': round(end - loaded, 3),
+            'wait_strategy': strategy,
+            'timed_out': not ready,
+        }
+
+    async def wait_ready(self, broker, strategy, timeout):
+        if strategy == 'network_idle':
+            deadline = time.monotonic() + timeout
+            last_count, stable_since = -1, time.monotonic()
+            while time.monotonic() < deadline:
+                state, count = await self.execute_script(READY_JS['network_idle'])
+                now = time.monotonic()
+                if state != 'complete' or count != last_count:
+                    last_count, stable_since = count, now
+                elif now - stable_since >= NETWORK_IDLE_WINDOW:
+                    return True
+                await asyncio.sleep(POLL_INTERVAL)
+            return False
+        if strategy == 'selector' and broker is not None and broker.get('wait_selector'):
+            return await self.wait_until(READY_JS['selector'], broker['wait_selector'], timeout=timeout)
+        return await self.wait_until(READY_JS.get(strategy, READY_JS['ready_state']), timeout=timeout)
+
+    async def screenshot(self):
+        reply = await self.send('Page.captureScreenshot', {'format': 'png'})
+        return base64.b64decode(reply['data'])
+
+    async def current_url(self):
+        return await self.execute_script("return location.href;")
+
+    async def close(self):
+        """Close the tab and discard its cookies and storage"""
+        try:
+            await self.browser.send('Target.closeTarget', {'targetId': self.target_id})
+            await self.browser.send('Target.disposeBrowserContext', {'browserContextId': self.context_id})
+        except CDPError:
+            pass
+
+class AsyncOptOutTool:
+    """Unattended opt-out processing on a CDPBrowser, returning the same result dicts"""
+
+    def __init__(self, browser, brokers, log_dir, wait_strategy=DEFAULT_STRATEGY, page_timeout=DEFAULT_TIMEOUT,
+                 screenshot_format='png', screenshot_max_width=None, review_queue=None,
+                 resource_profile=DEFAULT_PROFILE):
+        self.browser = browser
+        self.recipes = get_plans(brokers)
+        self.wait_strategy = wait_strategy
+        self.page_timeout = page_timeout
+        self.review_queue = review_queue
+        self.resource_profile = resource_profile
+        self.screenshots = ScreenshotWriter(log_dir, screenshot_format, screenshot_max_width)
+        # Async counterparts of the recipe steps in recipes.py
+        self.step_runners = {
+            'open': self._open,
+            'ask': self._ask,
+            'wait': self._wait,
+            'fill': self._fill,
+            'human': self._human,
+            'submit': self._submit,
+            'confirm': self._confirm,
+            'finish': self._finish,
+        }
+
+    async def process_broker(self, broker, user_info):
+        """Process one (customer, broker) pair in its own tab and browser context"""
+        timer = SpanRecorder()
+        job = {'page': None, 'broker': broker, 'user_info': user_info, 'timing': None, 'screenshots': [],
+               'timer': timer}
+        try:
+            # Inside the try so a tab that will not open fails this job, not the whole run
+            job['page'] = await self.browser.new_page()
+            plan = self.recipes.get(broker['name'])
+            if plan:
+                result = await self.process_recipe(job, plan)
+            else:
+                result = await self.process_generic(job)
+        except CDPConnectionClosed:
+            # The browser is gone: stop the run rather than fail every remaining job
+            raise
+        except Exception as e:
+            if job['page'] is not None:
+                await self.take_screenshot(job, "error")
+            result = {"status": "error", "message": str(e)}
+        finally:
+            if job['page'] is not None:
+                await job['page'].close()
+        if job['timing']:
+            result.update(job['timing'])
+        if job['screenshots']:
+            result['screenshots'] = job['screenshots']
+        return timer.finish(result)
+
+    async def process_generic(self, job):
+        broker = job['broker']
+        await self._open(job, broker['opt_out_url'])
+        with job['timer'].span('discover_fields'):
+            fields = await job['page'].execute_script(DISCOVER_FIELDS_JS, list(SKIPPED_TYPES)) or []
+            matches = match_fields(fields, job['user_info'])
+        if matches:
+            with job['timer'].span('fill'):
+                await job['page'].execute_script(FILL_FIELDS_JS, [[idx, value] for _, idx, value in matches])
+            await self.take_screenshot(job, "form_filled")
+        return await self.defer(job, "opt-out process")
+
+    async def process_recipe(self, job, plan):
+        job['values'] = dict(job['user_info'])
+        job['values'].update(job['user_info'].get('listings', {}).get(job['broker']['name'], {}))
+        for step, arg in plan.steps:
+            result = await self.step_runners[step](job, arg)
+            if result is not None:
+                return result
+        return {"status": "error", "message": "Recipe ended without a result"}
+
+    async def take_screenshot(self, job, stage):
+        try:
+            filepath = self.screenshots.path_for(job['broker']['name'], stage)
+            with job['timer'].span('screenshot'):
+                png = await job['page'].screenshot()
+            if not self.screenshots.submit(png, filepath):
+                print(f"  Warning: Screenshot queue is full, dropped the {job['broker']['name']} {stage} screenshot")
+                return
+            job['screenshots'].append(str(filepath))
+        except Exception as e:
+            print(f"  Warning: Could not save screenshot: {e}")
+
+    async def defer(self, job, reason):
+        """Same contract as AutoOptOutTool.defer"""
+        with job['timer'].span('defer'):
+            blockers = await job['page'].execute_script(PAGE_BLOCKERS_JS) or []
+            if blockers:
+                reason = f"{reason} ({', '.join(blockers)})"
+            if self.review_queue is None:
+                return {"status": "manual", "message": f"Requires manual completion: {reason}"}
+            screenshot = job['screenshots'][-1] if job['screenshots'] else None
+            self.review_queue.defer(job['broker'], job.get('values', job['user_info']), reason,
+                                    await job['page'].current_url(), screenshot)
+            return {"status": "manual", "message": f"Deferred for review: {reason}"}
+
+    async def _open(self, job, url):
+        page = job['page']
+        profile = resolve_profile(job['broker'], self.resource_profile)
+        with job['timer'].span('block_resources'):
+            await page.send('Network.enable')
+            await page.send('Network.setBlockedURLs', {'urls': list(PROFILES[profile])})
+        start = time.perf_counter()
+        job['timing'] = await page.navigate(url, job['broker'], self.wait_strategy, self.page_timeout)
+        get_time = job['timing']['load_time'] - job['timing']['ready_wait']
+        job['timer'].add('driver.get', start, get_time)
+        job['timer'].add('wait', start + get_time, job['timing']['ready_wait'])
+        job['timing']['resource_profile'] = profile
+        job['timing']['bytes_transferred'], job['timing']['requests'] = await page.execute_script(PAGE_WEIGHT_JS)
+        await self.take_screenshot(job, "landing")
+
+    async def _ask(self, job, arg):
+        key, message, prompt = arg
+        if job['values'].get(key):
+            return None
+        return await self.defer(job, message)
+
+    async def _wait(self, job, arg):
+        selector, timeout = arg
+        with job['timer'].span('wait'):
+            found = await job['page'].wait_until(READY_JS['selector'], selector, timeout=timeout or self.page_timeout)
+        if not found:
+            return await self.defer(job, f"form not found ({selector})")
+        return None
+
+    async def _fill(self, job, arg):
+        fields, checks = arg
+        values = job['values']
+        pairs = [[selector, str(values[key])] for key, selector in fields if values.get(key)]
+        pairs.extend([selector, ''] for selector in checks)
+        with job['timer'].span('fill'):
+            missing = await job['page'].execute_script(FILL_SELECTORS_JS, pairs) if pairs else []
+        if missing:
+            return await self.defer(job, f"fields not found ({', '.join(missing)})")
+        await self.take_screenshot(job, "form_filled")
+        return None
+
+    async def _human(self, job, message):
+        return await self.defer(job, message)
+
+    async def _submit(self, job, selector):
+        if await job['page'].execute_script(PAGE_BLOCKERS_JS):
+            return await self.defer(job, "submit")
+        with job['timer'].span('submit'):
+            clicked = await job['page'].execute_script(CLICK_JS, selector)
+        if not clicked:
+            return await self.defer(job, f"submit button not found ({selector})")
+        return None
+
+    async def _confirm(self, job, arg):
+        selector, text, url_part, timeout = arg
+        with job['timer'].span('confirm'):
+            confirmed = await job['page'].wait_until(SUCCESS_JS, selector, text, url_part,
+                                                     timeout=timeout or self.page_timeout)
+        if not confirmed:
+            await self.take_screenshot(job, "unconfirmed")
+            return {"status": "error", "message": "No confirmation shown after submit"}
+        return None
+
+    async def _finish(self, job, message):
+        await self.take_screenshot(job, "submitted")
+        return {"status": "success", "message": message}
+
+async def process_jobs(tool, jobs, tabs=DEFAULT_TABS, journal=None, verbose=True, scheduler=None, results=None):
+    """Run (customer, broker) jobs with up to `tabs` pages in flight; returns the results
+
+    Jobs go through a JobScheduler (unlimited unless one with a rate is passed in).
+    A scheduler with CircuitBreakers retries failed jobs and parks failing brokers.
+    Results are appended to `results` if given, so a caller keeps them if the run fails.
+    """
+    if scheduler is None:
+        scheduler = JobScheduler()
+    for customer, broker in jobs:
+        scheduler.add(customer, broker)
+    results = [] if results is None else results
+
+    async def tab_worker(tab_id):
+        while True:
+            job = await scheduler.get_async()
+            if job is None:
+                return
+            customer, broker = job.customer, job.broker
+            if verbose:
+                attempt = f" (attempt {job.attempts})" if job.attempts > 1 else ""
+                print(f"[tab {tab_id}] {customer_key(customer)} → {broker['name']}{attempt}")
+            result = None
+            try:
+                result = await tool.process_broker(broker, customer)
+            finally:
+                retrying = scheduler.done(job, result)
+            if retrying:
+                continue
+            result['attempts'] = job.attempts
+            result['broker'] = broker['name']
+            result['customer'] = customer_key(customer)
+            result['worker'] = tab_id
+            result['timestamp'] = datetime.now().isoformat()
+            results.append(result)
+            if journal:
+                journal.append(result)
+
+    await asyncio.gather(*(tab_worker(tab_id) for tab_id in range(tabs)))
+    return results
+
+def run_async_pool(tool_class, customers, tabs=DEFAULT_TABS, broker_list=None, tool_options=None, journal=None):
+    """Roster run on the CDP backend; saves and summarises like optout_pool.run_pool"""
+    tool_options = tool_options or {}
+    # The collector loads the registry, then saves and summarises like a normal run
+    collector = tool_class(headless=True, interactive=False, **tool_options)
+    broker_list = broker_list if broker_list is not None else collector.brokers
+    # Resume only this roster's pairs; the journal may hold results for other customers
+    results, jobs = [], []
+    for customer in customers:
+        key = customer_key(customer)
+        for broker in broker_list:
+            if broker['name'] not in customer.get('only_brokers', (broker['name'],)):
+                continue
+            if journal and journal.is_done(key, broker['name']):
+                results.append(journal.completed[(key, broker['name'])])
+            else:
+                jobs.append((customer, broker))
+
+    print("\n" + "="*80)
+    print("AUTOMATED DATA BROKER OPT-OUT - ASYNC CDP BACKEND")
+    print("="*80)
+    print(f"\nJobs: {len(jobs)}")
+    if results:
+        print(f"Already completed (resumed): {len(results)}")
+    print(f"Tabs: {tabs} in one headless browser")
+    print("\n" + "="*80 + "\n")
+    scheduler = JobScheduler(tool_options.get('broker_rate'), broker_rates(broker_list),
+                             breakers=tool_options.get('breakers'))
+
+    new_results = []
+    commands = 0
+
+    async def run():
+        nonlocal commands
+        browser = await CDPBrowser.launch(headless=True)
+        tool = AsyncOptOutTool(browser, collector.brokers, collector.log_dir,
+                               wait_strategy=tool_options.get('wait_strategy', DEFAULT_STRATEGY),
+                               page_timeout=tool_options.get('page_timeout', DEFAULT_TIMEOUT),
+                               screenshot_format=tool_options.get('screenshot_format', 'png'),
+                               screenshot_max_width=tool_options.get('screenshot_max_width'),
+                               review_queue=tool_options.get('review_queue'),
+                               resource_profile=tool_options.get('resource_profile') or DEFAULT_PROFILE)
+        try:
+            await process_jobs(tool, jobs, tabs, journal, scheduler=scheduler, results=new_results)
+        finally:
+            commands = browser.commands
+            tool.screenshots.close()
+            print(tool.screenshots.summary())
+            await browser.close()
+
+    start = time.monotonic()
+    failed = False
+    try:
+        asyncio.run(run())
+    except CDPError as e:
+        if not new_results:
+            print(f"Error starting the cdp backend: {e}")
+            sys.exit(1)
+        # The browser died mid-run; save what finished before exiting
+        print(f"Error: the cdp backend stopped after {len(new_results)} job(s): {e}")
+        failed = True
+    finally:
+        if journal:
+            journal.close()
+    elapsed = time.monotonic() - start
+
+    collector.results = results + new_results
+    collector.save_results()
+    collector.print_summary()
+    print(f"DevTools commands: {commands}")
+    print(scheduler.summary())
+    if elapsed > 0:
+        print(f"Throughput: {len(new_results) / elapsed * 3600:.0f} brokers/hour ({elapsed:.1f}s)\n")
+    if failed:
+        sys.exit(1)
+    return collector.results
@@ -0,0 +1,461 @@
+#!/usr/bin/env python3
+"""
+Checklist Templates
+Precompiled templates for the email template, HTML checklist and text checklist.
+Static markup and broker sections are compiled once per broker-database version;
+rendering a customer only splices the personal fields into a list buffer. The
+stream_* variants yield the same output chunk by chunk for writing straight to a
+file, so no per-customer copy of the document is ever built.
+"""
+
+import hashlib
+import json
+import re
+from datetime import datetime
+
+PLACEHOLDER = re.compile(r'\$\{(\w+)\}')
+
+# Broker sections are streamed in blocks of about this many characters
+SECTION_BLOCK = 32 * 1024
+
+# Personal fields in display order: (argument, html label, email label, text label)
+PERSONAL_FIELDS = (
+    ('address', 'Address', 'Address', 'Address'),
+    ('city', 'City', 'City', 'City'),
+    ('state', 'State', 'State', 'State'),
+    ('zip_code', 'ZIP', 'ZIP Code', 'ZIP'),
+    ('phone', 'Phone', 'Phone', 'Phone'),
+)
+
+EMAIL_SOURCE = """Subject: Data Removal Request - ${name}
+
+Dear Privacy Team,
+
+I am writing to request the removal of my personal information from your database under the California Consumer Privacy Act (CCPA), General Data Protection Regulation (GDPR), and other applicable privacy laws.
+
+Personal Information to Remove:
+Name: ${name}
+Email: ${email}
+${details}
+I formally request that you:
+1. Remove all of my personal information from your database
+2. Stop selling or sharing my personal information with third parties
+3. Confirm in writing once my information has been removed
+4. Do not retaliate or discriminate against me for making this request
+
+Please process this request within 45 days as required by law. I expect written confirmation of the removal.
+
+Thank you for your prompt attention to this matter.
+
+Sincerely,
+${name}
+Date: ${date}
+"""
+
+TEXT_SOURCE = """DATA BROKER REMOVAL CHECKLIST
+Generated: ${generated}
+${rule}
+
+Personal Information:
+  Name: ${name}
+  Email: ${email}
+${details}
+${rule}
+
+${broker_sections}"""
+
+TEXT_BROKER_SOURCE = """${idx}. ${name}
+   Website: ${website}
+   Opt-Out URL: ${opt_out_url}
+   Method: ${method}
+${email_line}   Status: [ ] Pending  [ ] Completed  [ ] N/A
+   Date Submitted: _______________
+   Confirmation Received: _______________
+
+${thin_rule}
+
+"""
+
+HTML_BROKER_SOURCE = """
+        <div class="broker-card" id="broker-${idx}">
+            <div class="checkbox-container">
+                <input type="checkbox" id="check-${idx}" onchange="updateProgress()">
+            </div>
+            <div class="broker-name">${idx}. ${name}</div>
+            <div class="broker-info">🌐 <a href="${website}" target="_blank">${website}</a></div>
+            <div class="broker-info">
+                <span class="method-badge">${method_badge}</span>
+${email_badge}
+            </div>
+            <a href="${opt_out_url}" target="_blank" class="opt-out-button">Visit Opt-Out Page →</a>
+        </div>
+"""
+
+HTML_SOURCE = """<!DOCTYPE html>
+<html lang="en">
+<head>
+    <meta charset="UTF-8">
+    <meta name="viewport" content="width=device-width, initial-scale=1.0">
+    <title>Data Broker Removal Checklist</title>
+    <style>
+        body {
+            font-family: Arial, sans-serif;
+            max-width: 1200px;
+            margin: 0 auto;
+            padding: 20px;
+            background-color: #f5f5f5;
+        }
+        .header {
+            background-color: #2c3e50;
+            color: white;
+            padding: 20px;
+            border-radius: 5px;
+            margin-bottom: 20px;
+        }
+        .info-box {
+            background-color: #ecf0f1;
+            padding: 15px;
+            border-radius: 5px;
+            margin-bottom: 20px;
+        }
+        .broker-card {
+            background-color: white;
+            padding: 20px;
+            margin-bottom: 15px;
+            border-radius: 5px;
+            box-shadow: 0 2px 4px rgba(0,0,0,0.1);
+            position: relative;
+        }
+        .broker-card.completed {
+            background-color: #d4edda;
+            border-left: 4px solid #28a745;
+        }
+        .broker-name {
+            font-size: 18px;
+            font-weight: bold;
+            color: #2c3e50;
+            margin-bottom: 10px;
+        }
+        .broker-info {
+            margin: 5px 0;
+            color: #555;
+        }
+        .opt-out-button {
+            display: inline-block;
+            background-color: #3498db;
+            color: white;
+            padding: 10px 20px;
+            text-decoration: none;
+            border-radius: 5px;
+            margin: 10px 5px 0 0;
+        }
+        .opt-out-button:hover {
+            background-color: #2980b9;
+        }
+        .checkbox-container {
+            position: absolute;
+            top: 20px;
+            right: 20px;
+        }
+        .checkbox-container input[type="checkbox"] {
+            width: 25px;
+            height: 25px;
+            cursor: pointer;
+        }
+        .progress-bar {
+            width: 100%;
+            height: 30px;
+            background-color: #ecf0f1;
+            border-radius: 5px;
+            overflow: hidden;
+            margin-top: 10px;
+        }
+        .progress-fill {
+            height: 100%;
+            background-color: #27ae60;
+            width: 0%;
+            transition: width 0.3s ease;
+            display: flex;
+            align-items: center;
+            justify-content: center;
+            color: white;
+            font-weight: bold;
+        }
+        .instructions {
+            background-color: #fff3cd;
+            border-left: 4px solid #ffc107;
+            padding: 15px;
+            margin-bottom: 20px;
+            border-radius: 5px;
+        }
+        .method-badge {
+            display: inline-block;
+            padding: 5px 10px;
+            background-color: #6c757d;
+            color: white;
+            border-radius: 3px;
+            font-size: 12px;
+            margin-right: 5px;
+        }
+    </style>
+</head>
+<body>
+    <div class="header">
+        <h1>🔒 Data Broker Removal Checklist</h1>
+        <p>Generated: ${generated}</p>
+    </div>
+    
+    <div class="info-box">
+        <h3>Your Information</h3>
+        <p><strong>Name:</strong> ${name}</p>
+        <p><strong>Email:</strong> ${email}</p>${details}
+        <div class="progress-bar">
+            <div class="progress-fill" id="progressBar">0%</div>
+        </div>
+    </div>
+    
+    <div class="instructions">
+        <h3>📋 Instructions</h3>
+        <ol>
+            <li>Click "Visit Opt-Out Page" for each data broker</li>
+            <li>Follow their removal process (usually requires searching for yourself first)</li>
+            <li>Check the box when you've submitted your removal request</li>
+            <li>Keep track of confirmation emails</li>
+            <li>Follow up after 45 days if you haven't received confirmation</li>
+        </ol>
+        <p><strong>Tip:</strong> Some sites require you to find your listing first before you can opt out. Search for your name, address, or phone number.</p>
+    </div>
+    
+    <div id="brokerList">
+${broker_cards}
+    </div>
+    
+    <script>
+        function updateProgress() {
+            const total = ${total};
+            const checked = document.querySelectorAll('input[type="checkbox"]:checked').length;
+            const percentage = Math.round((checked / total) * 100);
+            const progressBar = document.getElementById('progressBar');
+            progressBar.style.width = percentage + '%';
+            progressBar.textContent = percentage + '%';
+            
+            // Update card appearance
+            for (let i = 1; i <= total; i++) {
+                const checkbox = document.getElementById('check-' + i);
+                const card = document.getElementById('broker-' + i);
+                if (checkbox.checked) {
+                    card.classList.add('completed');
+                } else {
+                    card.classList.remove('completed');
+                }
+            }
+            
+            // Save progress to localStorage
+            const progress = [];
+            for (let i = 1; i <= total; i++) {
+                progress.push(document.getElementById('check-' + i).checked);
+            }
+            localStorage.setItem('brokerProgress', JSON.stringify(progress));
+        }
+        
+        // Load saved progress
+        window.onload = function() {
+            const saved = localStorage.getItem('brokerProgress');
+            if (saved) {
+                const progress = JSON.parse(saved);
+                progress.forEach((checked, index) => {
+                    const checkbox = document.getElementById('check-' + (index + 1));
+                    if (checkbox) {
+                        checkbox.checked = checked;
+                    }
+                });
+                updateProgress();
+            }
+        };
+    </script>
+</body>
+</html>
+"""
+
+class CompiledTemplate:
+    """A template split once into static chunks and ${field} slots"""
+    __slots__ = ('parts', 'slots')
+    
+    def __init__(self, source, **constants):
+        self.parts = []
+        self.slots = []
+        pos = 0
+        for match in PLACEHOLDER.finditer(source):
+            self._append_static(source[pos:match.start()])
+            field = match.group(1)
+            if field in constants:
+                # Fields known at compile time are folded into the static chunks
+                self._append_static(str(constants[field]))
+            else:
+                self.slots.append((len(self.parts), field))
+                self.parts.append(None)
+            pos = match.end()
+        self._append_static(source[pos:])
+    
+    def _append_static(self, text):
+        if self.parts and self.parts[-1] is not None:
+            self.parts[-1] += text
+        else:
+            self.parts.append(text)
+    
+    def render(self, values):
+        """Fill the slots from a dict of values and join the buffer"""
+        buf = self.parts.copy()
+        for idx, field in self.slots:
+            buf[idx] = values[field]
+        return ''.join(buf)
+    
+    def stream(self, values):
+        """Yield the static chunks and slot values in order without joining them
+        
+        A value may be a list of chunks (such as the broker sections), which is yielded piece by piece.
+        """
+        slots = iter(self.slots)
+        for part in self.parts:
+            if part is not None:
+                yield part
+                continue
+            value = values[next(slots)[1]]
+            if isinstance(value, str):
+                yield value
+            else:
+                yield from value
+
+def _blocks(sections):
+    """Join consecutive sections into blocks of about SECTION_BLOCK characters"""
+    blocks = []
+    current = []
+    size = 0
+    for section in sections:
+        current.append(section)
+        size += len(section)
+        if size >= SECTION_BLOCK:
+            blocks.append(''.join(current))
+            current = []
+            size = 0
+    if current:
+        blocks.append(''.join(current))
+    return blocks
+
+def content_digest(text):
+    """Short sha256 of a piece of output, as stored in per-customer manifests"""
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()[:16]
+
+def broker_database_version(brokers):
+    """Stable content hash of the broker list, used to key compiled templates"""
+    version = getattr(brokers, 'version', None)
+    if version:
+        return version
+    payload = json.dumps([dict(broker) for broker in brokers], sort_keys=True)
+    return content_digest(payload)
+
+class ChecklistTemplates:
+    """All output templates compiled against one version of the broker database"""
+    
+    def __init__(self, brokers):
+        self.version = broker_database_version(brokers)
+        self.broker_count = len(brokers)
+        
+        text_broker = CompiledTemplate(TEXT_BROKER_SOURCE, thin_rule='-'*80)
+        html_broker = CompiledTemplate(HTML_BROKER_SOURCE)
+        self.text_sections = []
+        self.html_sections = []
+        for idx, broker in enumerate(brokers, 1):
+            values = {
+                'idx': str(idx),
+                'name': broker['name'],
+                'website': broker['website'],
+                'opt_out_url': broker['opt_out_url'],
+                'method': broker['method'],
+                'method_badge': broker['method'].replace('_', ' ').upper(),
+                'email_line': f"   Email: {broker['email']}\n" if broker.get('email') else "",
+                'email_badge': f'<span class="method-badge">EMAIL: {broker["email"]}</span>' if broker.get('email') else "",
+            }
+            self.text_sections.append(text_broker.render(values))
+            self.html_sections.append(html_broker.render(values))
+        # One digest per rendered broker section. Broker settings that never reach the
+        # checklists (recipes, waits, ...) do not change these, so they cause no rewrites.
+        self.section_digests = [content_digest(text + html)
+                                for text, html in zip(self.text_sections, self.html_sections)]
+        
+        self.email = CompiledTemplate(EMAIL_SOURCE)
+        self.text = CompiledTemplate(TEXT_SOURCE, rule='='*80, broker_sections=''.join(self.text_sections))
+        self.html = CompiledTemplate(HTML_SOURCE, broker_cards=''.join(self.html_sections), total=self.broker_count)
+        # Streaming variants keep the broker sections as a slot filled with bounded blocks
+        self.text_stream = CompiledTemplate(TEXT_SOURCE, rule='='*80)
+        self.html_stream = CompiledTemplate(HTML_SOURCE, total=self.broker_count)
+        self.text_blocks = _blocks(self.text_sections)
+        self.html_blocks = _blocks(self.html_sections)
+    
+    @staticmethod
+    def _details(fields, label_idx, line_format):
+        return ''.join(line_format.format(field[label_idx], fields[field[0]])
+                       for field in PERSONAL_FIELDS if fields.get(field[0]))
+    
+    def _email_values(self, name, email, fields):
+        return {
+            'name': name,
+            'email': email,
+            'details': self._details(fields, 2, "{}: {}\n"),
+            'date': datetime.now().strftime('%B %d, %Y'),
+        }
+    
+    def _text_values(self, name, email, fields):
+        return {
+            'name': name,
+            'email': email,
+            'details': self._details(fields, 3, "  {}: {}\n"),
+            'generated': datetime.now().strftime('%B %d, %Y at %I:%M %p'),
+            'broker_sections': self.text_blocks,
+        }
+    
+    def _html_values(self, name, email, fields):
+        return {
+            'name': name,
+            'email': email,
+            'details': self._details(fields, 1, "<p><strong>{}:</strong> {}</p>"),
+            'generated': datetime.now().strftime('%B %d, %Y at %I:%M %p'),
+            'broker_cards': self.html_blocks,
+        }
+    
+    def render_email(self, name, email, **fields):
+        """Render the CCPA/GDPR removal request email"""
+        return self.email.render(self._email_values(name, email, fields))
+    
+    def render_text(self, name, email, **fields):
+        """Render the printable text checklist"""
+        return self.text.render(self._text_values(name, email, fields))
+    
+    def render_html(self, name, email, **fields):
+        """Render the interactive HTML checklist"""
+        return self.html.render(self._html_values(name, email, fields))
+    
+    def stream_email(self, name, email, **fields):
+        """Yield the removal request email in chunks"""
+        return self.email.stream(self._email_values(name, email, fields))
+    
+    def stream_text(self, name, email, **fields):
+        """Yield the text checklist in chunks of at most a few broker sections"""
+        return self.text_stream.stream(self._text_values(name, email, fields))
+    
+    def stream_html(self, name, email, **fields):
+        """Yield the HTML checklist in chunks of at most a few broker cards"""
+        return self.html_stream.stream(self._html_values(name, email, fields))
+
+# Compiled templates keyed by broker-database version
+_compiled = {}
+
+def get_templates(brokers):
+    """Return the compiled templates for this broker list, compiling on first use"""
+    version = broker_database_version(brokers)
+    templates = _compiled.get(version)
+    if templates is None:
+        templates = ChecklistTemplates(brokers)
+        _compiled.clear()
+        _compiled[version] = templates
+    return templates
@@ -0,0 +1,208 @@
+#!/usr/bin/env python3
+"""
+Circuit Breakers
+Keeps one breaker per broker so a site that is down does not eat a worker (and
+a full page-load timeout) for every customer in the batch:
+
+- closed: jobs run normally. A failed job is retried with exponential backoff
+  and jitter, up to --retries times.
+- open: after --breaker-threshold failures in a row the broker's jobs are
+  parked for --breaker-cooldown seconds.
+- half_open: once the cool-down is over a single probe job runs. If it
+  succeeds the breaker closes and the parked jobs resume; if it fails the
+  breaker opens again for twice as long (up to max_cooldown).
+- gave up: after --breaker-max-trips trips in a row with no success in
+  between, the broker is written off for this run. Its remaining jobs are
+  dropped without a result, so the results journal and status database still
+  show them as open and the next run picks them up.
+
+The JobScheduler asks wait() before dispatching a job and passes each finished
+job's result to record(). Only results with status "error" count as failures;
+"manual" and "skipped" mean the site answered.
+"""
+
+import random
+import threading
+import time
+
+from rate_limit import backoff_delay
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+DEFAULT_RETRIES = 2
+DEFAULT_THRESHOLD = 3
+DEFAULT_COOLDOWN = 60.0
+DEFAULT_MAX_COOLDOWN = 900.0
+DEFAULT_MAX_TRIPS = 5
+# Other jobs for a half-open broker check back this often while its probe runs
+PROBE_POLL = 5.0
+
+def is_failure(result):
+    """Whether a broker result counts against its breaker (and may be retried)"""
+    return result.get('status') == 'error'
+
+class Breaker:
+    """State of one broker's circuit"""
+    __slots__ = ('state', 'failures', 'cooldown', 'open_until', 'probe_started', 'trips', 'streak', 'parked',
+                 'last_error')
+
+    def __init__(self, cooldown):
+        self.state = CLOSED
+        self.failures = 0
+        self.cooldown = cooldown
+        self.open_until = 0.0
+        self.probe_started = None
+        self.trips = 0
+        # Trips since the last success
+        self.streak = 0
+        self.parked = 0
+        self.last_error = None
+
+class CircuitBreakers:
+    """Retry policy plus a breaker per broker name, shared by every worker of a run"""
+
+    def __init__(self, retries=DEFAULT_RETRIES, threshold=DEFAULT_THRESHOLD, cooldown=DEFAULT_COOLDOWN,
+                 max_cooldown=DEFAULT_MAX_COOLDOWN, max_trips=DEFAULT_MAX_TRIPS, backoff_base=5.0,
+                 backoff_cap=120.0, probe_timeout=600.0, clock=time.monotonic, rng=random):
+        self.retries = retries
+        # threshold 0 turns the breakers off (retries still apply)
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.max_cooldown = max_cooldown
+        # 0 keeps probing for as long as the run lasts
+        self.max_trips = max_trips
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+        # A probe that never reports back (e.g. its worker died) is replaced after this long
+        self.probe_timeout = probe_timeout
+        self.clock = clock
+        self.rng = rng
+        self.breakers = {}
+        self.lock = threading.Lock()
+        self.stats = {'failures': 0, 'retries': 0, 'trips': 0, 'probes': 0, 'parked': 0, 'gave_up': 0}
+
+    def _breaker(self, name):
+        breaker = self.breakers.get(name)
+        if breaker is None:
+            breaker = self.breakers[name] = Breaker(self.cooldown)
+        return breaker
+
+    def wait(self, name, now=None):
+        """Seconds until `name`'s jobs may run (0 if one may run now), or None once it has given up
+
+        A return of 0 for a half-open breaker admits that job as its probe, so only
+        call this when the job is about to be dispatched.
+        """
+        with self.lock:
+            breaker = self.breakers.get(name)
+            if breaker is None or breaker.state == CLOSED:
+                return 0.0
+            now = self.clock() if now is None else now
+            if breaker.state == OPEN:
+                if self.gave_up(breaker):
+                    return None
+                if now < breaker.open_until:
+                    breaker.parked += 1
+                    self.stats['parked'] += 1
+                    return breaker.open_until - now
+                breaker.state = HALF_OPEN
+                breaker.probe_started = None
+            if breaker.probe_started is None or now - breaker.probe_started >= self.probe_timeout:
+                breaker.probe_started = now
+                self.stats['probes'] += 1
+                return 0.0
+            breaker.parked += 1
+            self.stats['parked'] += 1
+            return PROBE_POLL
+
+    def release(self, name):
+        """A dispatched job was put back without running; frees the probe slot if it held it"""
+        with self.lock:
+            breaker = self.breakers.get(name)
+            if breaker is not None and breaker.state == HALF_OPEN:
+                breaker.probe_started = None
+
+    def record(self, name, result, now=None):
+        """Update `name`'s breaker with a finished job's result; returns True if it failed"""
+        failed = is_failure(result)
+        with self.lock:
+            breaker = self._breaker(name)
+            now = self.clock() if now is None else now
+            if not failed:
+                # The site answered, so whatever tripped the breaker is over
+                breaker.state = CLOSED
+                breaker.failures = 0
+                breaker.cooldown = self.cooldown
+                breaker.probe_started = None
+                breaker.streak = 0
+                return False
+            self.stats['failures'] += 1
+            breaker.failures += 1
+            breaker.last_error = result.get('message')
+            if breaker.state == HALF_OPEN:
+                breaker.cooldown = min(self.max_cooldown, breaker.cooldown * 2)
+                self._trip(breaker, now)
+            elif breaker.state == CLOSED and self.threshold and breaker.failures >= self.threshold:
+                self._trip(breaker, now)
+            return True
+
+    def _trip(self, breaker, now):
+        breaker.state = OPEN
+        breaker.open_until = now + breaker.cooldown
+        breaker.probe_started = None
+        breaker.trips += 1
+        breaker.streak += 1
+        self.stats['trips'] += 1
+        if self.gave_up(breaker):
+            self.stats['gave_up'] += 1
+
+    def gave_up(self, breaker):
+        return breaker.state == OPEN and bool(self.max_trips) and breaker.streak >= self.max_trips
+
+    def retry_delay(self, attempts):
+        """Backoff before retrying a job that has failed `attempts` times, or None if it is out of retries"""
+        if attempts > self.retries:
+            return None
+        self.stats['retries'] += 1
+        return backoff_delay(attempts, self.backoff_base, self.backoff_cap, self.rng)
+
+    def state(self, name):
+        with self.lock:
+            breaker = self.breakers.get(name)
+            return breaker.state if breaker else CLOSED
+
+    def export(self, now=None):
+        """{broker: breaker details} for every broker that has failed at least once"""
+        with self.lock:
+            now = self.clock() if now is None else now
+            return {
+                name: {
+                    'state': breaker.state,
+                    'consecutive_failures': breaker.failures,
+                    'trips': breaker.trips,
+                    'parked': breaker.parked,
+                    'gave_up': self.gave_up(breaker),
+                    'reopens_in': round(max(0.0, breaker.open_until - now), 1) if breaker.state == OPEN else 0.0,
+                    'last_error': breaker.last_error,
+                }
+                for name, breaker in sorted(self.breakers.items())
+                if breaker.trips or breaker.failures or breaker.last_error
+            }
+
+    def summary(self, now=None):
+        states = self.export(now)
+        lines = [f"Circuit breakers: {self.stats['failures']} failure(s), {self.stats['retries']} retried, "
+                 f"{self.stats['trips']} trip(s), {self.stats['probes']} probe(s), "
+                 f"{self.stats['parked']} job(s) parked, {self.stats['gave_up']} gave up"]
+        for name, info in states.items():
+            if info['state'] != CLOSED or info['trips']:
+                if info['gave_up']:
+                    detail = "gave up for this run"
+                elif info['state'] == OPEN:
+                    detail = f"reopens in {info['reopens_in']:.0f}s"
+                else:
+                    detail = f"{info['consecutive_failures']} failure(s) in a row"
+                lines.append(f"  {name}: {info['state']} (tripped {info['trips']}x, {detail})")
+        return "\n".join(lines)
@@ -0,0 +1,512 @@
+#!/usr/bin/env python3
+"""
+Listing Discovery
+Finds a customer's profile pages on people-search brokers before the opt-out
+run, so nobody has to search every broker by hand. A broker in
+data_brokers.json may carry a "search" pattern:
+
+  "search": {
+    "url": "https://example.com/results?name={name}&city={city}&state={state}",
+    "profile": "^https://example\\.com/person/[^/?#]+",   (regex for profile links)
+    "key": "profile_url",                                  (recipe ask it answers, default profile_url)
+    "rate": "1/s"                                          (optional per-host rate)
+  }
+
+Placeholders are {name}, {first}, {last}, {city}, {state}, {zip_code} and
+{phone} (URL-quoted), plus {name_slug}, {city_slug} and {state_slug}
+(lowercase, words joined by "-"). Brokers whose pattern needs a field the
+customer does not have are skipped for that customer.
+
+Search pages are fetched with aiohttp (pip install aiohttp) from one asyncio
+event loop over pooled keep-alive connections, with a limit on connections and
+requests per second for each host. Every search URL and the profile links
+found on it are cached in SQLite for a TTL, so rechecks of the same customer
+do not fetch again.
+
+Usage:
+  python3 discovery.py --roster roster.csv [--ttl-days 7] [--output listings.jsonl]
+"""
+
+import argparse
+import asyncio
+import json
+import re
+import sqlite3
+import string
+import sys
+import time
+from html.parser import HTMLParser
+from pathlib import Path
+from urllib.parse import quote, urljoin, urlsplit
+
+from rate_limit import DomainLimiter, parse_rate
+from results_journal import customer_key
+
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None
+
+DEFAULT_CACHE = Path(__file__).parent / "logs" / "discovery_cache.db"
+DEFAULT_TTL_DAYS = 7
+DEFAULT_CONCURRENCY = 32
+DEFAULT_PER_HOST = 4
+DEFAULT_HOST_RATE = "2/s"
+DEFAULT_TIMEOUT = 15
+MAX_REDIRECTS = 5
+MAX_BODY = 4 * 1024 * 1024
+READ_CHUNK = 65536
+MAX_CANDIDATES = 10
+USER_AGENT = "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0 Safari/537.36"
+
+SEARCH_KEYS = ('url', 'profile', 'key', 'rate')
+PLACEHOLDERS = ('name', 'first', 'last', 'city', 'state', 'zip_code', 'phone', 'name_slug', 'city_slug', 'state_slug')
+
+# Only successful answers are cached; errors are fetched again on the next run
+CACHED_STATUSES = (200, 404, 410)
+
+class SearchError(ValueError):
+    """A search pattern in data_brokers.json is malformed"""
+
+class HTTPError(Exception):
+    """A request failed before a complete response arrived (connect, timeout, bad reply)
+
+    Also raised by AsyncHTTPClient() when aiohttp is not installed.
+    """
+
+class SearchPattern:
+    """A compiled broker search: URL template, profile link regex and the ask key it answers"""
+    __slots__ = ('broker_name', 'url', 'profile', 'key', 'rate', 'fields')
+
+    def __init__(self, broker_name, url, profile, key, rate, fields):
+        self.broker_name = broker_name
+        self.url = url
+        self.profile = profile
+        self.key = key
+        self.rate = rate
+        self.fields = fields
+
+    def search_url(self, customer):
+        """Search URL for a customer, or None if the customer lacks a field the pattern needs"""
+        values = search_values(customer)
+        if not all(values.get(field) for field in self.fields):
+            return None
+        return self.url.format_map(values)
+
+    def __repr__(self):
+        return f"SearchPattern({self.broker_name!r}, {self.url!r})"
+
+def _slug(text):
+    return re.sub(r'[^a-z0-9]+', '-', text.lower()).strip('-')
+
+def search_values(customer):
+    """Placeholder values for one customer, quoted for use in a URL"""
+    name = customer.get('name', '').strip()
+    parts = name.split()
+    raw = {
+        'name': name,
+        'first': parts[0] if parts else '',
+        'last': parts[-1] if len(parts) > 1 else '',
+        'city': customer.get('city', '').strip(),
+        'state': customer.get('state', '').strip(),
+        'zip_code': customer.get('zip_code', '').strip(),
+        'phone': re.sub(r'\D', '', customer.get('phone', '')),
+    }
+    values = {key: quote(value, safe='') for key, value in raw.items()}
+    values['name_slug'] = _slug(raw['name'])
+    values['city_slug'] = _slug(raw['city'])
+    values['state_slug'] = _slug(raw['state'])
+    return values
+
+def compile_search(broker):
+    """Validate a broker's search entry and turn it into a SearchPattern"""
+    search = broker['search']
+    if not isinstance(search, dict):
+        raise SearchError("search must be an object")
+    unknown = set(search) - set(SEARCH_KEYS)
+    if unknown:
+        raise SearchError(f"unknown keys: {', '.join(sorted(unknown))}")
+    url = search.get('url')
+    if not isinstance(url, str) or urlsplit(url).scheme not in ('http', 'https'):
+        raise SearchError("url must be an http(s) URL template")
+    try:
+        fields = tuple(field for _, field, _, _ in string.Formatter().parse(url) if field is not None)
+    except ValueError as e:
+        raise SearchError(f"bad url template: {e}")
+    bad = [field for field in fields if field not in PLACEHOLDERS]
+    if bad:
+        raise SearchError(f"unknown placeholders: {', '.join(bad)}")
+    try:
+        profile = re.compile(search.get('profile', ''))
+    except re.error as e:
+        raise SearchError(f"bad profile regex: {e}")
+    if not search.get('profile'):
+        raise SearchError("profile regex is required")
+    rate = None
+    if search.get('rate'):
+        try:
+            rate = parse_rate(search['rate'])
+        except ValueError as e:
+            raise SearchError(str(e))
+    return SearchPattern(broker['name'], url, profile, search.get('key', 'profile_url'), rate, fields)
+
+_compiled = {}
+
+def get_searches(brokers):
+    """Compiled search patterns by broker name for every broker with one, compiled on first use"""
+    version = getattr(brokers, 'version', None)
+    searches = _compiled.get(version) if version else None
+    if searches is None:
+        searches = {}
+        for broker in brokers:
+            if not broker.get('search'):
+                continue
+            try:
+                searches[broker['name']] = compile_search(broker)
+            except SearchError as e:
+                print(f"  Warning: Ignoring search for {broker['name']}: {e}")
+        if version:
+            _compiled.clear()
+            _compiled[version] = searches
+    return searches
+
+def host_limiter(searches, rate):
+    """DomainLimiter keyed by host, with each broker's own search rate where it sets one"""
+    overrides = {urlsplit(search.url).hostname: search.rate for search in searches.values() if search.rate}
+    return DomainLimiter(rate, overrides=overrides)
+
+class _LinkParser(HTMLParser):
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.links = []
+
+    def handle_starttag(self, tag, attrs):
+        if tag == 'a':
+            href = dict(attrs).get('href')
+            if href:
+                self.links.append(href)
+
+def extract_candidates(html, page_url, pattern, customer=None):
+    """Absolute profile links on a search page that match the pattern, best first
+
+    Links whose URL mentions the customer's last name are ranked ahead of the rest.
+    """
+    parser = _LinkParser()
+    parser.feed(html)
+    parser.close()
+    seen = set()
+    candidates = []
+    for href in parser.links:
+        url = urljoin(page_url, href).split('#', 1)[0]
+        if url not in seen and pattern.profile.search(url):
+            seen.add(url)
+            candidates.append(url)
+    last = _slug(customer.get('name', '').split()[-1]) if customer and customer.get('name', '').split() else ''
+    if last:
+        candidates.sort(key=lambda url: last not in _slug(url))
+    return candidates[:MAX_CANDIDATES]
+
+class HTTPResponse:
+    __slots__ = ('url', 'status', 'headers', 'body')
+
+    def __init__(self, url, status, headers, body):
+        self.url = url
+        self.status = status
+        self.headers = headers
+        self.body = body
+
+    def text(self):
+        match = re.search(r'charset=([\w-]+)', self.headers.get('content-type', ''))
+        try:
+            return self.body.decode(match.group(1) if match else 'utf-8', 'replace')
+        except LookupError:
+            return self.body.decode('utf-8', 'replace')
+
+class AsyncHTTPClient:
+    """HTTP GET client on aiohttp with a keep-alive connection pool and rate limit per host
+
+    Needs the aiohttp package (pip install aiohttp). The session is opened on the
+    first request, inside the running event loop; close() must be awaited.
+    """
+
+    def __init__(self, per_host=DEFAULT_PER_HOST, limiter=None, timeout=DEFAULT_TIMEOUT, max_body=MAX_BODY):
+        if aiohttp is None:
+            raise HTTPError("listing discovery needs the aiohttp package (pip install aiohttp)")
+        self.per_host = per_host
+        self.limiter = limiter
+        self.timeout = timeout
+        self.max_body = max_body
+        self.session = None
+        self.opened = 0
+        self.requests = 0
+
+    def _session(self):
+        if self.session is None:
+            trace = aiohttp.TraceConfig()
+            trace.on_connection_create_end.append(self._connection_opened)
+            # Per-socket timeouts, so time spent waiting for a free connection to the host does not count
+            self.session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=0, limit_per_host=self.per_host),
+                timeout=aiohttp.ClientTimeout(total=None, sock_connect=self.timeout, sock_read=self.timeout),
+                headers={'User-Agent': USER_AGENT, 'Accept': "text/html,*/*;q=0.8"},
+                trace_configs=[trace])
+        return self.session
+
+    async def _connection_opened(self, session, context, params):
+        self.opened += 1
+
+    async def get(self, url, headers=None):
+        """GET a URL, following redirects; raises HTTPError if no complete response arrives
+
+        `headers` are sent with every request, e.g. If-None-Match for a conditional GET.
+        """
+        for _ in range(MAX_REDIRECTS + 1):
+            response = await self._request(url, headers)
+            location = response.headers.get('location')
+            if response.status not in (301, 302, 303, 307, 308) or not location:
+                return response
+            url = urljoin(url, location)
+        raise HTTPError(f"too many redirects ({url})")
+
+    async def _request(self, url, headers=None):
+        parts = urlsplit(url)
+        if parts.scheme not in ('http', 'https') or not parts.hostname:
+            raise HTTPError(f"unsupported URL {url}")
+        if self.limiter:
+            while not self.limiter.try_acquire(parts.hostname):
+                await asyncio.sleep(self.limiter.delay(parts.hostname))
+        self.requests += 1
+        try:
+            # Redirects are followed by get() so every hop goes through the host's rate limit
+            async with self._session().get(url, headers=headers, allow_redirects=False) as response:
+                # Read to the end (whatever the framing); a page cut short would hide profile links
+                body = bytearray()
+                async for chunk in response.content.iter_chunked(READ_CHUNK):
+                    body += chunk
+                    if len(body) > self.max_body:
+                        raise HTTPError(f"response larger than {self.max_body} bytes")
+                return HTTPResponse(str(response.url), response.status,
+                                    {name.lower(): value for name, value in response.headers.items()}, bytes(body))
+        except asyncio.TimeoutError:
+            raise HTTPError(f"timed out after {self.timeout}s")
+        except (aiohttp.ClientError, ValueError) as e:
+            # Connection, TLS, framing and decompression failures fail this request, not the run
+            raise HTTPError(f"{parts.hostname}: {' '.join(str(e).split()) or e.__class__.__name__}")
+
+    async def close(self):
+        if self.session is not None:
+            await self.session.close()
+            self.session = None
+
+class DiscoveryCache:
+    """SQLite cache of search URLs and the profile links found on them"""
+
+    def __init__(self, db_path=DEFAULT_CACHE):
+        db_path = Path(db_path)
+        db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(str(db_path))
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("CREATE TABLE IF NOT EXISTS searches (url TEXT PRIMARY KEY, status INTEGER NOT NULL, "
+                          "candidates TEXT NOT NULL, fetched_at REAL NOT NULL)")
+
+    def get(self, url, ttl):
+        """(status, candidates) for a search fetched within `ttl` seconds, else None"""
+        row = self.conn.execute("SELECT status, candidates FROM searches WHERE url = ? AND fetched_at >= ?",
+                                (url, time.time() - ttl)).fetchone()
+        return (row[0], json.loads(row[1])) if row else None
+
+    def put(self, url, status, candidates):
+        with self.conn:
+            self.conn.execute("INSERT OR REPLACE INTO searches (url, status, candidates, fetched_at) VALUES (?, ?, ?, ?)",
+                              (url, status, json.dumps(candidates), time.time()))
+
+    def purge(self, ttl):
+        """Drop entries older than `ttl` seconds; returns how many"""
+        with self.conn:
+            return self.conn.execute("DELETE FROM searches WHERE fetched_at < ?", (time.time() - ttl,)).rowcount
+
+    def close(self):
+        self.conn.close()
+
+class ListingDiscovery:
+    """Runs every broker search for a set of customers and collects candidate profile URLs"""
+
+    def __init__(self, brokers, cache=None, ttl_days=DEFAULT_TTL_DAYS, concurrency=DEFAULT_CONCURRENCY,
+                 per_host=DEFAULT_PER_HOST, host_rate=DEFAULT_HOST_RATE, timeout=DEFAULT_TIMEOUT):
+        self.searches = get_searches(brokers)
+        self.cache = cache
+        self.ttl = ttl_days * 86400
+        self.concurrency = concurrency
+        self.per_host = per_host
+        self.limiter = host_limiter(self.searches, parse_rate(host_rate))
+        self.timeout = timeout
+        self.stats = {'searches': 0, 'cached': 0, 'fetched': 0, 'errors': 0, 'found': 0}
+        self.client = None
+
+    def jobs(self, customers):
+        """(customer, search pattern, URL) for every search a customer has the fields for"""
+        for customer in customers:
+            for search in self.searches.values():
+                url = search.search_url(customer)
+                if url:
+                    yield customer, search, url
+
+    async def _search(self, customer, search, url):
+        cached = self.cache.get(url, self.ttl) if self.cache else None
+        if cached:
+            self.stats['cached'] += 1
+            status, candidates = cached
+        else:
+            try:
+                response = await self.client.get(url)
+            except HTTPError as e:
+                self.stats['errors'] += 1
+                return self._result(customer, search, url, 'error', [], str(e))
+            status = response.status
+            candidates = extract_candidates(response.text(), response.url, search, customer) if status == 200 else []
+            self.stats['fetched'] += 1
+            if status not in CACHED_STATUSES:
+                self.stats['errors'] += 1
+                return self._result(customer, search, url, 'error', [], f"HTTP {status}")
+            if self.cache:
+                self.cache.put(url, status, candidates)
+        if candidates:
+            self.stats['found'] += 1
+        return self._result(customer, search, url, 'found' if candidates else 'not_found', candidates,
+                            cached=bool(cached))
+
+    @staticmethod
+    def _result(customer, search, url, status, candidates, message=None, cached=False):
+        result = {
+            'customer': customer_key(customer),
+            'broker': search.broker_name,
+            'key': search.key,
+            'search_url': url,
+            'status': status,
+            'candidates': candidates,
+            'cached': cached,
+        }
+        if message:
+            result['message'] = message
+        return result
+
+    async def _run(self, customers):
+        self.client = AsyncHTTPClient(self.per_host, self.limiter, self.timeout)
+        jobs = self.jobs(customers)
+        results = []
+
+        # A fixed set of workers pulls from the job iterator, so huge rosters never become one task each
+        async def worker():
+            for customer, search, url in jobs:
+                self.stats['searches'] += 1
+                results.append(await self._search(customer, search, url))
+
+        try:
+            await asyncio.gather(*(worker() for _ in range(self.concurrency)))
+        finally:
+            await self.client.close()
+        return results
+
+    def run(self, customers):
+        """Search every broker for every customer; returns one result dict per search"""
+        return asyncio.run(self._run(customers))
+
+def attach_listings(customers, results):
+    """Give each customer a 'listings' map {broker: {ask key: best profile URL}} from discovery results"""
+    found = {}
+    for result in results:
+        if result['candidates']:
+            found.setdefault(result['customer'], {})[result['broker']] = {result['key']: result['candidates'][0]}
+    for customer in customers:
+        listings = found.get(customer_key(customer))
+        if listings:
+            # Listings the customer already carries (e.g. from the re-listing monitor) take precedence
+            customer['listings'] = {**listings, **customer.get('listings', {})}
+    return customers
+
+def discover_roster(customers, brokers, ttl_days=DEFAULT_TTL_DAYS):
+    """Run discovery for a roster through the default cache and attach the listings it finds"""
+    customers = list(customers)
+    cache = DiscoveryCache()
+    try:
+        discovery = ListingDiscovery(brokers, cache, ttl_days=ttl_days)
+        results = discovery.run(customers)
+    except HTTPError as e:
+        print(f"  Warning: Listing discovery skipped: {e}")
+        return customers
+    finally:
+        cache.close()
+    stats = discovery.stats
+    print(f"Listing discovery: {stats['found']} of {stats['searches']} search(es) found a profile "
+          f"({stats['cached']} cached, {stats['errors']} error(s))")
+    return attach_listings(customers, results)
+
+def main():
+    from broker_registry import load_registry
+    from remove_data import load_roster
+
+    parser = argparse.ArgumentParser(description="Find customers' profile pages on people-search brokers")
+    parser.add_argument('--roster', required=True, help="CSV or JSONL roster (same format as remove_data.py --batch)")
+    parser.add_argument('--output', metavar='FILE', help="Write one JSON line per search")
+    parser.add_argument('--ttl-days', type=float, default=DEFAULT_TTL_DAYS,
+                        help=f"Reuse cached searches younger than this (default: {DEFAULT_TTL_DAYS})")
+    parser.add_argument('--concurrency', type=int, default=DEFAULT_CONCURRENCY,
+                        help=f"Searches in flight at once (default: {DEFAULT_CONCURRENCY})")
+    parser.add_argument('--per-host', type=int, default=DEFAULT_PER_HOST,
+                        help=f"Connections per broker host (default: {DEFAULT_PER_HOST})")
+    parser.add_argument('--host-rate', default=DEFAULT_HOST_RATE,
+                        help=f"Requests per broker host, e.g. 2/s or 60/min (default: {DEFAULT_HOST_RATE})")
+    parser.add_argument('--cache', default=str(DEFAULT_CACHE), help="Path to the discovery cache database")
+    args = parser.parse_args()
+    try:
+        parse_rate(args.host_rate)
+    except ValueError as e:
+        parser.error(str(e))
+
+    brokers = load_registry(Path(__file__).parent / "data_brokers.json")
+    cache = DiscoveryCache(args.cache)
+    discovery = ListingDiscovery(brokers, cache, args.ttl_days, args.concurrency, args.per_host, args.host_rate)
+    if not discovery.searches:
+        print("No broker in data_brokers.json has a search pattern.")
+        sys.exit(1)
+
+    print("="*80)
+    print("LISTING DISCOVERY")
+    print("="*80)
+    print(f"\nBrokers with a search pattern: {', '.join(discovery.searches)}\n")
+
+    start = time.perf_counter()
+    try:
+        results = discovery.run(load_roster(args.roster))
+    except HTTPError as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+    finally:
+        cache.purge(args.ttl_days * 86400)
+        cache.close()
+    elapsed = time.perf_counter() - start
+
+    for result in results:
+        if result['status'] == 'found':
+            print(f"  ✓ {result['customer']} → {result['broker']}: {result['candidates'][0]}")
+        elif result['status'] == 'error':
+            print(f"  ✗ {result['customer']} → {result['broker']}: {result['message']}")
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            for result in results:
+                f.write(json.dumps(result) + "\n")
+
+    stats = discovery.stats
+    print("\n" + "="*80)
+    print("DISCOVERY SUMMARY")
+    print("="*80)
+    print(f"Searches: {stats['searches']} ({stats['cached']} from cache, {stats['fetched']} fetched)")
+    print(f"✓ Profiles found: {stats['found']}")
+    print(f"✗ Errors: {stats['errors']}")
+    print(f"Connections opened: {discovery.client.opened} for {discovery.client.requests} request(s)")
+    if elapsed > 0:
+        print(f"Time: {elapsed:.1f}s")
+    print("="*80 + "\n")
+
+if __name__ == "__main__":
+    main()
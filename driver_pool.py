@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+Warm Browser Pool
+Keeps Chrome processes running between jobs instead of launching a new browser
+for every customer. Each released browser is wiped (cookies, storage, cache,
+extra windows) before the next customer gets it, and is recycled after a set
+number of jobs or when its JavaScript heap grows too large.
+"""
+
+import threading
+from urllib.parse import urlsplit
+
+DEFAULT_MAX_JOBS = 50
+DEFAULT_MAX_HEAP_GROWTH_MB = 512
+
+class DriverPool:
+    def __init__(self, factory, max_idle=4, max_jobs=DEFAULT_MAX_JOBS, max_heap_growth_mb=DEFAULT_MAX_HEAP_GROWTH_MB):
+        self.factory = factory
+        self.max_idle = max_idle
+        self.max_jobs = max_jobs
+        self.max_heap_growth = max_heap_growth_mb * 1024 * 1024 if max_heap_growth_mb else None
+        self.idle = []
+        self.info = {}
+        self.lock = threading.Lock()
+        self.stats = {'cold_starts': 0, 'warm_reuses': 0, 'recycled': 0, 'reset_failures': 0}
+
+    def acquire(self):
+        """Hand out a warm browser if one is idle, otherwise start a new one"""
+        with self.lock:
+            if self.idle:
+                driver = self.idle.pop()
+                self.stats['warm_reuses'] += 1
+                return driver
+            self.stats['cold_starts'] += 1
+        driver = self.factory()
+        with self.lock:
+            self.info[id(driver)] = {'jobs': 0, 'baseline_heap': _heap_used(driver)}
+        return driver
+
+    def release(self, driver):
+        """Return a browser after a job; it is wiped for reuse or recycled"""
+        if driver is None:
+            return
+        with self.lock:
+            info = self.info.setdefault(id(driver), {'jobs': 0, 'baseline_heap': None})
+            info['jobs'] += 1
+            jobs = info['jobs']
+
+        recycle = jobs >= self.max_jobs
+        if not recycle and self.max_heap_growth and info['baseline_heap'] is not None:
+            heap = _heap_used(driver)
+            recycle = heap is not None and heap - info['baseline_heap'] > self.max_heap_growth
+        if not recycle and not reset_session(driver):
+            with self.lock:
+                self.stats['reset_failures'] += 1
+            recycle = True
+
+        with self.lock:
+            if not recycle and len(self.idle) < self.max_idle:
+                self.idle.append(driver)
+                return
+            self.info.pop(id(driver), None)
+            if recycle:
+                self.stats['recycled'] += 1
+        _quit(driver)
+
+    def close_all(self):
+        """Quit every idle browser"""
+        with self.lock:
+            drivers, self.idle = self.idle, []
+            self.info.clear()
+        for driver in drivers:
+            _quit(driver)
+
+    def summary(self):
+        return (f"Browsers started: {self.stats['cold_starts']}, "
+                f"cold starts avoided: {self.stats['warm_reuses']}, "
+                f"recycled: {self.stats['recycled']}")
+
+def reset_session(driver):
+    """Isolate the next customer: close extra tabs and clear all browsing state
+
+    Returns False (so the browser is recycled) if the state could not be cleared.
+    """
+    if not hasattr(driver, 'execute_cdp_cmd'):
+        # Without DevTools there is no way to reach other origins' storage
+        return False
+    try:
+        origins = set()
+        handles = driver.window_handles
+        for handle in reversed(handles):
+            driver.switch_to.window(handle)
+            origins.update(_visited_origins(driver))
+            if handle != handles[0]:
+                driver.close()
+        driver.get("about:blank")
+        driver.execute_cdp_cmd('Network.clearBrowserCookies', {})
+        driver.execute_cdp_cmd('Network.clearBrowserCache', {})
+        # clearDataForOrigin takes one real origin at a time, not a wildcard
+        for origin in origins:
+            driver.execute_cdp_cmd('Storage.clearDataForOrigin', {'origin': origin, 'storageTypes': 'all'})
+        return True
+    except Exception:
+        return False
+
+def _visited_origins(driver):
+    """Origins in the current tab's history and its frames (iframes such as CAPTCHAs keep storage too)"""
+    urls = [entry['url'] for entry in driver.execute_cdp_cmd('Page.getNavigationHistory', {})['entries']]
+    frames = [driver.execute_cdp_cmd('Page.getFrameTree', {})['frameTree']]
+    while frames:
+        node = frames.pop()
+        urls.append(node['frame'].get('securityOrigin') or node['frame']['url'])
+        frames.extend(node.get('childFrames', ()))
+    origins = set()
+    for url in urls:
+        parts = urlsplit(url)
+        if parts.scheme in ('http', 'https') and parts.netloc:
+            origins.add(f"{parts.scheme}://{parts.netloc}")
+    return origins
+
+def _heap_used(driver):
+    try:
+        driver.execute_cdp_cmd('Performance.enable', {})
+        metrics = driver.execute_cdp_cmd('Performance.getMetrics', {})['metrics']
+        return next(m['value'] for m in metrics if m['name'] == 'JSHeapUsedSize')
+    except Exception:
+        return None
+
+def _quit(driver):
+    try:
+        driver.quit()
+    except Exception:
+        pass
@@ -0,0 +1,400 @@
+#!/usr/bin/env python3
+"""
+Email Dispatch
+Sends the generated removal request email to every broker that accepts requests
+by email (brokers with an "email" address in data_brokers.json), for a whole
+customer roster.
+
+- A small pool of persistent SMTP connections is reused across messages and
+  reconnected when the server drops one.
+- When the server advertises PIPELINING, MAIL FROM, RCPT TO and DATA go out in
+  one write, so each message costs two round trips instead of four.
+- A token bucket per recipient domain keeps any one broker from getting a burst.
+- Temporary failures (4xx replies, dropped connections, timeouts) are retried
+  with exponential backoff and jitter; 5xx rejections are final.
+- Results go into the status store, and customer/broker pairs that were already
+  emailed are skipped on the next run.
+
+The SMTP password is read from the SMTP_PASSWORD environment variable.
+
+Usage:
+  python3 email_dispatch.py --roster roster.csv --smtp smtp.example.com:587 --starttls --user me --from requests@example.com
+  python3 fake_smtp_server.py --port 8025 &
+  python3 email_dispatch.py --roster roster.csv --smtp 127.0.0.1:8025 --from requests@example.com
+"""
+
+import argparse
+import heapq
+import itertools
+import os
+import queue
+import random
+import re
+import smtplib
+import sys
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import datetime
+from email.message import EmailMessage
+from email.policy import SMTP as SMTP_POLICY
+from email.utils import formataddr, make_msgid
+from pathlib import Path
+
+from broker_registry import load_registry
+from checklist_templates import get_templates
+from rate_limit import DomainLimiter, backoff_delay, parse_rate
+from remove_data import load_roster
+from status_store import StatusStore
+
+DEFAULT_CONNECTIONS = 4
+DEFAULT_DOMAIN_RATE = "30/min"
+DEFAULT_ATTEMPTS = 5
+DEFAULT_BACKOFF = 2.0
+MAX_BACKOFF = 300.0
+
+# Requests in these states are not sent again
+SENT_STATUSES = ('success', 'submitted', 'confirmed')
+
+# Jobs read ahead of the send loop, so huge rosters are never loaded at once
+BACKLOG = 1000
+
+class SendError(Exception):
+    """A message could not be sent; `transient` says whether retrying may help"""
+
+    def __init__(self, message, transient):
+        super().__init__(message)
+        self.transient = transient
+
+class SMTPPool:
+    """Persistent SMTP connections handed out to sender threads and reused across messages"""
+
+    def __init__(self, host, port, username=None, password=None, starttls=False, use_ssl=False, size=DEFAULT_CONNECTIONS,
+                 timeout=30):
+        self.host = host
+        self.port = port
+        self.username = username
+        self.password = password
+        self.starttls = starttls
+        self.use_ssl = use_ssl
+        self.size = size
+        self.timeout = timeout
+        self.idle = queue.LifoQueue()
+        self.created = 0
+        self.opened = 0
+        self.lock = threading.Lock()
+
+    def _connect(self):
+        smtp_class = smtplib.SMTP_SSL if self.use_ssl else smtplib.SMTP
+        conn = smtp_class(self.host, self.port, timeout=self.timeout)
+        conn.ehlo()
+        if self.starttls:
+            conn.starttls()
+            conn.ehlo()
+        if self.username:
+            conn.login(self.username, self.password or "")
+        with self.lock:
+            self.opened += 1
+        return conn
+
+    def acquire(self):
+        try:
+            return self.idle.get_nowait()
+        except queue.Empty:
+            pass
+        with self.lock:
+            create = self.created < self.size
+            if create:
+                self.created += 1
+        if not create:
+            return self.idle.get()
+        try:
+            return self._connect()
+        except Exception:
+            with self.lock:
+                self.created -= 1
+            raise
+
+    def release(self, conn, broken=False):
+        if not broken:
+            self.idle.put(conn)
+            return
+        try:
+            conn.close()
+        except Exception:
+            pass
+        with self.lock:
+            self.created -= 1
+
+    def close(self):
+        while True:
+            try:
+                conn = self.idle.get_nowait()
+            except queue.Empty:
+                break
+            try:
+                conn.quit()
+            except Exception:
+                conn.close()
+
+def _dot_stuff(data):
+    """SMTP DATA payload: leading dots doubled and the terminating <CRLF>.<CRLF> added"""
+    data = re.sub(rb'(?m)^\.', b'..', data)
+    if not data.endswith(b"\r\n"):
+        data += b"\r\n"
+    return data + b".\r\n"
+
+def send_pipelined(conn, sender, recipient, data):
+    """Send one message, pipelining the envelope when the server allows it"""
+    conn.ehlo_or_helo_if_needed()
+    if not conn.has_extn('pipelining'):
+        conn.sendmail(sender, [recipient], data)
+        return
+    conn.send(f"MAIL FROM:<{sender}>\r\nRCPT TO:<{recipient}>\r\nDATA\r\n")
+    (mail_code, mail_reply), (rcpt_code, rcpt_reply), (data_code, data_reply) = [conn.getreply() for _ in range(3)]
+    if data_code == 354 and (mail_code != 250 or rcpt_code not in (250, 251)):
+        # The server should have refused DATA; end the empty message before reporting the failure
+        conn.send(".\r\n")
+        conn.getreply()
+    if mail_code != 250:
+        conn.rset()
+        raise smtplib.SMTPSenderRefused(mail_code, mail_reply, sender)
+    if rcpt_code not in (250, 251):
+        conn.rset()
+        raise smtplib.SMTPRecipientsRefused({recipient: (rcpt_code, rcpt_reply)})
+    if data_code != 354:
+        conn.rset()
+        raise smtplib.SMTPDataError(data_code, data_reply)
+    conn.send(_dot_stuff(data))
+    code, reply = conn.getreply()
+    if code != 250:
+        raise smtplib.SMTPDataError(code, reply)
+
+def _classify(error):
+    """SendError for an smtplib/socket failure, and whether the connection is still usable"""
+    if isinstance(error, smtplib.SMTPRecipientsRefused):
+        code, reply = next(iter(error.recipients.values()))
+        return SendError(f"{code} {reply.decode('utf-8', 'replace')}", 400 <= code < 500), False
+    if isinstance(error, smtplib.SMTPResponseException):
+        reply = error.smtp_error.decode('utf-8', 'replace') if isinstance(error.smtp_error, bytes) else error.smtp_error
+        return SendError(f"{error.smtp_code} {reply}", 400 <= error.smtp_code < 500), False
+    # Dropped connections, timeouts and socket errors: the connection is gone, the message may go through later
+    return SendError(str(error) or error.__class__.__name__, True), True
+
+class EmailDispatcher:
+    """Sends (customer, broker) jobs through an SMTPPool under per-domain rate limits with retries"""
+
+    def __init__(self, pool, sender, limiter, max_attempts=DEFAULT_ATTEMPTS, backoff=DEFAULT_BACKOFF,
+                 clock=time.monotonic, sleep=time.sleep, rng=None):
+        self.pool = pool
+        self.sender = sender
+        self.limiter = limiter
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self.clock = clock
+        self.sleep = sleep
+        self.rng = rng or random.Random()
+        self.retries = 0
+
+    def build_message(self, job):
+        customer = job['customer']
+        subject, _, body = job['text'].partition("\n")
+        message = EmailMessage()
+        message['From'] = formataddr((customer['name'], self.sender))
+        message['Reply-To'] = formataddr((customer['name'], customer['email']))
+        message['To'] = job['broker']['email']
+        message['Subject'] = subject.replace("Subject:", "", 1).strip()
+        message['Message-ID'] = make_msgid()
+        message.set_content(body.lstrip("\n"))
+        return message.as_bytes(policy=SMTP_POLICY)
+
+    def send(self, job):
+        """One delivery attempt; raises SendError"""
+        try:
+            conn = self.pool.acquire()
+        except (smtplib.SMTPException, OSError) as e:
+            raise _classify(e)[0]
+        broken = False
+        try:
+            send_pipelined(conn, self.sender, job['broker']['email'], self.build_message(job))
+        except (smtplib.SMTPException, OSError) as e:
+            error, broken = _classify(e)
+            raise error
+        finally:
+            self.pool.release(conn, broken)
+
+    def run(self, jobs, workers=None):
+        """Send every job; yields one result dict per (customer, broker) pair
+
+        Jobs wait in a heap ordered by when they may next be sent: a job whose domain
+        bucket is empty, or that is backing off after a failure, is pushed back while
+        the senders stay busy with other brokers.
+        """
+        workers = workers or self.pool.size
+        jobs = iter(jobs)
+        seq = itertools.count()
+        ready = []
+        in_flight = {}
+
+        def refill():
+            while len(ready) + len(in_flight) < BACKLOG:
+                job = next(jobs, None)
+                if job is None:
+                    return
+                job['attempts'] = 0
+                heapq.heappush(ready, (self.clock(), next(seq), job))
+
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            refill()
+            while ready or in_flight:
+                now = self.clock()
+                while ready and len(in_flight) < workers and ready[0][0] <= now:
+                    _, _, job = heapq.heappop(ready)
+                    domain = job['domain']
+                    if not self.limiter.try_acquire(domain):
+                        heapq.heappush(ready, (now + self.limiter.delay(domain), next(seq), job))
+                        continue
+                    job['attempts'] += 1
+                    in_flight[executor.submit(self.send, job)] = job
+
+                # With every sender busy only a completion can make progress
+                timeout = max(0.0, ready[0][0] - self.clock()) if ready and len(in_flight) < workers else None
+                if not in_flight:
+                    self.sleep(timeout or 0)
+                    continue
+                done, _ = wait(in_flight, timeout=timeout, return_when=FIRST_COMPLETED)
+                for future in done:
+                    job = in_flight.pop(future)
+                    error = future.exception()
+                    if error is None:
+                        yield self._result(job, 'success', f"Removal request emailed to {job['broker']['email']}")
+                    elif getattr(error, 'transient', False) and job['attempts'] < self.max_attempts:
+                        self.retries += 1
+                        delay = backoff_delay(job['attempts'], self.backoff, MAX_BACKOFF, self.rng)
+                        heapq.heappush(ready, (self.clock() + delay, next(seq), job))
+                    else:
+                        yield self._result(job, 'error', f"Email not sent: {error}")
+                refill()
+
+    @staticmethod
+    def _result(job, status, message):
+        return {
+            'customer': job['customer']['customer_id'],
+            'broker': job['broker']['name'],
+            'status': status,
+            'message': message,
+            'attempts': job['attempts'],
+            'timestamp': datetime.now().isoformat(),
+        }
+
+def email_jobs(customers, brokers, templates, store=None, skipped=None):
+    """(customer, broker) jobs for every email-method broker, rendering each customer's email once"""
+    email_brokers = [broker for broker in brokers if broker.get('email')]
+    for customer in customers:
+        sent = store.request_statuses(customer['customer_id']) if store else {}
+        text = None
+        for broker in email_brokers:
+            if sent.get(broker['name']) in SENT_STATUSES:
+                if skipped is not None:
+                    skipped.append((customer['customer_id'], broker['name']))
+                continue
+            if text is None:
+                fields = {key: customer.get(key, "") for key in ('address', 'phone', 'city', 'state', 'zip_code')}
+                text = templates.render_email(customer['name'], customer['email'], **fields)
+            yield {
+                'customer': customer,
+                'broker': broker,
+                'domain': broker['email'].rsplit('@', 1)[-1].lower(),
+                'text': text,
+            }
+
+def main():
+    parser = argparse.ArgumentParser(description="Email removal requests to brokers that accept them by email")
+    parser.add_argument('--roster', required=True, help="CSV or JSONL roster (same format as remove_data.py --batch)")
+    parser.add_argument('--from', dest='sender', required=True, help="Envelope sender / From address")
+    parser.add_argument('--smtp', default="localhost:25", help="SMTP server as host:port (default: localhost:25)")
+    parser.add_argument('--user', help="SMTP username (password from SMTP_PASSWORD)")
+    parser.add_argument('--starttls', action='store_true', help="Upgrade the connection with STARTTLS")
+    parser.add_argument('--ssl', action='store_true', help="Connect with implicit TLS (port 465)")
+    parser.add_argument('--connections', type=int, default=DEFAULT_CONNECTIONS,
+                        help=f"Persistent SMTP connections (default: {DEFAULT_CONNECTIONS})")
+    parser.add_argument('--domain-rate', default=DEFAULT_DOMAIN_RATE,
+                        help=f"Messages per recipient domain, e.g. 30/min or 2/s (default: {DEFAULT_DOMAIN_RATE})")
+    parser.add_argument('--attempts', type=int, default=DEFAULT_ATTEMPTS,
+                        help=f"Attempts per message before giving up (default: {DEFAULT_ATTEMPTS})")
+    parser.add_argument('--dry-run', action='store_true', help="List what would be sent without connecting")
+    args = parser.parse_args()
+
+    host, _, port = args.smtp.rpartition(':')
+    if not host or not port.isdigit():
+        parser.error("--smtp must be host:port")
+    try:
+        rate = parse_rate(args.domain_rate)
+    except ValueError as e:
+        parser.error(str(e))
+
+    brokers = load_registry(Path(__file__).parent / "data_brokers.json")
+    templates = get_templates(brokers)
+    store = StatusStore()
+    skipped = []
+    jobs = email_jobs(load_roster(args.roster), brokers, templates, store, skipped)
+
+    print("="*80)
+    print("EMAIL DISPATCH")
+    print("="*80)
+    print(f"\nBrokers taking email requests: {sum(1 for b in brokers if b.get('email'))}")
+    print(f"SMTP: {args.smtp} ({args.connections} connection(s)), {args.domain_rate} per domain\n")
+
+    if args.dry_run:
+        count = 0
+        for job in jobs:
+            count += 1
+            if count <= 20:
+                print(f"  → {job['customer']['customer_id']}: {job['broker']['name']} <{job['broker']['email']}>")
+        print(f"\n{count} message(s) would be sent, {len(skipped)} already sent\n")
+        store.close()
+        return
+
+    pool = SMTPPool(host, int(port), args.user, os.environ.get('SMTP_PASSWORD'), args.starttls, args.ssl,
+                    args.connections)
+    dispatcher = EmailDispatcher(pool, args.sender, DomainLimiter(rate), max_attempts=args.attempts)
+    start = time.perf_counter()
+    sent = failed = 0
+    pending = []
+    try:
+        for result in dispatcher.run(jobs):
+            pending.append(result)
+            if result['status'] == 'success':
+                sent += 1
+            else:
+                failed += 1
+                print(f"  ✗ {result['customer']} → {result['broker']}: {result['message']}")
+            if len(pending) >= 500:
+                store.record_results(pending)
+                pending = []
+            if (sent + failed) % 1000 == 0:
+                print(f"  Sent {sent} of {sent + failed} message(s)...")
+    except KeyboardInterrupt:
+        print("\n\n⏸️  Dispatch interrupted; run again to send the rest.")
+    finally:
+        if pending:
+            store.record_results(pending)
+        pool.close()
+        store.close()
+
+    elapsed = time.perf_counter() - start
+    print("\n" + "="*80)
+    print("DISPATCH SUMMARY")
+    print("="*80)
+    print(f"✓ Sent: {sent}")
+    print(f"✗ Failed: {failed}")
+    print(f"= Already sent (skipped): {len(skipped)}")
+    print(f"Retries: {dispatcher.retries}")
+    print(f"SMTP connections opened: {pool.opened}")
+    if elapsed > 0 and sent:
+        print(f"Throughput: {sent / elapsed * 3600:.0f} messages/hour")
+    print("="*80 + "\n")
+    sys.exit(0 if failed == 0 else 1)
+
+if __name__ == "__main__":
+    main()
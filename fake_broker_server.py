@@ -0,0 +1,383 @@
+#!/usr/bin/env python3
+"""
+Fake Broker Server
+A local HTTP server that serves opt-out forms for made-up brokers, so the
+automation can be benchmarked without touching real sites. Forms use the same
+field names, ids and autocomplete hints that process_generic looks for, and
+submitting one shows a confirmation page.
+
+Each broker also has a people-search page listing profile links for the name
+searched, so listing discovery can be tested the same way.
+
+Search pages can also be padded to a given size and sent close-delimited (no
+Content-Length, no ETag, body streamed until the connection closes), like a
+large dynamic results page, with the profile links at the end.
+
+Besides plain forms the server can misbehave on purpose: added latency (with
+jitter), slow inline scripts, HTTP 500s, hung responses, CAPTCHA widgets and
+pages without a form. Failure modes are drawn from a seeded random generator so
+runs are repeatable.
+
+Usage: python3 fake_broker_server.py [--port 8765] [--brokers 25] [--latency 0.05] [--error-rate 0.05]
+"""
+
+import argparse
+import random
+import re
+import threading
+import time
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, quote, urlsplit
+
+HANG_SECONDS = 30
+
+# Form markup variants so field matching by name, by id and by autocomplete is exercised
+FIELD_VARIANTS = (
+    """
+  <label for="f-name">Full name</label> <input id="f-name" name="name">
+  <label for="f-email">Email</label> <input id="f-email" name="email" type="email">
+  <label for="f-address">Address</label> <input id="f-address" name="address">
+  <label for="f-city">City</label> <input id="f-city" name="city">
+  <label for="f-state">State</label> <input id="f-state" name="state">
+  <label for="f-zip">ZIP</label> <input id="f-zip" name="zip">
+  <label for="f-phone">Phone</label> <input id="f-phone" name="phone" type="tel">""",
+    """
+  <label for="full_name">Full name</label> <input id="full_name" name="q1">
+  <label for="email_address">Email</label> <input id="email_address" name="q2" type="email">
+  <label for="street_address">Address</label> <input id="street_address" name="q3">
+  <label for="zipcode">ZIP</label> <input id="zipcode" name="q4">""",
+    """
+  <input name="a" autocomplete="name" placeholder="Name">
+  <input name="b" autocomplete="email" placeholder="Email">
+  <input name="c" autocomplete="street-address" placeholder="Address">
+  <input name="d" autocomplete="address-level2" placeholder="City">
+  <input name="e" autocomplete="address-level1" placeholder="State">
+  <input name="f" autocomplete="postal-code" placeholder="ZIP">
+  <input name="g" autocomplete="tel" placeholder="Phone">""",
+)
+
+FORM_PAGE = """<!DOCTYPE html>
+<html><head><title>Fake Broker {idx} - Opt Out</title>{script}</head>
+<body>
+<h1>Fake Broker {idx} opt-out</h1>
+<form id="optout" method="post" action="/broker/{idx}/submit">{fields}
+  <label><input id="agree" name="agree" type="checkbox" value="yes"> I am this person</label>
+  {captcha}
+  <button type="submit">Remove my information</button>
+</form>
+</body></html>
+"""
+
+NO_FORM_PAGE = """<!DOCTYPE html>
+<html><head><title>Fake Broker {idx}</title></head>
+<body><p>Search for your listing first.</p></body></html>
+"""
+
+# Recipe selectors matching each variant above
+RECIPE_FIELDS = (
+    {'name': "input[name='name']", 'email': "input[name='email']"},
+    {'name': "#full_name", 'email': "#email_address"},
+    {'name': "input[autocomplete='name']", 'email': "input[autocomplete='email']"},
+)
+
+CONFIRM_PAGE = """<!DOCTYPE html>
+<html><head><title>Fake Broker {idx} - Received</title></head>
+<body><p class="confirmation">Request received.</p></body></html>
+"""
+
+SEARCH_PAGE = """<!DOCTYPE html>
+<html><head><title>Fake Broker {idx} - Search</title></head>
+<body>
+<nav><a href="/">Home</a> <a href="/broker/{idx}/optout">Opt out</a> <a href="/about">About</a></nav>
+{padding}<ul class="results">{results}</ul>
+</body></html>
+"""
+
+# Filler for padded search pages: the same on every request, so the page only changes with its results
+PADDING_LINE = '<p class="ad">Sponsored: find anyone, anywhere, instantly.</p>\n'
+# Close-delimited pages go out in pieces of this size
+STREAM_CHUNK = 16384
+
+SEARCH_RESULT = '<li><a href="/broker/{idx}/person/{slug}-{person_id}">{name}, {age}</a></li>'
+
+PROFILE_PAGE = """<!DOCTYPE html>
+<html><head><title>Fake Broker {idx} - Profile</title></head>
+<body><h1>{slug}</h1></body></html>
+"""
+
+CAPTCHA_WIDGET = '<div class="g-recaptcha" data-sitekey="fake"></div>'
+
+# Blocks the main thread before DOMContentLoaded, like a heavy tag manager
+SLOW_SCRIPT = "<script>const end = Date.now() + {ms}; while (Date.now() < end) {{}}</script>"
+
+def _slug(name):
+    return re.sub(r'[^a-z0-9]+', '-', name.lower()).strip('-')
+
+class FakeBrokerHandler(BaseHTTPRequestHandler):
+    # Keep-alive, like real broker sites; every response carries a Content-Length
+    protocol_version = "HTTP/1.1"
+    # Headers and body are separate writes; do not let Nagle hold the body back on a kept-alive connection
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        idx = self._broker_idx()
+        path = urlsplit(self.path).path
+        if idx is not None and path.endswith('/search'):
+            self._search(idx)
+            return
+        if idx is not None and '/person/' in path:
+            self._send(200, PROFILE_PAGE.format(idx=idx, slug=path.rsplit('/', 1)[-1]))
+            return
+        if idx is None or not path.endswith('/optout'):
+            self._send(404, "Not found")
+            return
+        server = self.server
+        mode = server.roll()
+        server.count(mode)
+        if not self._misbehave(mode):
+            return
+        if mode == 'no_form':
+            self._send(200, NO_FORM_PAGE.format(idx=idx))
+            return
+        script = SLOW_SCRIPT.format(ms=server.slow_script_ms) if server.slow_script_ms else ""
+        self._send(200, FORM_PAGE.format(idx=idx, script=script,
+                                         fields=FIELD_VARIANTS[idx % len(FIELD_VARIANTS)],
+                                         captcha=CAPTCHA_WIDGET if mode == 'captcha' else ""))
+
+    def _misbehave(self, mode):
+        """Apply the hang and error modes; False if the response has been sent"""
+        if mode == 'hang':
+            time.sleep(self.server.hang_seconds)
+        if mode == 'error':
+            self._send(500, "Internal Server Error")
+            return False
+        return True
+
+    def _search(self, idx):
+        # Each name has one or two listings, the same on every request
+        server = self.server
+        mode = server.roll()
+        server.count('search')
+        if not self._misbehave(mode):
+            return
+        name = parse_qs(urlsplit(self.path).query).get('name', [''])[0].strip()
+        slug = _slug(name)
+        results = []
+        if slug and (idx, slug) not in server.removed:
+            seed = zlib.crc32(f"{idx}:{slug}".encode('utf-8'))
+            for n in range(1 + seed % 2):
+                results.append(SEARCH_RESULT.format(idx=idx, slug=quote(slug), person_id=seed % 100000 + n,
+                                                    name=name, age=30 + (seed >> n) % 50))
+        padding = PADDING_LINE * (server.search_padding // len(PADDING_LINE))
+        body = SEARCH_PAGE.format(idx=idx, padding=padding, results="".join(results))
+        if server.close_delimited:
+            self._stream(body)
+            return
+        # Conditional GETs get a 304 while the results have not changed
+        etag = f'"{zlib.crc32(body.encode("utf-8")):08x}"'
+        if self.headers.get('If-None-Match') == etag:
+            server.count('not_modified')
+            self._send(304, "", {'ETag': etag})
+            return
+        self._send(200, body, {'ETag': etag})
+
+    def do_POST(self):
+        idx = self._broker_idx()
+        length = int(self.headers.get('Content-Length') or 0)
+        form = parse_qs(self.rfile.read(length).decode('utf-8'))
+        if idx is None or not form.get('agree'):
+            self._send(400, "Missing consent")
+            return
+        self.server.count('submitted')
+        self._send(200, CONFIRM_PAGE.format(idx=idx))
+
+    def _broker_idx(self):
+        parts = urlsplit(self.path).path.strip('/').split('/')
+        if len(parts) >= 2 and parts[0] == 'broker' and parts[1].isdigit():
+            return int(parts[1])
+        return None
+
+    def _send(self, status, body, headers=None):
+        self.server.delay()
+        data = body.encode('utf-8')
+        self.send_response(status)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        if status != 304:
+            self.send_header('Content-Type', 'text/html; charset=utf-8')
+            self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        if data:
+            self.wfile.write(data)
+
+    def _stream(self, body):
+        """Send a 200 with no Content-Length; the end of the body is the end of the connection"""
+        self.server.delay()
+        data = body.encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/html; charset=utf-8')
+        self.send_header('Connection', 'close')
+        self.end_headers()
+        self.close_connection = True
+        try:
+            for start in range(0, len(data), STREAM_CHUNK):
+                self.wfile.write(data[start:start + STREAM_CHUNK])
+                self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            # The client stopped reading (e.g. it gave up on the page); nothing else to send
+            pass
+
+    def log_message(self, format, *args):
+        pass
+
+class _FakeHTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def roll(self):
+        """Pick how the next form page behaves"""
+        with self.lock:
+            draw = self.rng.random()
+        for mode, rate in self.failure_rates:
+            if draw < rate:
+                return mode
+            draw -= rate
+        return 'ok'
+
+    def delay(self):
+        if self.latency or self.jitter:
+            with self.lock:
+                extra = self.rng.uniform(0, self.jitter) if self.jitter else 0.0
+            time.sleep(self.latency + extra)
+
+    def count(self, key):
+        with self.lock:
+            self.stats[key] = self.stats.get(key, 0) + 1
+
+class FakeBrokerServer:
+    """Runs the fake brokers on a background thread; usable as a context manager"""
+
+    def __init__(self, port=0, latency=0.0, jitter=0.0, slow_script_ms=0, error_rate=0.0, hang_rate=0.0,
+                 captcha_rate=0.0, no_form_rate=0.0, seed=0, hang_seconds=HANG_SECONDS, search_padding=0,
+                 close_delimited=False):
+        self.httpd = _FakeHTTPServer(('127.0.0.1', port), FakeBrokerHandler)
+        self.httpd.latency = latency
+        self.httpd.jitter = jitter
+        self.httpd.slow_script_ms = slow_script_ms
+        self.httpd.hang_seconds = hang_seconds
+        self.httpd.failure_rates = (('error', error_rate), ('hang', hang_rate),
+                                    ('captcha', captcha_rate), ('no_form', no_form_rate))
+        self.httpd.rng = random.Random(seed)
+        self.httpd.lock = threading.Lock()
+        self.httpd.stats = {}
+        self.httpd.removed = set()
+        # Bytes of filler before the search results, and whether search pages are close-delimited
+        self.httpd.search_padding = search_padding
+        self.httpd.close_delimited = close_delimited
+        self.thread = None
+
+    @property
+    def base_url(self):
+        return f"http://127.0.0.1:{self.httpd.server_address[1]}"
+
+    @property
+    def stats(self):
+        """Pages served by mode ('ok', 'error', 'hang', 'captcha', 'no_form'), plus searches, 304s and submissions"""
+        return dict(self.httpd.stats)
+
+    @property
+    def submissions(self):
+        return self.httpd.stats.get('submitted', 0)
+
+    def start(self):
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def remove_listing(self, idx, name):
+        """Drop a person from broker idx's search results"""
+        self.httpd.removed.add((idx, _slug(name)))
+
+    def relist(self, idx, name):
+        """Put a removed person back into broker idx's search results"""
+        self.httpd.removed.discard((idx, _slug(name)))
+
+    def broker(self, idx, recipes=True):
+        """One broker entry (data_brokers.json format) served by this server"""
+        broker = {
+            'name': f"Fake Broker {idx}",
+            'website': self.base_url,
+            'opt_out_url': f"{self.base_url}/broker/{idx}/optout",
+            'method': 'web_form',
+            'email': None,
+            'search': {
+                'url': f"{self.base_url}/broker/{idx}/search?name={{name}}&city={{city}}&state={{state}}",
+                'profile': rf"^{re.escape(self.base_url)}/broker/{idx}/person/[^/?#]+$",
+            },
+        }
+        if recipes:
+            broker['recipe'] = {
+                'wait': "form#optout",
+                'fields': RECIPE_FIELDS[idx % len(RECIPE_FIELDS)],
+                'check': ["#agree"],
+                'submit': "button[type='submit']",
+                'success': {'selector': ".confirmation"},
+            }
+        return broker
+
+    def brokers(self, count, recipes=True):
+        """Entries for `count` fake brokers, with recipes by default"""
+        return [self.broker(idx, recipes) for idx in range(1, count + 1)]
+
+    def mimic(self, registry, recipes=False):
+        """Local stand-ins for the web-form brokers in a registry (renamed so no dedicated handler fires)"""
+        brokers = []
+        for idx, real in enumerate(registry.with_method('web_form'), 1):
+            broker = self.broker(idx, recipes)
+            broker['name'] = f"{real['name']} (fake)"
+            for key in ('wait_strategy', 'wait_selector', 'resource_blocking'):
+                if real.get(key):
+                    broker[key] = real[key]
+            brokers.append(broker)
+        return brokers
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve fake data broker opt-out forms")
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--brokers', type=int, default=25, help="Number of brokers to list")
+    parser.add_argument('--latency', type=float, default=0.0, help="Seconds added to every response")
+    parser.add_argument('--jitter', type=float, default=0.0, help="Up to this many extra random seconds")
+    parser.add_argument('--slow-script-ms', type=int, default=0, help="Main-thread block before the form renders")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="Share of pages answered with HTTP 500")
+    parser.add_argument('--hang-rate', type=float, default=0.0, help=f"Share of pages delayed {HANG_SECONDS}s")
+    parser.add_argument('--captcha-rate', type=float, default=0.0, help="Share of forms with a CAPTCHA widget")
+    parser.add_argument('--no-form-rate', type=float, default=0.0, help="Share of pages without a form")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--search-padding', type=int, default=0, help="Bytes of filler before search results")
+    parser.add_argument('--close-delimited', action='store_true',
+                        help="Send search pages without Content-Length, ending the body by closing the connection")
+    args = parser.parse_args()
+
+    server = FakeBrokerServer(args.port, args.latency, args.jitter, args.slow_script_ms, args.error_rate,
+                              args.hang_rate, args.captcha_rate, args.no_form_rate, args.seed,
+                              search_padding=args.search_padding, close_delimited=args.close_delimited)
+    print(f"Serving {args.brokers} fake brokers at {server.base_url}/broker/<n>/optout (Ctrl-C to stop)")
+    for broker in server.brokers(args.brokers)[:3]:
+        print(f"  {broker['opt_out_url']}")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        server.stop()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+"""
+Fake SMTP Server
+A local SMTP stand-in that accepts messages and keeps them in memory, so the
+email dispatcher can be tested and benchmarked without sending real mail.
+It speaks enough ESMTP for smtplib (EHLO, MAIL, RCPT, DATA, RSET, NOOP, QUIT)
+and can misbehave on purpose: added latency, temporary 4xx rejections and
+dropped connections, drawn from a seeded random generator.
+
+Usage: python3 fake_smtp_server.py [--port 8025] [--latency 0.01] [--transient-rate 0.05] [--drop-rate 0.01]
+"""
+
+import argparse
+import random
+import socketserver
+import threading
+import time
+
+class FakeSMTPHandler(socketserver.StreamRequestHandler):
+    # Pipelined replies are several small writes; do not let Nagle hold them back
+    disable_nagle_algorithm = True
+
+    def handle(self):
+        server = self.server
+        server.count('connections')
+        self.reply("220 fake-smtp ESMTP ready")
+        mail_from = None
+        recipients = []
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            command = line.decode('utf-8', 'replace').strip()
+            verb = command[:4].upper()
+            server.delay()
+            if verb in ('EHLO', 'HELO'):
+                self.reply("250-fake-smtp", "250-PIPELINING", "250-8BITMIME", "250 SIZE 10485760")
+            elif verb == 'MAIL':
+                mode = server.roll()
+                if mode == 'drop':
+                    server.count('dropped')
+                    return
+                if mode == 'transient':
+                    server.count('transient')
+                    self.reply("451 4.7.1 Try again later")
+                    continue
+                mail_from = command[10:].strip()
+                recipients = []
+                self.reply("250 OK")
+            elif verb == 'RCPT':
+                recipients.append(command[8:].strip())
+                self.reply("250 OK")
+            elif verb == 'DATA':
+                if not mail_from or not recipients:
+                    self.reply("503 Bad sequence of commands")
+                    continue
+                self.reply("354 End data with <CR><LF>.<CR><LF>")
+                data = self.read_data()
+                if data is None:
+                    return
+                server.store(mail_from, recipients, data)
+                mail_from = None
+                recipients = []
+                self.reply("250 OK queued")
+            elif verb == 'RSET':
+                mail_from = None
+                recipients = []
+                self.reply("250 OK")
+            elif verb == 'NOOP':
+                self.reply("250 OK")
+            elif verb == 'QUIT':
+                self.reply("221 Bye")
+                return
+            else:
+                self.reply("502 Command not implemented")
+
+    def read_data(self):
+        lines = []
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return None
+            if line in (b".\r\n", b".\n"):
+                return b"".join(lines)
+            # Undo dot-stuffing
+            lines.append(line[1:] if line.startswith(b"..") else line)
+
+    def reply(self, *lines):
+        self.wfile.write("".join(f"{line}\r\n" for line in lines).encode('utf-8'))
+
+class _FakeSMTPServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def roll(self):
+        """Pick how the next MAIL command is answered"""
+        with self.lock:
+            draw = self.rng.random()
+        if draw < self.drop_rate:
+            return 'drop'
+        if draw < self.drop_rate + self.transient_rate:
+            return 'transient'
+        return 'ok'
+
+    def delay(self):
+        if self.latency:
+            time.sleep(self.latency)
+
+    def count(self, key):
+        with self.lock:
+            self.stats[key] = self.stats.get(key, 0) + 1
+
+    def store(self, mail_from, recipients, data):
+        with self.lock:
+            self.stats['accepted'] = self.stats.get('accepted', 0) + 1
+            if self.keep_messages:
+                self.messages.append({'from': mail_from, 'to': recipients, 'data': data})
+
+class FakeSMTPServer:
+    """Runs the fake SMTP server on a background thread; usable as a context manager"""
+
+    def __init__(self, port=0, latency=0.0, transient_rate=0.0, drop_rate=0.0, seed=0, keep_messages=True):
+        self.server = _FakeSMTPServer(('127.0.0.1', port), FakeSMTPHandler)
+        self.server.latency = latency
+        self.server.transient_rate = transient_rate
+        self.server.drop_rate = drop_rate
+        self.server.rng = random.Random(seed)
+        self.server.lock = threading.Lock()
+        self.server.stats = {}
+        self.server.messages = []
+        self.server.keep_messages = keep_messages
+        self.thread = None
+
+    @property
+    def host(self):
+        return '127.0.0.1'
+
+    @property
+    def port(self):
+        return self.server.server_address[1]
+
+    @property
+    def messages(self):
+        """Accepted messages as {'from', 'to', 'data'} dicts"""
+        return list(self.server.messages)
+
+    @property
+    def stats(self):
+        """Counts of 'connections', 'accepted', 'transient' and 'dropped'"""
+        return dict(self.server.stats)
+
+    def start(self):
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a local SMTP stand-in that accepts and discards mail")
+    parser.add_argument('--port', type=int, default=8025)
+    parser.add_argument('--latency', type=float, default=0.0, help="Seconds added to every command")
+    parser.add_argument('--transient-rate', type=float, default=0.0, help="Share of messages answered with 451")
+    parser.add_argument('--drop-rate', type=float, default=0.0, help="Share of messages whose connection is dropped")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    server = FakeSMTPServer(args.port, args.latency, args.transient_rate, args.drop_rate, args.seed,
+                            keep_messages=False)
+    print(f"Fake SMTP server listening on {server.host}:{server.port} (Ctrl-C to stop)")
+    try:
+        server.server.serve_forever()
+    except KeyboardInterrupt:
+        print(f"\n{server.stats}")
+        server.stop()
+
+if __name__ == "__main__":
+    main()
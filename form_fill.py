@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+"""
+Scripted Form Discovery and Filling
+Collects every form field on the page with one execute_script call, matches the
+fields against the common field names in Python, and fills all matches with a
+second scripted call. This replaces dozens of find_element round-trips (and the
+NoSuchElementException raised by every miss) with two WebDriver calls per page.
+"""
+
+# (user_info key, label, candidate names/ids, autocomplete tokens) in fill order
+FIELD_GROUPS = (
+    ('name', 'name', ('name', 'full_name', 'fullname', 'fname', 'first_name', 'firstname'), ('name',)),
+    ('email', 'email', ('email', 'email_address', 'e-mail', 'emailaddress'), ('email',)),
+    ('address', 'address', ('address', 'street', 'street_address'), ('street-address', 'address-line1')),
+    ('city', 'city', ('city',), ('address-level2',)),
+    ('state', 'state', ('state',), ('address-level1',)),
+    ('zip_code', 'ZIP', ('zip', 'zipcode', 'zip_code', 'postal'), ('postal-code',)),
+    ('phone', 'phone', ('phone', 'phone_number', 'telephone'), ('tel',)),
+)
+
+SKIPPED_TYPES = ('hidden', 'submit', 'button', 'image', 'reset', 'checkbox', 'radio', 'file')
+
+# Tags each usable field with data-optout-idx and returns its attributes in one payload
+DISCOVER_FIELDS_JS = """
+const fields = [];
+document.querySelectorAll('input, textarea, select').forEach((el) => {
+    const type = (el.getAttribute('type') || el.tagName).toLowerCase();
+    if (el.disabled || el.readOnly || arguments[0].includes(type)) {
+        return;
+    }
+    const idx = fields.length;
+    el.setAttribute('data-optout-idx', idx);
+    let label = '';
+    if (el.labels && el.labels.length) {
+        label = el.labels[0].textContent.trim();
+    }
+    fields.push({
+        idx: idx,
+        name: el.name || '',
+        id: el.id || '',
+        type: type,
+        label: label,
+        autocomplete: el.getAttribute('autocomplete') || '',
+        placeholder: el.getAttribute('placeholder') || ''
+    });
+});
+return fields;
+"""
+
+# Sets every value through the native setter so framework listeners see the change
+FILL_FIELDS_JS = """
+let filled = 0;
+for (const [idx, value] of arguments[0]) {
+    const el = document.querySelector('[data-optout-idx="' + idx + '"]');
+    if (!el) {
+        continue;
+    }
+    const proto = Object.getPrototypeOf(el);
+    const setter = Object.getOwnPropertyDescriptor(proto, 'value');
+    el.focus();
+    if (setter && setter.set) {
+        setter.set.call(el, value);
+    } else {
+        el.value = value;
+    }
+    el.dispatchEvent(new Event('input', {bubbles: true}));
+    el.dispatchEvent(new Event('change', {bubbles: true}));
+    el.blur();
+    filled++;
+}
+return filled;
+"""
+
+# Recipe variant: fills [selector, value] pairs and returns the selectors that matched nothing
+FILL_SELECTORS_JS = """
+const missing = [];
+for (const [selector, value] of arguments[0]) {
+    const el = document.querySelector(selector);
+    if (!el) {
+        missing.push(selector);
+        continue;
+    }
+    if (el.type === 'checkbox' || el.type === 'radio') {
+        if (!el.checked) {
+            el.click();
+        }
+        continue;
+    }
+    const proto = Object.getPrototypeOf(el);
+    const setter = Object.getOwnPropertyDescriptor(proto, 'value');
+    el.focus();
+    if (setter && setter.set) {
+        setter.set.call(el, value);
+    } else {
+        el.value = value;
+    }
+    el.dispatchEvent(new Event('input', {bubbles: true}));
+    el.dispatchEvent(new Event('change', {bubbles: true}));
+    el.blur();
+}
+return missing;
+"""
+
+# Things on the page that an unattended run cannot get past on its own
+PAGE_BLOCKERS_JS = """
+const found = [];
+if (document.querySelector('iframe[src*="recaptcha"], iframe[src*="hcaptcha"], iframe[src*="turnstile"], .g-recaptcha, .h-captcha, .cf-turnstile')) {
+    found.push('CAPTCHA');
+}
+if (document.querySelector('input[type="file"]')) {
+    found.push('ID upload');
+}
+return found;
+"""
+
+def page_blockers(driver):
+    """Return the human-only steps visible on the page (CAPTCHA, ID upload)"""
+    try:
+        return driver.execute_script(PAGE_BLOCKERS_JS) or []
+    except Exception:
+        return []
+
+def discover_fields(driver):
+    """Return every fillable field on the current page (one WebDriver call)"""
+    return driver.execute_script(DISCOVER_FIELDS_JS, list(SKIPPED_TYPES)) or []
+
+def match_fields(fields, user_info, groups=FIELD_GROUPS):
+    """Match discovered fields to user_info values; returns [(label, idx, value)]"""
+    by_name = {}
+    by_id = {}
+    by_autocomplete = {}
+    for field in fields:
+        by_name.setdefault(field['name'].lower(), field)
+        by_id.setdefault(field['id'].lower(), field)
+        for token in field['autocomplete'].lower().split():
+            by_autocomplete.setdefault(token, field)
+
+    matches = []
+    used = set()
+    for key, label, candidates, autocomplete in groups:
+        value = user_info.get(key)
+        if not value:
+            continue
+        # Same priority as the old find_element(By.NAME) loop, then ids, then autocomplete hints
+        field = (next((by_name[c] for c in candidates if c in by_name and by_name[c]['idx'] not in used), None)
+                 or next((by_id[c] for c in candidates if c in by_id and by_id[c]['idx'] not in used), None)
+                 or next((by_autocomplete[t] for t in autocomplete if t in by_autocomplete and by_autocomplete[t]['idx'] not in used), None))
+        if field is not None:
+            used.add(field['idx'])
+            matches.append((label, field['idx'], value))
+    return matches
+
+def fill_fields(driver, matches):
+    """Fill all matched fields in one scripted batch (one WebDriver call)"""
+    if not matches:
+        return 0
+    return driver.execute_script(FILL_FIELDS_JS, [[idx, value] for _, idx, value in matches])
+
+def fill_selectors(driver, pairs):
+    """Fill known (selector, value) pairs in one call; returns selectors not found"""
+    if not pairs:
+        return []
+    return driver.execute_script(FILL_SELECTORS_JS, [[selector, value] for selector, value in pairs]) or []
+
+def autofill_form(driver, user_info, groups=FIELD_GROUPS):
+    """Discover, match and fill the page's form; returns the labels that were filled"""
+    matches = match_fields(discover_fields(driver), user_info, groups)
+    fill_fields(driver, matches)
+    return [label for label, _, _ in matches]
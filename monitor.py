@@ -0,0 +1,350 @@
+#!/usr/bin/env python3
+"""
+Re-listing Monitor
+Brokers re-list people after a removal. The monitor re-runs a broker's search
+(see discovery.py) for (customer, broker) pairs whose removal is due for
+verification, and only when a profile shows up again does it queue a new
+opt-out.
+
+- Pairs are enrolled from a roster once their request is removed (success,
+  submitted or confirmed). The first check is due 45 days after submission,
+  later ones every --recheck-days, spread out with jitter.
+- Due pairs come from an index on the next check time, in batches, so a pass
+  only reads what is due even with millions of pairs enrolled.
+- Checks are conditional GETs (If-None-Match / If-Modified-Since). A 304, or a
+  200 whose body hash is unchanged, ends the check without parsing the page.
+- A listing counts as reappeared when the page has profile links and their
+  fingerprint differs from the last check. The request is marked "relisted" in
+  the status store and a job is appended to logs/relisted_jobs.jsonl, which
+  auto_optout.py --roster ... --relisted runs. That run only picks up pairs
+  the status store still marks "relisted", so a job runs once per relisting.
+
+Usage:
+  python3 monitor.py --roster roster.csv            # enroll newly removed pairs, then check what is due
+  python3 monitor.py                                # check what is due
+  python3 monitor.py --every 60                     # check every 60 minutes until Ctrl-C
+"""
+
+import argparse
+import asyncio
+import hashlib
+import json
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from discovery import (DEFAULT_CONCURRENCY, DEFAULT_HOST_RATE, DEFAULT_PER_HOST, DEFAULT_TIMEOUT, AsyncHTTPClient,
+                       HTTPError, extract_candidates, get_searches, host_limiter)
+from rate_limit import parse_rate
+from results_journal import customer_key
+from status_store import FOLLOW_UP_DAYS, StatusStore
+
+JOBS_NAME = "relisted_jobs.jsonl"
+DEFAULT_RECHECK_DAYS = 30
+RETRY_HOURS = 6
+BATCH_SIZE = 2000
+JITTER = 0.1
+
+# Requests in these states have been removed and are worth verifying
+REMOVED_STATUSES = ('success', 'submitted', 'confirmed')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS monitor (
+    request_id INTEGER PRIMARY KEY REFERENCES requests(id),
+    url TEXT NOT NULL,
+    etag TEXT,
+    last_modified TEXT,
+    body_hash TEXT,
+    fingerprint TEXT,
+    next_check_at TEXT NOT NULL,
+    checked_at TEXT,
+    checks INTEGER NOT NULL DEFAULT 0,
+    relisted_at TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_monitor_next_check ON monitor (next_check_at);
+"""
+
+ENROLL_SQL = f"""
+INSERT INTO monitor (request_id, url, next_check_at)
+SELECT r.id, ?, strftime('%Y-%m-%dT%H:%M:%S', COALESCE(r.confirmed_at, r.submitted_at), '+{FOLLOW_UP_DAYS} days')
+FROM requests r
+WHERE r.customer_id = (SELECT id FROM customers WHERE customer_key = ?)
+  AND r.broker_id = (SELECT id FROM brokers WHERE name = ?)
+  AND r.status IN ({", ".join("?" * len(REMOVED_STATUSES))})
+  AND r.submitted_at IS NOT NULL
+ON CONFLICT (request_id) DO UPDATE SET url = excluded.url, etag = NULL, last_modified = NULL, body_hash = NULL
+WHERE url != excluded.url
+"""
+
+def _hash(data):
+    return hashlib.sha256(data).hexdigest()[:32]
+
+class RelistingMonitor:
+    """Enrolls removed (customer, broker) pairs and re-checks the ones that are due"""
+
+    def __init__(self, store, brokers, log_dir, recheck_days=DEFAULT_RECHECK_DAYS, concurrency=DEFAULT_CONCURRENCY,
+                 per_host=DEFAULT_PER_HOST, host_rate=DEFAULT_HOST_RATE, timeout=DEFAULT_TIMEOUT, rng=None):
+        self.store = store
+        self.searches = get_searches(brokers)
+        self.jobs_path = Path(log_dir) / JOBS_NAME
+        self.recheck = timedelta(days=recheck_days)
+        self.concurrency = concurrency
+        self.per_host = per_host
+        self.host_rate = parse_rate(host_rate)
+        self.timeout = timeout
+        self.rng = rng or random.Random()
+        self.stats = {'enrolled': 0, 'checked': 0, 'not_modified': 0, 'unchanged': 0, 'changed': 0,
+                      'relisted': 0, 'errors': 0, 'skipped': 0, 'bytes': 0}
+        with store.lock, store.conn:
+            store.conn.executescript(SCHEMA)
+
+    def enroll(self, customers):
+        """Start monitoring removed pairs for these customers; returns how many rows were added or updated"""
+        params = []
+        enrolled = 0
+        for customer in customers:
+            key = customer_key(customer)
+            for search in self.searches.values():
+                url = search.search_url(customer)
+                if url:
+                    params.append((url, key, search.broker_name) + REMOVED_STATUSES)
+            if len(params) >= BATCH_SIZE:
+                enrolled += self._enroll(params)
+                params = []
+        if params:
+            enrolled += self._enroll(params)
+        self.stats['enrolled'] += enrolled
+        return enrolled
+
+    def _enroll(self, params):
+        with self.store.lock, self.store.conn:
+            before = self.store.conn.total_changes
+            self.store.conn.executemany(ENROLL_SQL, params)
+            return self.store.conn.total_changes - before
+
+    def due(self, now, limit=BATCH_SIZE):
+        """Up to `limit` monitored pairs whose next check is due, oldest first"""
+        with self.store.lock:
+            return self.store.conn.execute(
+                "SELECT m.request_id, m.url, m.etag, m.last_modified, m.body_hash, m.fingerprint, "
+                "c.customer_key, c.name, b.name, r.status FROM monitor m "
+                "JOIN requests r ON r.id = m.request_id JOIN customers c ON c.id = r.customer_id "
+                "JOIN brokers b ON b.id = r.broker_id WHERE m.next_check_at <= ? "
+                "ORDER BY m.next_check_at LIMIT ?", (now.isoformat(), limit)).fetchall()
+
+    def _next_check(self, now, interval):
+        """Spread checks out so pairs enrolled together do not stay due together"""
+        return (now + interval * (1 + self.rng.uniform(-JITTER, JITTER))).isoformat(timespec='seconds')
+
+    async def _check(self, client, row):
+        request_id, url, etag, last_modified, body_hash, fingerprint, key, name, broker, status = row
+        search = self.searches.get(broker)
+        if status not in REMOVED_STATUSES or search is None:
+            # Re-queued or no longer searchable; look again after the next interval
+            return {'request_id': request_id, 'outcome': 'skipped'}
+        headers = {}
+        if etag:
+            headers['If-None-Match'] = etag
+        if last_modified:
+            headers['If-Modified-Since'] = last_modified
+        try:
+            response = await client.get(url, headers)
+        except HTTPError as e:
+            return {'request_id': request_id, 'outcome': 'error', 'message': str(e)}
+        self.stats['checked'] += 1
+        self.stats['bytes'] += len(response.body)
+        update = {'request_id': request_id, 'etag': response.headers.get('etag', etag),
+                  'last_modified': response.headers.get('last-modified', last_modified)}
+        if response.status == 304:
+            update['outcome'] = 'not_modified'
+            return update
+        if response.status not in (200, 404, 410):
+            return {'request_id': request_id, 'outcome': 'error', 'message': f"HTTP {response.status}"}
+
+        update['body_hash'] = _hash(response.body)
+        if update['body_hash'] == body_hash:
+            update['outcome'] = 'unchanged'
+            return update
+        candidates = []
+        if response.status == 200:
+            candidates = extract_candidates(response.text(), response.url, search, {'name': name or ''})
+        update['fingerprint'] = _hash("\n".join(sorted(candidates)).encode('utf-8')) if candidates else None
+        if candidates and update['fingerprint'] != fingerprint:
+            update.update(outcome='relisted', customer=key, broker=broker, key=search.key, candidates=candidates)
+        else:
+            update['outcome'] = 'changed'
+        return update
+
+    async def _check_batch(self, client, rows):
+        rows = iter(rows)
+        updates = []
+
+        async def worker():
+            for row in rows:
+                updates.append(await self._check(client, row))
+
+        await asyncio.gather(*(worker() for _ in range(self.concurrency)))
+        return updates
+
+    def _save(self, updates, now):
+        checked_at = now.isoformat(timespec='seconds')
+        rows = []
+        fingerprints = []
+        relisted = []
+        for update in updates:
+            outcome = update['outcome']
+            self.stats['errors' if outcome == 'error' else outcome] += 1
+            if outcome in ('error', 'skipped'):
+                retry = timedelta(hours=RETRY_HOURS) if outcome == 'error' else self.recheck
+                rows.append((None, None, None, self._next_check(now, retry), None, 0, None, update['request_id']))
+                continue
+            rows.append((update['etag'], update['last_modified'], update.get('body_hash'),
+                         self._next_check(now, self.recheck), checked_at, 1,
+                         checked_at if outcome == 'relisted' else None, update['request_id']))
+            if 'fingerprint' in update:
+                # Replaced whenever the page was parsed, including with NULL when no profile is listed
+                fingerprints.append((update['fingerprint'], update['request_id']))
+            if outcome == 'relisted':
+                relisted.append(update)
+
+        with self.store.lock, self.store.conn:
+            self.store.conn.executemany(
+                "UPDATE monitor SET etag = COALESCE(?, etag), last_modified = COALESCE(?, last_modified), "
+                "body_hash = COALESCE(?, body_hash), next_check_at = ?, checked_at = COALESCE(?, checked_at), "
+                "checks = checks + ?, relisted_at = COALESCE(?, relisted_at) WHERE request_id = ?", rows)
+            self.store.conn.executemany("UPDATE monitor SET fingerprint = ? WHERE request_id = ?", fingerprints)
+        if relisted:
+            self._enqueue(relisted, checked_at)
+
+    def _enqueue(self, relisted, found_at):
+        """Mark relisted requests in the status store and append their opt-out jobs"""
+        self.store.record_results([{
+            'customer': update['customer'],
+            'broker': update['broker'],
+            'status': 'relisted',
+            'message': f"Listing reappeared: {update['candidates'][0]}",
+            'timestamp': found_at,
+        } for update in relisted])
+        self.jobs_path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.jobs_path, 'a', encoding='utf-8') as f:
+            for update in relisted:
+                f.write(json.dumps({
+                    'customer': update['customer'],
+                    'broker': update['broker'],
+                    'key': update['key'],
+                    'profile_url': update['candidates'][0],
+                    'candidates': update['candidates'],
+                    'found_at': found_at,
+                }) + "\n")
+
+    def run(self, limit=None, now=None):
+        """Check every pair that is due (at most `limit`); returns how many were looked at"""
+        return asyncio.run(self._run(limit, now))
+
+    async def _run(self, limit, now):
+        client = AsyncHTTPClient(self.per_host, host_limiter(self.searches, self.host_rate), self.timeout)
+        seen = 0
+        try:
+            while limit is None or seen < limit:
+                started = now or datetime.now()
+                rows = self.due(started, BATCH_SIZE if limit is None else min(BATCH_SIZE, limit - seen))
+                if not rows:
+                    break
+                updates = await self._check_batch(client, rows)
+                self._save(updates, started)
+                seen += len(rows)
+        finally:
+            await client.close()
+        self.connections = client.opened
+        return seen
+
+def load_relisted(path):
+    """{customer_key: {broker: {ask key: profile URL}}} from a relisted jobs file"""
+    jobs = {}
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            try:
+                job = json.loads(line)
+            except ValueError:
+                continue
+            jobs.setdefault(job['customer'], {})[job['broker']] = {job['key']: job['profile_url']}
+    return jobs
+
+def relisted_customers(customers, path, status_store=None):
+    """Roster customers that have relisted jobs, limited to those brokers and carrying the listing URLs
+
+    With a status store, only pairs still marked "relisted" are kept: once a run
+    records a result for a job it is not run again, although it stays in the file.
+    """
+    jobs = load_relisted(path)
+    for customer in customers:
+        listings = jobs.get(customer_key(customer))
+        if listings and status_store is not None:
+            statuses = status_store.request_statuses(customer_key(customer))
+            listings = {broker: listing for broker, listing in listings.items() if statuses.get(broker) == 'relisted'}
+        if listings:
+            customer['listings'] = {**customer.get('listings', {}), **listings}
+            customer['only_brokers'] = list(listings)
+            yield customer
+
+def main():
+    from broker_registry import load_registry
+    from remove_data import load_roster
+
+    parser = argparse.ArgumentParser(description="Re-check removed listings and queue opt-outs for ones that reappear")
+    parser.add_argument('--roster', help="Enroll removed (customer, broker) pairs from this roster before checking")
+    parser.add_argument('--recheck-days', type=float, default=DEFAULT_RECHECK_DAYS,
+                        help=f"Days between checks of one pair after the first (default: {DEFAULT_RECHECK_DAYS})")
+    parser.add_argument('--limit', type=int, help="Check at most this many pairs per pass")
+    parser.add_argument('--every', type=float, metavar='MINUTES', help="Keep running, one pass every MINUTES")
+    parser.add_argument('--concurrency', type=int, default=DEFAULT_CONCURRENCY,
+                        help=f"Checks in flight at once (default: {DEFAULT_CONCURRENCY})")
+    parser.add_argument('--host-rate', default=DEFAULT_HOST_RATE,
+                        help=f"Requests per broker host, e.g. 2/s or 60/min (default: {DEFAULT_HOST_RATE})")
+    args = parser.parse_args()
+    try:
+        parse_rate(args.host_rate)
+    except ValueError as e:
+        parser.error(str(e))
+
+    log_dir = Path(__file__).parent / "logs"
+    store = StatusStore()
+    monitor = RelistingMonitor(store, load_registry(Path(__file__).parent / "data_brokers.json"), log_dir,
+                               args.recheck_days, args.concurrency, host_rate=args.host_rate)
+    if not monitor.searches:
+        print("No broker in data_brokers.json has a search pattern to re-check.")
+        sys.exit(1)
+
+    print("="*80)
+    print("RE-LISTING MONITOR")
+    print("="*80)
+    if args.roster:
+        print(f"\nEnrolled {monitor.enroll(load_roster(args.roster))} removed pair(s) for monitoring")
+
+    try:
+        while True:
+            start = time.perf_counter()
+            try:
+                seen = monitor.run(args.limit)
+            except HTTPError as e:
+                print(f"Error: {e}")
+                sys.exit(1)
+            stats = monitor.stats
+            print(f"\n[{datetime.now():%Y-%m-%d %H:%M}] {seen} pair(s) due, {time.perf_counter() - start:.1f}s")
+            print(f"  304 Not Modified: {stats['not_modified']}  unchanged: {stats['unchanged']}  "
+                  f"changed: {stats['changed']}  errors: {stats['errors']}")
+            print(f"  ⚠️  Relisted: {stats['relisted']} (jobs in {monitor.jobs_path})")
+            print(f"  Downloaded: {stats['bytes'] / 1024:.0f} KB over {monitor.connections} connection(s)")
+            if not args.every:
+                break
+            time.sleep(args.every * 60)
+    except KeyboardInterrupt:
+        print("\nMonitor stopped.")
+    finally:
+        store.close()
+    print()
+
+if __name__ == "__main__":
+    main()
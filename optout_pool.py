@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+"""
+Parallel Opt-Out Worker Pool
+Runs N headless browsers concurrently. Each worker owns its own AutoOptOutTool
+and takes (customer, broker) jobs from a shared JobScheduler, which rate-limits
+each broker domain, hands out new customers before rechecks, and retries or
+parks the jobs of brokers that keep failing (circuit_breaker.py). Browsers come
+from a shared warm DriverPool and are wiped between jobs. Results are merged into a single results stream and saved as one
+optout_results_*.json file.
+"""
+
+import threading
+from datetime import datetime
+from pathlib import Path
+
+from broker_registry import load_registry
+from driver_pool import DEFAULT_MAX_JOBS, DriverPool
+from results_journal import customer_key
+from scheduler import JobScheduler, broker_rates
+
+class OptOutWorkerPool:
+    def __init__(self, tool_class, workers=4, headless=True, tool_options=None, max_jobs_per_browser=DEFAULT_MAX_JOBS,
+                 journal=None, scheduler=None):
+        self.tool_class = tool_class
+        # Extra AutoOptOutTool keyword arguments (wait strategy, timeouts, ...)
+        self.tool_options = tool_options or {}
+        self.workers = max(1, workers)
+        self.headless = headless
+        factory_tool = self._new_tool()
+        self.driver_pool = DriverPool(factory_tool.create_driver, max_idle=self.workers,
+                                      max_jobs=max_jobs_per_browser)
+        # Jobs per second per broker domain and the run's CircuitBreakers, shared with the tools;
+        # a work_queue.QueueScheduler takes jobs from a shared queue instead
+        self.scheduler = scheduler or JobScheduler(self.tool_options.get('broker_rate'),
+                                                   breakers=self.tool_options.get('breakers'))
+        self.results = []
+        self.lock = threading.Lock()
+        # Workers still running, and how many stopped because their browser would not start
+        self.live = 0
+        self.browser_failures = 0
+        # Shared ResultsJournal; pairs it already holds are not queued again
+        self.journal = journal
+
+    def add_jobs(self, customers, broker_list=None):
+        """Queue one job per (customer, broker) pair; returns how many were queued"""
+        if broker_list is None:
+            broker_list = load_registry(Path(__file__).parent / "data_brokers.json")
+        if self.scheduler.limiter:
+            self.scheduler.limiter.overrides.update(broker_rates(broker_list))
+        queued = 0
+        for customer in customers:
+            key = customer_key(customer)
+            only = customer.get('only_brokers')
+            for broker in broker_list:
+                if only is not None and broker['name'] not in only:
+                    continue
+                if self.journal and self.journal.is_done(key, broker['name']):
+                    self.results.append(self.journal.completed[(key, broker['name'])])
+                    continue
+                self.scheduler.add(customer, broker)
+                queued += 1
+        return queued
+
+    def _new_tool(self, driver_pool=None):
+        return self.tool_class(headless=self.headless, interactive=False,
+                               driver_pool=driver_pool, **self.tool_options)
+
+    def _worker(self, worker_id):
+        tool = self._new_tool(self.driver_pool)
+        try:
+            self._work(worker_id, tool)
+        finally:
+            tool.flush_screenshots()
+            with self.lock:
+                self.live -= 1
+                last = self.live == 0
+            if last and self.browser_failures:
+                self._fail_remaining()
+
+    def _fail_remaining(self):
+        """Record the jobs nobody is left to run as errors instead of dropping them"""
+        jobs = self.scheduler.drain()
+        if not jobs:
+            return
+        print(f"\n✗ No worker could start a browser; {len(jobs)} job(s) were not run")
+        now = datetime.now().isoformat()
+        with self.lock:
+            for job in jobs:
+                self.results.append({"status": "error", "message": "Not run: could not start a browser",
+                                     "broker": job.broker['name'], "customer": customer_key(job.customer),
+                                     "attempts": job.attempts, "timestamp": now})
+
+    def _work(self, worker_id, tool):
+        while True:
+            job = self.scheduler.get()
+            if job is None:
+                break
+            customer, broker = job.customer, job.broker
+            try:
+                tool.init_driver()
+            except SystemExit:
+                print(f"[worker {worker_id}] Could not start a browser, worker stopped")
+                with self.lock:
+                    self.browser_failures += 1
+                self.scheduler.requeue(job, job.priority)
+                return
+
+            attempt = f" (attempt {job.attempts})" if job.attempts > 1 else ""
+            print(f"[worker {worker_id}] {customer_key(customer)} → {broker['name']}{attempt}")
+            result = None
+            try:
+                result = tool.process_broker(broker, customer)
+            except Exception as e:
+                result = {"status": "error", "message": str(e)}
+            finally:
+                # Wipes the browser for the next job (or recycles it)
+                tool.close_driver()
+                retrying = self.scheduler.done(job, result)
+            if retrying:
+                print(f"[worker {worker_id}] {broker['name']} failed, will retry: {result['message']}")
+                continue
+            result['attempts'] = job.attempts
+            result['broker'] = broker['name']
+            result['customer'] = customer_key(customer)
+            result['worker'] = worker_id
+            result['timestamp'] = datetime.now().isoformat()
+            with self.lock:
+                self.results.append(result)
+            if self.journal:
+                self.journal.append(result)
+
+    def run(self):
+        """Process every queued job and return the merged results"""
+        threads = [threading.Thread(target=self._worker, args=(worker_id,), daemon=True)
+                   for worker_id in range(self.workers)]
+        self.live = len(threads)
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.driver_pool.close_all()
+        if self.journal:
+            self.journal.close()
+        return self.results
+
+def run_pool(tool_class, customers, workers=4, broker_list=None, tool_options=None, journal=None):
+    """Run a batch through the worker pool and save one combined results file"""
+    pool = OptOutWorkerPool(tool_class, workers=workers, headless=True, tool_options=tool_options, journal=journal)
+    total = pool.add_jobs(customers, broker_list)
+    resumed = len(pool.results)
+
+    print("\n" + "="*80)
+    print("AUTOMATED DATA BROKER OPT-OUT - WORKER POOL")
+    print("="*80)
+    print(f"\nJobs: {total}")
+    if resumed:
+        print(f"Already completed (resumed): {resumed}")
+    print(f"Workers: {pool.workers} headless browsers")
+    print("\n" + "="*80 + "\n")
+
+    start = datetime.now()
+    pool.run()
+    elapsed = (datetime.now() - start).total_seconds()
+
+    # One collector tool owns the merged results so saving/summary match a normal run
+    collector = pool._new_tool()
+    collector.results = pool.results
+    collector.save_results()
+    collector.print_summary()
+    print(pool.driver_pool.summary())
+    print(pool.scheduler.summary())
+    if elapsed > 0:
+        print(f"Throughput: {(len(pool.results) - resumed) / elapsed * 3600:.0f} brokers/hour ({elapsed:.1f}s)\n")
+    return pool.results
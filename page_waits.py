@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Page Readiness Waits
+Replaces fixed sleeps after driver.get with readiness checks that return as soon
+as the page is usable, bounded by a timeout. Each navigation reports how long
+the page actually took so runs can show the wall-clock saved.
+
+Strategies:
+  ready_state   - document.readyState == "complete"
+  form          - a form or input element is present
+  network_idle  - page is complete and no new resources loaded for a short window
+  selector      - a CSS selector is present (set "wait_selector" on a broker)
+
+A broker in data_brokers.json may override the run's strategy with
+"wait_strategy" and/or provide "wait_selector".
+"""
+
+import time
+from selenium.common.exceptions import TimeoutException
+from selenium.webdriver.common.by import By
+from selenium.webdriver.support import expected_conditions as EC
+from selenium.webdriver.support.ui import WebDriverWait
+
+WAIT_STRATEGIES = ('ready_state', 'form', 'network_idle', 'selector')
+DEFAULT_STRATEGY = 'ready_state'
+DEFAULT_TIMEOUT = 15
+POLL_INTERVAL = 0.1
+NETWORK_IDLE_WINDOW = 0.5
+
+# The previous behaviour, kept for reporting the time saved
+LEGACY_SLEEP = 3.0
+
+def _ready_state_complete(driver):
+    return driver.execute_script("return document.readyState") == "complete"
+
+class _NetworkIdle:
+    """Condition that holds once the resource count stops changing for a window"""
+
+    def __init__(self, window=NETWORK_IDLE_WINDOW):
+        self.window = window
+        self.last_count = -1
+        self.stable_since = None
+
+    def __call__(self, driver):
+        state, count = driver.execute_script(
+            "return [document.readyState, performance.getEntriesByType('resource').length]")
+        now = time.monotonic()
+        if state != "complete" or count != self.last_count:
+            self.last_count = count
+            self.stable_since = now
+            return False
+        return now - self.stable_since >= self.window
+
+def resolve_strategy(broker, default=DEFAULT_STRATEGY):
+    """Pick the wait strategy for a broker, honouring per-broker overrides"""
+    if broker is not None:
+        if broker.get('wait_strategy'):
+            return broker['wait_strategy']
+        if broker.get('wait_selector'):
+            return 'selector'
+    return default
+
+def wait_for_page(driver, broker=None, strategy=DEFAULT_STRATEGY, timeout=DEFAULT_TIMEOUT):
+    """Block until the current page is ready; returns True if it became ready in time"""
+    strategy = resolve_strategy(broker, strategy)
+    wait = WebDriverWait(driver, timeout, poll_frequency=POLL_INTERVAL)
+    try:
+        if strategy == 'form':
+            wait.until(EC.presence_of_element_located((By.CSS_SELECTOR, "form, input")))
+        elif strategy == 'network_idle':
+            wait.until(_NetworkIdle())
+        elif strategy == 'selector' and broker is not None and broker.get('wait_selector'):
+            wait.until(EC.presence_of_element_located((By.CSS_SELECTOR, broker['wait_selector'])))
+        else:
+            wait.until(_ready_state_complete)
+        return True
+    except TimeoutException:
+        return False
+
+def navigate(driver, url, broker=None, strategy=DEFAULT_STRATEGY, timeout=DEFAULT_TIMEOUT):
+    """Load a URL and wait for readiness, returning timing details for the results"""
+    strategy = resolve_strategy(broker, strategy)
+    start = time.monotonic()
+    driver.get(url)
+    loaded = time.monotonic()
+    ready = wait_for_page(driver, broker, strategy, timeout)
+    end = time.monotonic()
+    return {
+        'load_time': round(end - start, 3),
+        'ready_wait': round(end - loaded, 3),
+        'wait_strategy': strategy,
+        'timed_out': not ready,
+    }
+
+def time_saved(results):
+    """Seconds saved across results compared with the old fixed sleep after driver.get"""
+    return sum(LEGACY_SLEEP - r['ready_wait'] for r in results if 'ready_wait' in r)
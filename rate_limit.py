@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Rate Limiting
+Token buckets (one per broker domain) and exponential backoff with jitter.
+Every class takes an injectable clock, so schedules can be tested with a
+simulated clock instead of real sleeps.
+"""
+
+import random
+import threading
+import time
+
+RATE_UNITS = {'s': 1.0, 'sec': 1.0, 'm': 60.0, 'min': 60.0, 'h': 3600.0, 'hour': 3600.0}
+
+def parse_rate(text):
+    """'30/min', '2/s' or '500/hour' as tokens per second"""
+    try:
+        count, unit = str(text).split('/', 1)
+        return float(count) / RATE_UNITS[unit.strip().lower()]
+    except (ValueError, KeyError):
+        raise ValueError(f"invalid rate {text!r} (expected e.g. 30/min, 2/s or 500/hour)")
+
+class TokenBucket:
+    """Allows `rate` events per second on average and bursts of up to `capacity`"""
+
+    def __init__(self, rate, capacity=None, clock=time.monotonic):
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(1.0, rate)
+        self.clock = clock
+        self.tokens = self.capacity
+        self.updated = clock()
+        self.lock = threading.Lock()
+
+    def _refill(self):
+        now = self.clock()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def try_acquire(self, tokens=1):
+        """Take tokens if they are available now"""
+        with self.lock:
+            self._refill()
+            if self.tokens >= tokens:
+                self.tokens -= tokens
+                return True
+            return False
+
+    def delay(self, tokens=1):
+        """Seconds until `tokens` will be available (0 if they are now)"""
+        with self.lock:
+            self._refill()
+            return max(0.0, (tokens - self.tokens) / self.rate)
+
+    def acquire(self, tokens=1, sleep=time.sleep):
+        """Block until tokens are available, then take them"""
+        while not self.try_acquire(tokens):
+            sleep(self.delay(tokens))
+
+class DomainLimiter:
+    """One TokenBucket per domain, created on first use; overrides give some domains their own rate"""
+
+    def __init__(self, rate, capacity=None, clock=time.monotonic, overrides=None):
+        self.rate = rate
+        self.capacity = capacity
+        self.clock = clock
+        self.overrides = overrides or {}
+        self.buckets = {}
+        self.lock = threading.Lock()
+
+    def bucket(self, domain):
+        bucket = self.buckets.get(domain)
+        if bucket is None:
+            with self.lock:
+                bucket = self.buckets.get(domain)
+                if bucket is None:
+                    bucket = TokenBucket(self.overrides.get(domain, self.rate), self.capacity, self.clock)
+                    self.buckets[domain] = bucket
+        return bucket
+
+    def try_acquire(self, domain):
+        return self.bucket(domain).try_acquire()
+
+    def delay(self, domain):
+        return self.bucket(domain).delay()
+
+def backoff_delay(attempt, base=1.0, cap=300.0, rng=random):
+    """Exponential backoff with full jitter: uniform(0, min(cap, base * 2**(attempt-1)))"""
+    return rng.uniform(0, min(cap, base * 2 ** (attempt - 1)))
@@ -0,0 +1,226 @@
+#!/usr/bin/env python3
+"""
+Declarative Broker Recipes
+A broker in data_brokers.json may carry a "recipe" that describes its opt-out
+form, so adding a broker needs no new Python:
+
+  "recipe": {
+    "url": "https://example.com/optout",             (optional, defaults to opt_out_url)
+    "ask": [{"key": "profile_url",                   (values only a person can find)
+             "message": "Search for yourself and copy your profile URL",
+             "prompt": "Paste your profile URL here"}],
+    "wait": "form#optout",                           (CSS selector to wait for)
+    "fields": {"email": "input[name='email']"},      (customer field -> CSS selector)
+    "check": ["#agree-terms"],                       (checkboxes to tick)
+    "human": "Please complete the CAPTCHA",          (step a person must do)
+    "submit": "button[type='submit']",               (omit if the person submits)
+    "success": {"selector": ".confirmation", "text": "request received", "url_contains": "/thanks"},
+    "timeout": 15
+  }
+
+Each recipe is validated and compiled once into a flat step plan. Running a plan
+is a few scripted WebDriver calls against known selectors, with no field probing.
+"""
+
+from selenium.common.exceptions import TimeoutException
+from selenium.webdriver.common.by import By
+from selenium.webdriver.support import expected_conditions as EC
+from selenium.webdriver.support.ui import WebDriverWait
+
+from form_fill import fill_selectors, page_blockers
+from page_waits import POLL_INTERVAL
+
+RECIPE_KEYS = ('url', 'ask', 'wait', 'fields', 'check', 'human', 'submit', 'success', 'timeout')
+SUCCESS_KEYS = ('selector', 'text', 'url_contains')
+
+CLICK_JS = """
+const el = document.querySelector(arguments[0]);
+if (!el) {
+    return false;
+}
+el.click();
+return true;
+"""
+
+SUCCESS_JS = """
+const [selector, text, urlPart] = arguments;
+if (selector && document.querySelector(selector)) {
+    return true;
+}
+if (text && document.body && document.body.innerText.toLowerCase().includes(text.toLowerCase())) {
+    return true;
+}
+return Boolean(urlPart && location.href.includes(urlPart));
+"""
+
+class RecipeError(ValueError):
+    """A recipe in data_brokers.json is malformed"""
+
+class RecipePlan:
+    """A compiled recipe: an ordered tuple of (step, argument) pairs"""
+    __slots__ = ('broker_name', 'steps')
+
+    def __init__(self, broker_name, steps):
+        self.broker_name = broker_name
+        self.steps = tuple(steps)
+
+    def run(self, tool, broker, user_info):
+        """Execute the plan with an AutoOptOutTool; returns the usual result dict"""
+        values = dict(user_info)
+        # Profile URLs found by listing discovery answer this broker's ask steps
+        values.update(user_info.get('listings', {}).get(broker['name'], {}))
+        for step, arg in self.steps:
+            result = STEP_RUNNERS[step](tool, broker, values, arg)
+            if result is not None:
+                return result
+        return {"status": "error", "message": "Recipe ended without a result"}
+
+    def __repr__(self):
+        return f"RecipePlan({self.broker_name!r}, {[step for step, _ in self.steps]})"
+
+def compile_recipe(broker):
+    """Validate a broker's recipe and turn it into a RecipePlan"""
+    recipe = broker['recipe']
+    if not isinstance(recipe, dict):
+        raise RecipeError("recipe must be an object")
+    unknown = set(recipe) - set(RECIPE_KEYS)
+    if unknown:
+        raise RecipeError(f"unknown keys: {', '.join(sorted(unknown))}")
+
+    fields = recipe.get('fields', {})
+    checks = recipe.get('check', [])
+    success = recipe.get('success')
+    if not isinstance(fields, dict) or not all(isinstance(v, str) for v in fields.values()):
+        raise RecipeError("fields must map customer fields to CSS selectors")
+    if not isinstance(checks, list):
+        raise RecipeError("check must be a list of CSS selectors")
+    if not (fields or checks or recipe.get('human') or recipe.get('submit')):
+        raise RecipeError("recipe has nothing to do")
+    if success is not None:
+        if not recipe.get('submit'):
+            raise RecipeError("success needs a submit selector")
+        if not isinstance(success, dict) or not success or set(success) - set(SUCCESS_KEYS):
+            raise RecipeError(f"success must use {', '.join(SUCCESS_KEYS)}")
+
+    timeout = recipe.get('timeout')
+    steps = [('open', recipe.get('url') or broker['opt_out_url'])]
+    for ask in recipe.get('ask', []):
+        if not isinstance(ask, dict) or 'key' not in ask:
+            raise RecipeError("each ask entry needs a key")
+        message = ask.get('message', f"Please find your {ask['key'].replace('_', ' ')}")
+        steps.append(('ask', (ask['key'], message, ask.get('prompt', ask['key'].replace('_', ' ')))))
+    if recipe.get('wait'):
+        steps.append(('wait', (recipe['wait'], timeout)))
+    if fields or checks:
+        steps.append(('fill', (tuple(fields.items()), tuple(checks))))
+    if recipe.get('human'):
+        steps.append(('human', recipe['human']))
+    if recipe.get('submit'):
+        steps.append(('submit', recipe['submit']))
+        if success:
+            steps.append(('confirm', (success.get('selector'), success.get('text'),
+                                      success.get('url_contains'), timeout)))
+    steps.append(('finish', "Opt-out submitted"))
+    return RecipePlan(broker['name'], steps)
+
+def _open(tool, broker, values, url):
+    tool.open_page(url, broker)
+    tool.take_screenshot(broker['name'], "landing")
+
+def _ask(tool, broker, values, arg):
+    key, message, prompt = arg
+    if values.get(key):
+        return None
+    if not tool.wait_for_user(message):
+        return tool.defer(broker, values, message)
+    answer = input(f"{prompt}: ").strip()
+    if not answer:
+        return {"status": "skipped", "message": f"No {key.replace('_', ' ')} provided"}
+    values[key] = answer
+    return None
+
+def _wait(tool, broker, values, arg):
+    selector, timeout = arg
+    try:
+        with tool.timer.span('wait'):
+            WebDriverWait(tool.driver, timeout or tool.page_timeout, poll_frequency=POLL_INTERVAL).until(
+                EC.presence_of_element_located((By.CSS_SELECTOR, selector)))
+    except TimeoutException:
+        return tool.defer(broker, values, f"form not found ({selector})")
+    return None
+
+def _fill(tool, broker, values, arg):
+    fields, checks = arg
+    pairs = [(selector, str(values[key])) for key, selector in fields if values.get(key)]
+    pairs.extend((selector, '') for selector in checks)
+    with tool.timer.span('fill'):
+        missing = fill_selectors(tool.driver, pairs)
+    if missing:
+        # The page no longer matches the recipe; do not submit a half-filled form
+        return tool.defer(broker, values, f"fields not found ({', '.join(missing)})")
+    print(f"  ✓ Filled {len(pairs)} field(s) from recipe")
+    tool.take_screenshot(broker['name'], "form_filled")
+    return None
+
+def _human(tool, broker, values, message):
+    if not tool.wait_for_user(message):
+        return tool.defer(broker, values, message)
+    return None
+
+def _submit(tool, broker, values, selector):
+    # A solved CAPTCHA widget still looks like a blocker, so only unattended runs check;
+    # with a person at the keyboard the recipe's human step (or the person) handles it
+    if not tool.interactive and page_blockers(tool.driver):
+        # A CAPTCHA or ID upload appeared; defer() names it in the reason
+        return tool.defer(broker, values, "submit")
+    with tool.timer.span('submit'):
+        clicked = tool.driver.execute_script(CLICK_JS, selector)
+    if not clicked:
+        return tool.defer(broker, values, f"submit button not found ({selector})")
+    return None
+
+def _confirm(tool, broker, values, arg):
+    selector, text, url_part, timeout = arg
+    try:
+        with tool.timer.span('confirm'):
+            WebDriverWait(tool.driver, timeout or tool.page_timeout, poll_frequency=POLL_INTERVAL).until(
+                lambda driver: driver.execute_script(SUCCESS_JS, selector, text, url_part))
+    except TimeoutException:
+        tool.take_screenshot(broker['name'], "unconfirmed")
+        return {"status": "error", "message": "No confirmation shown after submit"}
+    return None
+
+def _finish(tool, broker, values, message):
+    tool.take_screenshot(broker['name'], "submitted")
+    return {"status": "success", "message": message}
+
+STEP_RUNNERS = {
+    'open': _open,
+    'ask': _ask,
+    'wait': _wait,
+    'fill': _fill,
+    'human': _human,
+    'submit': _submit,
+    'confirm': _confirm,
+    'finish': _finish,
+}
+
+_compiled = {}
+
+def get_plans(brokers):
+    """Compiled plans by broker name for every broker with a recipe, compiled on first use"""
+    version = getattr(brokers, 'version', None)
+    plans = _compiled.get(version) if version else None
+    if plans is None:
+        plans = {}
+        for broker in brokers:
+            if not broker.get('recipe'):
+                continue
+            try:
+                plans[broker['name']] = compile_recipe(broker)
+            except RecipeError as e:
+                print(f"  Warning: Ignoring recipe for {broker['name']}: {e}")
+        if version:
+            _compiled.clear()
+            _compiled[version] = plans
+    return plans
@@ -4,119 +4,95 @@ Data Broker Removal Request Generator
 Generates removal request emails and provides opt-out links for major data brokers.
 """
 
+import argparse
+import csv
+import itertools
 import json
 import os
+import re
 import sys
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
 from datetime import datetime
 from pathlib import Path
 
+from archive_output import COMPRESSION_SUFFIXES, LAYOUTS, ArchiveIndex, open_bundle, write_stream
+from broker_registry import load_registry
+from checklist_templates import content_digest, get_templates
+from status_store import StatusStore
+
+# Roster columns accepted by batch mode, mapped onto generate_removal_list arguments
+ROSTER_FIELDS = {
+    'name': 'name',
+    'email': 'email',
+    'address': 'address',
+    'phone': 'phone',
+    'city': 'city',
+    'state': 'state',
+    'zip': 'zip_code',
+    'zip_code': 'zip_code',
+}
+
+# Incremental mode and bundled layouts store each customer's files under stable names
+CUSTOMER_FILES = {
+    'email_template': "email_template.txt",
+    'html_checklist': "removal_checklist.html",
+    'text_checklist': "removal_checklist.txt",
+}
+MANIFEST_NAME = "manifest.json"
+
 class DataBrokerRemovalTool:
-    def __init__(self):
+    def __init__(self, status_store=None, compression=None):
         self.script_dir = Path(__file__).parent
         self.data_file = self.script_dir / "data_brokers.json"
         self.output_dir = self.script_dir / "output"
         self.output_dir.mkdir(exist_ok=True)
         self.brokers = self.load_brokers()
+        self._templates = None
+        # Optional StatusStore that tracks each generated request as pending
+        self.status_store = status_store
+        # None or 'gzip'; compressed files get a .gz suffix
+        self.compression = compression
         
     def load_brokers(self):
         """Load data broker information from JSON file"""
-        try:
-            with open(self.data_file, 'r') as f:
-                return json.load(f)
-        except FileNotFoundError:
-            print(f"Error: {self.data_file} not found")
-            sys.exit(1)
-            
+        return load_registry(self.data_file)
+    
     def generate_email_template(self, name, email, address="", phone="", city="", state="", zip_code=""):
         """Generate a CCPA/GDPR compliant removal request email"""
-        template = f"""Subject: Data Removal Request - {name}
-
-Dear Privacy Team,
-
-I am writing to request the removal of my personal information from your database under the California Consumer Privacy Act (CCPA), General Data Protection Regulation (GDPR), and other applicable privacy laws.
-
-Personal Information to Remove:
-Name: {name}
-Email: {email}
-"""
-        
-        if address:
-            template += f"Address: {address}\n"
-        if city:
-            template += f"City: {city}\n"
-        if state:
-            template += f"State: {state}\n"
-        if zip_code:
-            template += f"ZIP Code: {zip_code}\n"
-        if phone:
-            template += f"Phone: {phone}\n"
-            
-        template += """
-I formally request that you:
-1. Remove all of my personal information from your database
-2. Stop selling or sharing my personal information with third parties
-3. Confirm in writing once my information has been removed
-4. Do not retaliate or discriminate against me for making this request
-
-Please process this request within 45 days as required by law. I expect written confirmation of the removal.
-
-Thank you for your prompt attention to this matter.
-
-Sincerely,
-"""
-        template += f"{name}\n"
-        template += f"Date: {datetime.now().strftime('%B %d, %Y')}\n"
-        
-        return template
+        return self.templates.render_email(name, email, address=address, phone=phone,
+                                           city=city, state=state, zip_code=zip_code)
     
-    def generate_removal_list(self, name, email, address="", phone="", city="", state="", zip_code=""):
+    @property
+    def templates(self):
+        """Templates compiled once against the loaded broker database"""
+        if self._templates is None:
+            self._templates = get_templates(self.brokers)
+        return self._templates
+    
+    def generate_removal_list(self, name, email, address="", phone="", city="", state="", zip_code="", customer_id=None):
         """Generate a comprehensive removal list with instructions"""
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        if customer_id:
+            # Batch runs produce many files per second, so tag them with the customer
+            timestamp = f"{customer_slug(customer_id)}_{timestamp}"
+        
+        suffix = COMPRESSION_SUFFIXES[self.compression]
+        fields = {'address': address, 'phone': phone, 'city': city, 'state': state, 'zip_code': zip_code}
         
         # Generate email template
-        email_template = self.generate_email_template(name, email, address, phone, city, state, zip_code)
-        email_file = self.output_dir / f"email_template_{timestamp}.txt"
-        with open(email_file, 'w') as f:
-            f.write(email_template)
+        email_file = self.output_dir / f"email_template_{timestamp}.txt{suffix}"
+        write_stream(email_file, self.templates.stream_email(name, email, **fields), self.compression)
         
         # Generate removal checklist
-        checklist_file = self.output_dir / f"removal_checklist_{timestamp}.html"
-        html_content = self.generate_html_checklist(name, email, address, phone, city, state, zip_code)
-        with open(checklist_file, 'w') as f:
-            f.write(html_content)
+        checklist_file = self.output_dir / f"removal_checklist_{timestamp}.html{suffix}"
+        write_stream(checklist_file, self.templates.stream_html(name, email, **fields), self.compression)
         
         # Generate text checklist
-        text_checklist = self.output_dir / f"removal_checklist_{timestamp}.txt"
-        with open(text_checklist, 'w') as f:
-            f.write(f"DATA BROKER REMOVAL CHECKLIST\n")
-            f.write(f"Generated: {datetime.now().strftime('%B %d, %Y at %I:%M %p')}\n")
-            f.write(f"{'='*80}\n\n")
-            f.write(f"Personal Information:\n")
-            f.write(f"  Name: {name}\n")
-            f.write(f"  Email: {email}\n")
-            if address:
-                f.write(f"  Address: {address}\n")
-            if city:
-                f.write(f"  City: {city}\n")
-            if state:
-                f.write(f"  State: {state}\n")
-            if zip_code:
-                f.write(f"  ZIP: {zip_code}\n")
-            if phone:
-                f.write(f"  Phone: {phone}\n")
-            f.write(f"\n{'='*80}\n\n")
-            
-            for idx, broker in enumerate(self.brokers, 1):
-                f.write(f"{idx}. {broker['name']}\n")
-                f.write(f"   Website: {broker['website']}\n")
-                f.write(f"   Opt-Out URL: {broker['opt_out_url']}\n")
-                f.write(f"   Method: {broker['method']}\n")
-                if broker.get('email'):
-                    f.write(f"   Email: {broker['email']}\n")
-                f.write(f"   Status: [ ] Pending  [ ] Completed  [ ] N/A\n")
-                f.write(f"   Date Submitted: _______________\n")
-                f.write(f"   Confirmation Received: _______________\n")
-                f.write(f"\n{'-'*80}\n\n")
+        text_checklist = self.output_dir / f"removal_checklist_{timestamp}.txt{suffix}"
+        write_stream(text_checklist, self.templates.stream_text(name, email, **fields), self.compression)
+        
+        if self.status_store:
+            self.status_store.record_checklist(customer_id or email, name, email, self.brokers)
         
         return {
             'email_template': str(email_file),
@@ -124,229 +100,91 @@ Sincerely,
             'text_checklist': str(text_checklist)
         }
     
-    def generate_html_checklist(self, name, email, address="", phone="", city="", state="", zip_code=""):
-        """Generate an interactive HTML checklist"""
-        html = """<!DOCTYPE html>
-<html lang="en">
-<head>
-    <meta charset="UTF-8">
-    <meta name="viewport" content="width=device-width, initial-scale=1.0">
-    <title>Data Broker Removal Checklist</title>
-    <style>
-        body {
-            font-family: Arial, sans-serif;
-            max-width: 1200px;
-            margin: 0 auto;
-            padding: 20px;
-            background-color: #f5f5f5;
-        }
-        .header {
-            background-color: #2c3e50;
-            color: white;
-            padding: 20px;
-            border-radius: 5px;
-            margin-bottom: 20px;
-        }
-        .info-box {
-            background-color: #ecf0f1;
-            padding: 15px;
-            border-radius: 5px;
-            margin-bottom: 20px;
-        }
-        .broker-card {
-            background-color: white;
-            padding: 20px;
-            margin-bottom: 15px;
-            border-radius: 5px;
-            box-shadow: 0 2px 4px rgba(0,0,0,0.1);
-            position: relative;
-        }
-        .broker-card.completed {
-            background-color: #d4edda;
-            border-left: 4px solid #28a745;
-        }
-        .broker-name {
-            font-size: 18px;
-            font-weight: bold;
-            color: #2c3e50;
-            margin-bottom: 10px;
-        }
-        .broker-info {
-            margin: 5px 0;
-            color: #555;
-        }
-        .opt-out-button {
-            display: inline-block;
-            background-color: #3498db;
-            color: white;
-            padding: 10px 20px;
-            text-decoration: none;
-            border-radius: 5px;
-            margin: 10px 5px 0 0;
-        }
-        .opt-out-button:hover {
-            background-color: #2980b9;
-        }
-        .checkbox-container {
-            position: absolute;
-            top: 20px;
-            right: 20px;
-        }
-        .checkbox-container input[type="checkbox"] {
-            width: 25px;
-            height: 25px;
-            cursor: pointer;
-        }
-        .progress-bar {
-            width: 100%;
-            height: 30px;
-            background-color: #ecf0f1;
-            border-radius: 5px;
-            overflow: hidden;
-            margin-top: 10px;
-        }
-        .progress-fill {
-            height: 100%;
-            background-color: #27ae60;
-            width: 0%;
-            transition: width 0.3s ease;
-            display: flex;
-            align-items: center;
-            justify-content: center;
-            color: white;
-            font-weight: bold;
-        }
-        .instructions {
-            background-color: #fff3cd;
-            border-left: 4px solid #ffc107;
-            padding: 15px;
-            margin-bottom: 20px;
-            border-radius: 5px;
+    def update_removal_list(self, name, email, address="", phone="", city="", state="", zip_code="", customer_id=None):
+        """Bring a customer's files up to date, rewriting only what changed
+        
+        Files live in output/customers/<slug>_<hash>/ next to a manifest.json holding a hash of
+        the customer's details, the digest of every broker section and the hash of each file.
+        The email depends only on the customer and the checklists also on the broker sections,
+        so a customer whose details and sections are unchanged is not rendered at all.
+        """
+        fields = {'address': address, 'phone': phone, 'city': city, 'state': state, 'zip_code': zip_code}
+        customer_dir = self.output_dir / "customers" / customer_slug(customer_id or email)
+        manifest_file = customer_dir / MANIFEST_NAME
+        manifest = load_manifest(manifest_file)
+        previous = manifest.get('files', {})
+        
+        templates = self.templates
+        customer_hash = content_digest(json.dumps([name, email, fields], sort_keys=True))
+        customer_changed = manifest.get('customer') != customer_hash
+        old_sections = manifest.get('sections') or []
+        changed_sections = sum(1 for old, new in zip(old_sections, templates.section_digests) if old != new)
+        changed_sections += abs(len(old_sections) - len(templates.section_digests))
+        stale = {
+            'email_template': customer_changed,
+            'html_checklist': customer_changed or changed_sections > 0,
+            'text_checklist': customer_changed or changed_sections > 0,
         }
-        .method-badge {
-            display: inline-block;
-            padding: 5px 10px;
-            background-color: #6c757d;
-            color: white;
-            border-radius: 3px;
-            font-size: 12px;
-            margin-right: 5px;
+        renderers = {
+            'email_template': templates.stream_email,
+            'html_checklist': templates.stream_html,
+            'text_checklist': templates.stream_text,
         }
-    </style>
-</head>
-<body>
-    <div class="header">
-        <h1>🔒 Data Broker Removal Checklist</h1>
-        <p>Generated: """ + datetime.now().strftime('%B %d, %Y at %I:%M %p') + """</p>
-    </div>
-    
-    <div class="info-box">
-        <h3>Your Information</h3>
-        <p><strong>Name:</strong> """ + name + """</p>
-        <p><strong>Email:</strong> """ + email + """</p>"""
+        suffix = COMPRESSION_SUFFIXES[self.compression]
         
-        if address:
-            html += f"<p><strong>Address:</strong> {address}</p>"
-        if city:
-            html += f"<p><strong>City:</strong> {city}</p>"
-        if state:
-            html += f"<p><strong>State:</strong> {state}</p>"
-        if zip_code:
-            html += f"<p><strong>ZIP:</strong> {zip_code}</p>"
-        if phone:
-            html += f"<p><strong>Phone:</strong> {phone}</p>"
-            
-        html += """
-        <div class="progress-bar">
-            <div class="progress-fill" id="progressBar">0%</div>
-        </div>
-    </div>
-    
-    <div class="instructions">
-        <h3>📋 Instructions</h3>
-        <ol>
-            <li>Click "Visit Opt-Out Page" for each data broker</li>
-            <li>Follow their removal process (usually requires searching for yourself first)</li>
-            <li>Check the box when you've submitted your removal request</li>
-            <li>Keep track of confirmation emails</li>
-            <li>Follow up after 45 days if you haven't received confirmation</li>
-        </ol>
-        <p><strong>Tip:</strong> Some sites require you to find your listing first before you can opt out. Search for your name, address, or phone number.</p>
-    </div>
-    
-    <div id="brokerList">
-"""
+        files = {}
+        written = []
+        for key, filename in CUSTOMER_FILES.items():
+            path = customer_dir / (filename + suffix)
+            entry = previous.get(key)
+            if entry and not stale[key] and path.exists():
+                files[key] = entry
+                continue
+            customer_dir.mkdir(parents=True, exist_ok=True)
+            tmp = path.with_name(path.name + ".tmp")
+            digest = write_stream(tmp, renderers[key](name, email, **fields), self.compression)
+            if entry and entry['sha256'] == digest and path.exists():
+                tmp.unlink()
+            else:
+                os.replace(tmp, path)
+                written.append(key)
+            files[key] = {'path': str(path), 'sha256': digest}
         
-        for idx, broker in enumerate(self.brokers, 1):
-            html += f"""
-        <div class="broker-card" id="broker-{idx}">
-            <div class="checkbox-container">
-                <input type="checkbox" id="check-{idx}" onchange="updateProgress()">
-            </div>
-            <div class="broker-name">{idx}. {broker['name']}</div>
-            <div class="broker-info">🌐 <a href="{broker['website']}" target="_blank">{broker['website']}</a></div>
-            <div class="broker-info">
-                <span class="method-badge">{broker['method'].replace('_', ' ').upper()}</span>
-"""
-            if broker.get('email'):
-                html += f'<span class="method-badge">EMAIL: {broker["email"]}</span>'
-            
-            html += f"""
-            </div>
-            <a href="{broker['opt_out_url']}" target="_blank" class="opt-out-button">Visit Opt-Out Page →</a>
-        </div>
-"""
+        if written or customer_changed or changed_sections:
+            write_atomic(manifest_file, json.dumps({
+                'customer': customer_hash,
+                'broker_database': templates.version,
+                'sections': templates.section_digests,
+                'files': files,
+                'updated_at': datetime.now().isoformat(),
+            }))
+        if written and self.status_store:
+            self.status_store.record_checklist(customer_id or email, name, email, self.brokers)
         
-        html += """
-    </div>
+        return {
+            'files': {key: entry['path'] for key, entry in files.items()},
+            'written': written,
+            'changed_sections': changed_sections,
+        }
     
-    <script>
-        function updateProgress() {
-            const total = """ + str(len(self.brokers)) + """;
-            const checked = document.querySelectorAll('input[type="checkbox"]:checked').length;
-            const percentage = Math.round((checked / total) * 100);
-            const progressBar = document.getElementById('progressBar');
-            progressBar.style.width = percentage + '%';
-            progressBar.textContent = percentage + '%';
-            
-            // Update card appearance
-            for (let i = 1; i <= total; i++) {
-                const checkbox = document.getElementById('check-' + i);
-                const card = document.getElementById('broker-' + i);
-                if (checkbox.checked) {
-                    card.classList.add('completed');
-                } else {
-                    card.classList.remove('completed');
-                }
-            }
-            
-            // Save progress to localStorage
-            const progress = [];
-            for (let i = 1; i <= total; i++) {
-                progress.push(document.getElementById('check-' + i).checked);
-            }
-            localStorage.setItem('brokerProgress', JSON.stringify(progress));
+    def write_to_bundle(self, bundle, name, email, address="", phone="", city="", state="", zip_code="",
+                        customer_id=None):
+        """Stream a customer's three files into a sharded directory or zip/tar bundle; returns index rows"""
+        fields = {'address': address, 'phone': phone, 'city': city, 'state': state, 'zip_code': zip_code}
+        key = customer_id or email
+        suffix = COMPRESSION_SUFFIXES[self.compression]
+        renderers = {
+            'email_template': self.templates.stream_email,
+            'html_checklist': self.templates.stream_html,
+            'text_checklist': self.templates.stream_text,
         }
-        
-        // Load saved progress
-        window.onload = function() {
-            const saved = localStorage.getItem('brokerProgress');
-            if (saved) {
-                const progress = JSON.parse(saved);
-                progress.forEach((checked, index) => {
-                    const checkbox = document.getElementById('check-' + (index + 1));
-                    if (checkbox) {
-                        checkbox.checked = checked;
-                    }
-                });
-                updateProgress();
-            }
-        };
-    </script>
-</body>
-</html>
-"""
-        return html
+        return [bundle.add(key, customer_slug(key), kind, filename + suffix, renderers[kind](name, email, **fields))
+                for kind, filename in CUSTOMER_FILES.items()]
+    
+    def generate_html_checklist(self, name, email, address="", phone="", city="", state="", zip_code=""):
+        """Generate an interactive HTML checklist as one string (files are written with write_stream)"""
+        return self.templates.render_html(name, email, address=address, phone=phone,
+                                          city=city, state=state, zip_code=zip_code)
     
     def list_brokers(self):
         """List all data brokers"""
@@ -360,8 +198,256 @@ Sincerely,
                 print(f"   Email: {broker['email']}")
         print("\n" + "="*80)
 
-def main():
+def safe_slug(value):
+    """Turn a customer identifier into a filesystem-safe filename fragment"""
+    slug = re.sub(r'[^A-Za-z0-9_-]+', '_', str(value)).strip('_')
+    return slug or "customer"
+
+def customer_slug(customer_id):
+    """safe_slug plus a short hash of the raw id, so ids such as a.b, a_b and a/b stay apart"""
+    return f"{safe_slug(customer_id)}_{content_digest(str(customer_id))[:8]}"
+
+def load_manifest(manifest_file):
+    """A customer's manifest, or an empty one if it is missing or unreadable"""
+    try:
+        with open(manifest_file, 'r') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def write_atomic(path, content):
+    """Replace a file in one step so an interrupted run never leaves a half-written file"""
+    tmp = path.with_name(path.name + ".tmp")
+    with open(tmp, 'w') as f:
+        f.write(content)
+    os.replace(tmp, path)
+
+def claim_batch_path(output_dir, prefix, suffix="", directory=False):
+    """Create a new output/<prefix>_<timestamp>_<pid><suffix> file or directory
+    
+    Two runs in the same second get different pids, and a name that is somehow
+    taken gets a counter instead of being reused.
+    """
+    base = f"{prefix}_{datetime.now().strftime('%Y%m%d_%H%M%S')}_{os.getpid()}"
+    for attempt in itertools.count():
+        path = output_dir / f"{base}{f'_{attempt}' if attempt else ''}{suffix}"
+        try:
+            if directory:
+                path.mkdir()
+            else:
+                path.touch(exist_ok=False)
+            return path
+        except FileExistsError:
+            continue
+
+def load_roster(roster_path):
+    """Stream customer records from a CSV or JSONL roster file"""
+    roster_path = Path(roster_path)
+    with open(roster_path, 'r', newline='', encoding='utf-8') as f:
+        if roster_path.suffix.lower() in ('.jsonl', '.ndjson'):
+            rows = (json.loads(line) for line in f if line.strip())
+        else:
+            rows = csv.DictReader(f)
+        
+        for idx, row in enumerate(rows, 1):
+            customer = {'customer_id': str(row.get('id') or row.get('customer_id') or idx)}
+            for column, field in ROSTER_FIELDS.items():
+                value = row.get(column)
+                if value:
+                    customer[field] = str(value).strip()
+            if not customer.get('name') or not customer.get('email'):
+                print(f"  Warning: Skipping roster row {idx} (name and email are required)")
+                continue
+            yield customer
+
+# Each pool worker builds its tool once so the templates are compiled once per process
+_batch_tool = None
+_batch_incremental = False
+_batch_layout = 'flat'
+_batch_dir = None
+
+def _init_batch_worker(incremental=False, compression=None, layout='flat', batch_dir=None):
+    global _batch_tool, _batch_incremental, _batch_layout, _batch_dir
+    _batch_tool = DataBrokerRemovalTool(compression=compression)
+    _batch_tool.templates
+    _batch_incremental = incremental
+    _batch_layout = layout
+    _batch_dir = batch_dir
+
+def _generate_batch_chunk(customers, part=0):
+    results = []
+    # Bundled layouts write each chunk into its own part, so workers never share a file
+    bundle = open_bundle(_batch_layout, _batch_dir, part, _batch_tool.compression) if _batch_layout != 'flat' else None
+    try:
+        for customer in customers:
+            try:
+                result = {'customer_id': customer['customer_id'], 'status': 'success',
+                          'name': customer['name'], 'email': customer['email']}
+                if bundle:
+                    result['index'] = _batch_tool.write_to_bundle(bundle, **customer)
+                    result['files'] = {row['kind']: f"{row['location']}:{row['member']}" if row['member']
+                                       else row['location'] for row in result['index']}
+                elif _batch_incremental:
+                    update = _batch_tool.update_removal_list(**customer)
+                    result.update(update, status='success' if update['written'] else 'unchanged')
+                else:
+                    result['files'] = _batch_tool.generate_removal_list(**customer)
+                results.append(result)
+            except Exception as e:
+                results.append({'customer_id': customer['customer_id'], 'status': 'error', 'message': str(e)})
+    finally:
+        if bundle:
+            bundle.close()
+    return results
+
+def _chunked(iterable, size):
+    chunk = []
+    for item in iterable:
+        chunk.append(item)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+def generate_batch(roster_path, workers=None, chunk_size=200, incremental=False, compression=None,
+                   layout='flat', batch_dir=None):
+    """Generate removal files for every customer in a roster using a process pool
+    
+    Yields one result per customer as chunks complete. Only a bounded number of
+    chunks is in flight at a time, so memory stays flat regardless of roster size.
+    With incremental=True customers are updated in place (see update_removal_list)
+    and those with nothing to rewrite come back with status 'unchanged'. With a
+    sharded/zip/tar layout, files go under batch_dir and each result carries the
+    'index' rows that locate them.
+    """
+    workers = workers or os.cpu_count() or 1
+    max_in_flight = workers * 2
+    chunks = _chunked(load_roster(roster_path), chunk_size)
+    
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_batch_worker,
+                             initargs=(incremental, compression, layout, batch_dir)) as executor:
+        pending = set()
+        for part, chunk in enumerate(chunks, 1):
+            pending.add(executor.submit(_generate_batch_chunk, chunk, part))
+            if len(pending) >= max_in_flight:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield from future.result()
+        for future in pending:
+            yield from future.result()
+
+def run_batch(roster_path, workers=None, incremental=False, compression=None, layout='flat'):
+    """Non-interactive entry point for processing a whole customer roster"""
     tool = DataBrokerRemovalTool()
+    batch_dir = None
+    index = None
+    if layout != 'flat':
+        batch_dir = claim_batch_path(tool.output_dir, "batch", directory=True)
+        manifest_file = batch_dir / "manifest.jsonl"
+        index = ArchiveIndex(batch_dir)
+    else:
+        manifest_file = claim_batch_path(tool.output_dir, "batch_manifest", ".jsonl")
+    
+    print("="*80)
+    print("DATA BROKER REMOVAL REQUEST GENERATOR - BATCH MODE")
+    print("="*80)
+    print(f"\nRoster: {roster_path}")
+    print(f"Brokers: {len(tool.brokers)}")
+    print(f"Workers: {workers or os.cpu_count() or 1}")
+    if incremental:
+        print("Mode: incremental (only changed files are rewritten)")
+    if layout != 'flat':
+        print(f"Layout: {layout} ({batch_dir})")
+    if compression:
+        print(f"Compression: {compression}")
+    print()
+    
+    start = datetime.now()
+    success = 0
+    unchanged = 0
+    files_written = 0
+    errors = 0
+    store = StatusStore()
+    pending_records = []
+    index_rows = []
+    with open(manifest_file, 'w') as manifest:
+        for result in generate_batch(roster_path, workers=workers, incremental=incremental,
+                                     compression=compression, layout=layout, batch_dir=batch_dir):
+            rows = result.pop('index', None)
+            if rows:
+                index_rows.extend(rows)
+                if len(index_rows) >= 3000:
+                    index.add(index_rows)
+                    index_rows = []
+            manifest.write(json.dumps(result) + "\n")
+            if result['status'] == 'unchanged':
+                unchanged += 1
+            elif result['status'] == 'success':
+                files_written += len(result.get('written', ()))
+                success += 1
+                pending_records.append((result['customer_id'], result['name'], result['email']))
+                if len(pending_records) >= 1000:
+                    store.record_checklists(pending_records, tool.brokers)
+                    pending_records = []
+            else:
+                errors += 1
+                print(f"  ✗ {result['customer_id']}: {result['message']}")
+            if (success + unchanged + errors) % 1000 == 0:
+                print(f"  Processed {success + unchanged + errors} customers...")
+    
+    if pending_records:
+        store.record_checklists(pending_records, tool.brokers)
+    store.close()
+    if index:
+        if index_rows:
+            index.add(index_rows)
+        index.close()
+    
+    elapsed = (datetime.now() - start).total_seconds()
+    print("\n" + "="*80)
+    print("✅ BATCH COMPLETE!")
+    print("="*80)
+    if incremental:
+        print(f"\n✓ Regenerated: {success} ({files_written} file(s) rewritten)")
+        print(f"= Unchanged: {unchanged}")
+    else:
+        print(f"\n✓ Successful: {success}")
+    print(f"✗ Errors: {errors}")
+    print(f"Elapsed: {elapsed:.1f}s")
+    print(f"Manifest: {manifest_file}")
+    if index:
+        print(f"Index: {index.path}")
+    print(f"Status database: {store.db_path}")
+    print("="*80 + "\n")
+    return errors == 0
+
+def main():
+    parser = argparse.ArgumentParser(description="Data Broker Removal Request Generator")
+    parser.add_argument('--batch', metavar='ROSTER',
+                        help="Non-interactive mode: generate files for every customer in a CSV or JSONL roster")
+    parser.add_argument('--workers', type=int, default=None,
+                        help="Number of worker processes for batch mode (default: CPU count)")
+    parser.add_argument('--incremental', action='store_true',
+                        help="Batch mode: keep one directory per customer and rewrite only files whose inputs changed")
+    parser.add_argument('--gzip', action='store_true', help="Batch mode: write gzip-compressed files (.gz)")
+    parser.add_argument('--layout', choices=LAYOUTS, default='flat',
+                        help="Batch mode: loose files in output/ (flat), hash-sharded directories, or zip/tar "
+                             "bundles, all indexed in output/batch_<timestamp>_<pid>/index.sqlite (default: flat)")
+    args = parser.parse_args()
+    
+    if (args.incremental or args.gzip or args.layout != 'flat') and not args.batch:
+        parser.error("--incremental, --gzip and --layout require --batch")
+    if args.incremental and args.layout != 'flat':
+        parser.error("--incremental keeps its own per-customer directories; use it without --layout")
+    if args.gzip and args.layout == 'zip':
+        parser.error("zip bundles are already compressed; use --gzip with flat, sharded or tar")
+    if args.batch:
+        compression = 'gzip' if args.gzip else None
+        sys.exit(0 if run_batch(args.batch, workers=args.workers, incremental=args.incremental,
+                                compression=compression, layout=args.layout) else 1)
+    
+    tool = DataBrokerRemovalTool(status_store=StatusStore())
     
     print("="*80)
     print("DATA BROKER REMOVAL REQUEST GENERATOR")
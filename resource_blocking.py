@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+Resource Blocking Profiles
+Opt-out pages are mostly images, fonts, video and ad/analytics scripts, none of
+which are needed to fill a form. A profile is a list of URL patterns handed to
+Chrome's Network.setBlockedURLs before each page load, so it can change from
+one broker to the next on the same (pooled) browser.
+
+Profiles:
+  none    - load everything
+  media   - block images, video/audio and web fonts
+  full    - media plus known third-party ad and analytics hosts
+
+Interactive runs default to none and unattended runs to full.
+A broker in data_brokers.json may override the run's profile with
+"resource_blocking" (for example "none" where blocking breaks the form).
+
+Usage: python3 resource_blocking.py [--profile full] [--broker NAME ...]
+  loads each opt-out page with and without blocking and reports the savings
+"""
+
+import argparse
+import platform
+import time
+
+MEDIA_EXTENSIONS = (
+    'png', 'jpg', 'jpeg', 'gif', 'webp', 'avif', 'ico', 'bmp',
+    'mp4', 'webm', 'ogg', 'mp3', 'm4a', 'mov',
+    'woff', 'woff2', 'ttf', 'otf', 'eot',
+)
+# Chrome matches a pattern against the whole URL, so each extension needs a second
+# pattern for paths followed by a query string (logo.png?v=3, font.woff2?abc)
+MEDIA_PATTERNS = tuple(pattern for ext in MEDIA_EXTENSIONS for pattern in (f'*.{ext}', f'*.{ext}?*'))
+
+# Third-party ad and analytics hosts. CAPTCHA providers are deliberately absent.
+TRACKER_PATTERNS = (
+    '*doubleclick.net*', '*googlesyndication.com*', '*googleadservices.com*',
+    '*google-analytics.com*', '*googletagmanager.com*', '*googletagservices.com*',
+    '*adservice.google.com*', '*connect.facebook.net*', '*facebook.com/tr*',
+    '*amazon-adsystem.com*', '*adsrvr.org*', '*adnxs.com*', '*criteo.com*', '*criteo.net*',
+    '*taboola.com*', '*outbrain.com*', '*scorecardresearch.com*', '*quantserve.com*',
+    '*hotjar.com*', '*fullstory.com*', '*segment.com*', '*segment.io*', '*mixpanel.com*',
+    '*newrelic.com*', '*nr-data.net*', '*bing.com/bat*', '*bat.bing.com*',
+    '*pubmatic.com*', '*rubiconproject.com*', '*openx.net*', '*moatads.com*',
+)
+
+PROFILES = {
+    'none': (),
+    'media': MEDIA_PATTERNS,
+    'full': MEDIA_PATTERNS + TRACKER_PATTERNS,
+}
+# Unattended and roster runs block by default. With a person at the keyboard pages
+# load in full, so what they see (and solve) matches their own browser.
+DEFAULT_PROFILE = 'full'
+INTERACTIVE_PROFILE = 'none'
+
+# Bytes the page pulled over the network, as reported by the Resource Timing API.
+# Cross-origin resources without Timing-Allow-Origin report 0, so this is a lower bound.
+PAGE_WEIGHT_JS = """
+const entries = performance.getEntriesByType('navigation').concat(performance.getEntriesByType('resource'));
+let bytes = 0;
+for (const entry of entries) {
+    bytes += entry.transferSize || 0;
+}
+return [bytes, entries.length];
+"""
+
+def default_profile(interactive):
+    """The run's profile when --block-resources is not given"""
+    return INTERACTIVE_PROFILE if interactive else DEFAULT_PROFILE
+
+def resolve_profile(broker, default=DEFAULT_PROFILE):
+    """Pick the blocking profile for a broker, honouring its override"""
+    if broker is not None and broker.get('resource_blocking') in PROFILES:
+        return broker['resource_blocking']
+    return default
+
+def apply_profile(driver, profile):
+    """Install a profile's blocked URL patterns on a Chromium driver; returns False if unsupported"""
+    try:
+        driver.execute_cdp_cmd('Network.enable', {})
+        driver.execute_cdp_cmd('Network.setBlockedURLs', {'urls': list(PROFILES[profile])})
+        return True
+    except Exception:
+        return False
+
+def page_weight(driver):
+    """(bytes transferred, request count) for the current page"""
+    try:
+        bytes_transferred, requests = driver.execute_script(PAGE_WEIGHT_JS)
+        return int(bytes_transferred), int(requests)
+    except Exception:
+        return None, None
+
+def compare(tool, brokers, profile):
+    """Load each broker's opt-out page without and with blocking; print and return the rows"""
+    rows = []
+    print(f"\n{'Broker':<22} {'KB (none)':>10} {f'KB ({profile})':>12} {'Load (none)':>12} {f'Load ({profile})':>14}")
+    print("-"*76)
+    for broker in brokers:
+        row = {'broker': broker['name']}
+        for label in ('none', profile):
+            # Start each load with a cold cache so the second is not served from the first
+            tool.driver.execute_cdp_cmd('Network.clearBrowserCache', {})
+            tool.open_page(broker['opt_out_url'], dict(broker.to_dict(), resource_blocking=label))
+            row[label] = (tool.page_timing.get('bytes_transferred') or 0, tool.page_timing['load_time'])
+        rows.append(row)
+        print(f"{broker['name']:<22} {row['none'][0] / 1024:>10.0f} {row[profile][0] / 1024:>12.0f} "
+              f"{row['none'][1]:>11.2f}s {row[profile][1]:>13.2f}s")
+
+    if rows:
+        bytes_saved = sum(r['none'][0] - r[profile][0] for r in rows)
+        time_saved = sum(r['none'][1] - r[profile][1] for r in rows)
+        print("-"*76)
+        print(f"Saved with '{profile}': {bytes_saved / 1024 / 1024:.1f} MB and {time_saved:.1f}s "
+              f"over {len(rows)} page(s)\n")
+    return rows
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure what resource blocking saves on opt-out pages")
+    parser.add_argument('--profile', choices=[p for p in PROFILES if p != 'none'], default=DEFAULT_PROFILE)
+    parser.add_argument('--broker', action='append', help="Only these brokers (repeatable)")
+    args = parser.parse_args()
+
+    if platform.system() == "Windows":
+        from auto_optout_windows import AutoOptOutTool
+    else:
+        from auto_optout import AutoOptOutTool
+    tool = AutoOptOutTool(headless=True, interactive=False)
+    brokers = tool.brokers.select(args.broker) if args.broker else list(tool.brokers.with_method('web_form'))
+    tool.init_driver()
+    start = time.monotonic()
+    try:
+        compare(tool, brokers, args.profile)
+    finally:
+        tool.close_driver()
+    print(f"Finished in {time.monotonic() - start:.0f}s\n")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Results Journal
+Appends each opt-out result to a JSONL journal as soon as the broker finishes,
+so a crash, Ctrl-C or browser failure loses at most the broker in progress.
+Writes are flushed per line and fsync'd in batches. A resumed run reads the
+journal and skips (customer, broker) pairs that are already done.
+"""
+
+import json
+import os
+import threading
+import time
+from datetime import datetime
+
+JOURNAL_NAME = "optout_journal.jsonl"
+FSYNC_EVERY = 10
+FSYNC_INTERVAL = 2.0
+
+# Results in these states are not retried on --resume
+DONE_STATUSES = ('success', 'manual', 'skipped')
+
+def customer_key(user_info):
+    """Identifier used to pair results with customers across runs"""
+    return user_info.get('customer_id') or user_info['email']
+
+class ResultsJournal:
+    def __init__(self, log_dir, resume=False, fsync_every=FSYNC_EVERY, fsync_interval=FSYNC_INTERVAL):
+        log_dir.mkdir(exist_ok=True)
+        self.path = log_dir / JOURNAL_NAME
+        self.fsync_every = fsync_every
+        self.fsync_interval = fsync_interval
+        self.lock = threading.Lock()
+        self.completed = {}
+
+        if self.path.exists():
+            if resume:
+                self.completed = self._read_completed()
+            else:
+                # Starting over: keep the old journal next to the new one
+                timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+                self.path.rename(self.path.with_name(f"optout_journal_{timestamp}.jsonl"))
+
+        self.file = open(self.path, 'a', encoding='utf-8')
+        if self.file.tell() > 0 and not self._ends_with_newline():
+            # Terminate a torn line so the next record starts cleanly
+            self.file.write("\n")
+        self.pending = 0
+        self.last_sync = time.monotonic()
+
+    def _read_completed(self):
+        completed = {}
+        with open(self.path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    result = json.loads(line)
+                except ValueError:
+                    # A torn final line from a crash mid-write
+                    continue
+                pair = (result.get('customer'), result.get('broker'))
+                if result.get('status') in DONE_STATUSES:
+                    completed[pair] = result
+                else:
+                    completed.pop(pair, None)
+        return completed
+
+    def _ends_with_newline(self):
+        with open(self.path, 'rb') as f:
+            f.seek(-1, os.SEEK_END)
+            return f.read(1) == b"\n"
+
+    def is_done(self, customer, broker_name):
+        return (customer, broker_name) in self.completed
+
+    def append(self, result):
+        """Record one finished broker"""
+        line = json.dumps(result) + "\n"
+        with self.lock:
+            self.file.write(line)
+            self.file.flush()
+            self.pending += 1
+            if self.pending >= self.fsync_every or time.monotonic() - self.last_sync >= self.fsync_interval:
+                self._sync()
+
+    def _sync(self):
+        os.fsync(self.file.fileno())
+        self.pending = 0
+        self.last_sync = time.monotonic()
+
+    def close(self):
+        with self.lock:
+            if not self.file.closed:
+                self._sync()
+                self.file.close()
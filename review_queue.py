@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+"""
+Needs-Human Review Queue
+In unattended runs, steps that need a person (searching for a listing, CAPTCHAs,
+ID upload) are deferred here instead of blocking a browser. A reviewer then
+works through the queue in one sitting:
+
+  python3 review_queue.py            # review every pending item
+  python3 review_queue.py --list     # show what is waiting
+
+The queue is an append-only JSONL file; resolving an item appends a resolution
+record rather than rewriting the file.
+"""
+
+import argparse
+import json
+import platform
+import sys
+import threading
+import uuid
+from datetime import datetime
+from pathlib import Path
+
+from form_fill import autofill_form
+
+QUEUE_NAME = "needs_human.jsonl"
+
+# Customer fields kept with each item so the reviewer can finish the form
+CUSTOMER_FIELDS = ('customer_id', 'name', 'email', 'address', 'city', 'state', 'zip_code', 'phone')
+
+class ReviewQueue:
+    def __init__(self, log_dir):
+        log_dir.mkdir(exist_ok=True)
+        self.path = log_dir / QUEUE_NAME
+        self.lock = threading.Lock()
+
+    def defer(self, broker, user_info, reason, page_url=None, screenshot=None):
+        """Add a (customer, broker) step that needs a person; returns the item id"""
+        item = {
+            'id': uuid.uuid4().hex,
+            'created_at': datetime.now().isoformat(),
+            'broker': broker['name'],
+            'opt_out_url': broker['opt_out_url'],
+            'page_url': page_url,
+            'reason': reason,
+            'screenshot': screenshot,
+            'customer': {k: user_info[k] for k in CUSTOMER_FIELDS if user_info.get(k)},
+        }
+        self._append(item)
+        return item['id']
+
+    def resolve(self, item_id, status, message=""):
+        self._append({'resolved': item_id, 'status': status, 'message': message,
+                      'resolved_at': datetime.now().isoformat()})
+
+    def _append(self, record):
+        with self.lock:
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(record) + "\n")
+
+    def pending(self):
+        """Items that have not been resolved yet, oldest first"""
+        if not self.path.exists():
+            return []
+        items = {}
+        with open(self.path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue
+                if 'resolved' in record:
+                    items.pop(record['resolved'], None)
+                else:
+                    items[record['id']] = record
+        return list(items.values())
+
+def review(queue, tool_class, status_store=None):
+    """Walk a reviewer through every pending item in a visible browser"""
+    items = queue.pending()
+    if not items:
+        print("\nNothing waiting for review.\n")
+        return
+
+    print("\n" + "="*80)
+    print(f"REVIEW QUEUE - {len(items)} item(s)")
+    print("="*80)
+
+    tool = tool_class(headless=False)
+    tool.init_driver()
+    results = []
+    try:
+        for idx, item in enumerate(items, 1):
+            customer = item['customer']
+            print(f"\n[{idx}/{len(items)}] {item['broker']} for {customer.get('name')} ({customer.get('email')})")
+            print(f"  Reason: {item['reason']}")
+            for key in CUSTOMER_FIELDS[1:]:
+                if customer.get(key):
+                    print(f"  {key}: {customer[key]}")
+
+            broker = tool.brokers.get(item['broker']) or {'name': item['broker'], 'opt_out_url': item['opt_out_url']}
+            tool.open_page(item.get('page_url') or item['opt_out_url'], broker)
+            try:
+                autofill_form(tool.driver, customer)
+            except Exception:
+                pass
+            response = input("\nFinish the opt-out in the browser, then Enter = done, s = skip, q = quit: ").strip().lower()
+            if response == 'q':
+                break
+            if response == 's':
+                continue
+
+            queue.resolve(item['id'], 'success', 'Completed by reviewer')
+            results.append({
+                'broker': item['broker'],
+                'customer': customer.get('customer_id') or customer.get('email'),
+                'status': 'success',
+                'message': 'Completed by reviewer',
+                'timestamp': datetime.now().isoformat(),
+            })
+    finally:
+        tool.close_driver()
+
+    if status_store and results:
+        status_store.record_results(results)
+    print(f"\n✓ Reviewed {len(results)} item(s), {len(queue.pending())} still waiting\n")
+
+def main():
+    parser = argparse.ArgumentParser(description="Work through opt-out steps that need a person")
+    parser.add_argument('--list', action='store_true', help="Only list pending items")
+    args = parser.parse_args()
+
+    queue = ReviewQueue(Path(__file__).parent / "logs")
+    if args.list:
+        items = queue.pending()
+        print(f"\n{len(items)} item(s) waiting for review\n")
+        for item in items:
+            print(f"  {item['created_at'][:16]}  {item['broker']:<20} {item['customer'].get('email', ''):<30} {item['reason']}")
+        print()
+        return
+
+    if platform.system() == "Windows":
+        from auto_optout_windows import AutoOptOutTool
+    else:
+        from auto_optout import AutoOptOutTool
+    from status_store import StatusStore
+    review(queue, AutoOptOutTool, StatusStore())
+
+if __name__ == "__main__":
+    try:
+        main()
+    except KeyboardInterrupt:
+        print("\n\nReview interrupted by user.")
+        sys.exit(0)
@@ -0,0 +1,429 @@
+#!/usr/bin/env python3
+"""
+Job Scheduler
+Holds the (customer, broker) opt-out jobs of a run and hands them to workers in
+an order that is polite to brokers and keeps workers busy:
+
+- Each broker domain has a token bucket (--broker-rate, or a broker's own
+  "rate_limit" in data_brokers.json). A domain that is cooling down is set
+  aside, and workers take jobs for other brokers in the meantime.
+- Jobs have a priority: new customers first, retries next, rechecks (pairs
+  queued by the re-listing monitor) last. Within a priority, jobs run in the
+  order they were queued.
+- With CircuitBreakers, a failed job is requeued as a retry after a backoff,
+  and a broker whose breaker is open has its jobs parked until a probe
+  succeeds (see circuit_breaker.py). Jobs for a broker whose breaker gave up
+  are dropped and kept in `abandoned`.
+- The clock is injectable. pop() never blocks, so a schedule can be stepped
+  through with a simulated clock; get() is the blocking version for threads.
+
+python3 scheduler.py simulates a run without browsers and reports throughput
+and queue depth:
+
+  python3 scheduler.py --customers 200 --workers 8 --broker-rate 6/min --service-time 4
+
+--down BROKER makes every job for that broker fail, to see the breaker at work.
+"""
+
+import argparse
+import asyncio
+import heapq
+import itertools
+import threading
+import time
+
+from broker_registry import domain_of
+from circuit_breaker import CLOSED, DEFAULT_COOLDOWN, DEFAULT_RETRIES, DEFAULT_THRESHOLD, CircuitBreakers
+from rate_limit import DomainLimiter, parse_rate
+
+DEFAULT_BROKER_RATE = "6/min"
+
+PRIORITY_NEW = 0
+PRIORITY_RETRY = 1
+PRIORITY_RECHECK = 2
+
+PRIORITY_NAMES = {PRIORITY_NEW: 'new', PRIORITY_RETRY: 'retry', PRIORITY_RECHECK: 'recheck'}
+
+class Job:
+    """One (customer, broker) opt-out waiting in the scheduler"""
+    __slots__ = ('customer', 'broker', 'domain', 'priority', 'seq', 'queued_at', 'attempts')
+
+    def __init__(self, customer, broker, domain, priority, seq, queued_at):
+        self.customer = customer
+        self.broker = broker
+        self.domain = domain
+        self.priority = priority
+        self.seq = seq
+        self.queued_at = queued_at
+        self.attempts = 0
+
+    def __repr__(self):
+        return f"Job({self.broker['name']!r}, {PRIORITY_NAMES.get(self.priority, self.priority)})"
+
+def broker_domain(broker):
+    """Domain whose rate limit a broker's jobs share"""
+    return getattr(broker, 'domain', None) or domain_of(broker.get('opt_out_url') or broker.get('website') or '')
+
+def job_priority(customer):
+    """Customers queued by the re-listing monitor are rechecks; everyone else is new"""
+    return PRIORITY_RECHECK if customer.get('only_brokers') is not None else PRIORITY_NEW
+
+def parse_broker_rate(text):
+    """--broker-rate value as jobs per second, or None for 'none' (no limit)"""
+    if str(text).strip().lower() in ('none', 'off', '0'):
+        return None
+    return parse_rate(text)
+
+def broker_rates(brokers):
+    """{domain: events per second} for brokers that set their own "rate_limit" """
+    rates = {}
+    for broker in brokers:
+        if broker.get('rate_limit'):
+            try:
+                rates[broker_domain(broker)] = parse_rate(broker['rate_limit'])
+            except ValueError as e:
+                print(f"  Warning: Ignoring rate_limit for {broker['name']}: {e}")
+    return rates
+
+class JobScheduler:
+    """Priority job queue with a token bucket per broker domain
+
+    Jobs wait in one heap per domain. Domains whose bucket has a token sit in a
+    ready heap ordered by their best job; the rest sit in a cooling heap ordered by
+    when their next token arrives. Picking a job is O(log domains).
+
+    Parking an open breaker's jobs cools their whole domain, so brokers that share
+    a domain are parked together.
+    """
+
+    def __init__(self, rate=None, overrides=None, clock=time.monotonic, breakers=None):
+        # rate is events per second per domain; None means no limit
+        self.limiter = DomainLimiter(rate, clock=clock, overrides=overrides) if rate else None
+        # Optional CircuitBreakers: retries failed jobs and parks brokers that keep failing
+        self.breakers = breakers
+        self.clock = clock
+        self.domains = {}
+        self.ready = []
+        self.cooling = []
+        self.state = {}
+        self.seq = itertools.count()
+        self.cond = threading.Condition()
+        self.size = 0
+        self.in_flight = 0
+        self.started = clock()
+        self.stats = {'queued': 0, 'dispatched': 0, 'completed': 0, 'throttled': 0, 'parked': 0, 'retried': 0,
+                      'max_depth': 0,
+                      'depth_total': 0, 'wait_total': 0.0}
+        self.by_priority = {}
+        # Jobs dropped because their broker's breaker gave up
+        self.abandoned = []
+
+    def add(self, customer, broker, priority=None):
+        """Queue one job; returns it"""
+        with self.cond:
+            now = self.clock()
+            priority = job_priority(customer) if priority is None else priority
+            job = Job(customer, broker, broker_domain(broker), priority, next(self.seq), now)
+            self._push(job, now)
+            self.stats['queued'] += 1
+            self.stats['max_depth'] = max(self.stats['max_depth'], self.size)
+            self.cond.notify()
+            return job
+
+    def requeue(self, job, priority=PRIORITY_RETRY, delay=0.0):
+        """Put a job back (e.g. to retry it), optionally not before `delay` seconds from now"""
+        with self.cond:
+            if self.breakers is not None:
+                self.breakers.release(job.broker['name'])
+            self._requeue(job, priority, delay)
+
+    def _requeue(self, job, priority, delay):
+        now = self.clock()
+        job.priority = priority
+        job.seq = next(self.seq)
+        job.queued_at = now + delay
+        self.in_flight -= 1
+        self._push(job, now, not_before=now + delay)
+        self.cond.notify_all()
+
+    def _push(self, job, now, not_before=None):
+        heap = self.domains.setdefault(job.domain, [])
+        heapq.heappush(heap, (job.priority, job.seq, job))
+        self.size += 1
+        state = self.state.get(job.domain)
+        if state is None:
+            available = now + (self.limiter.delay(job.domain) if self.limiter else 0.0)
+            if not_before is not None:
+                available = max(available, not_before)
+            if available > now:
+                self._cool(job.domain, available)
+            else:
+                self._make_ready(job.domain)
+        elif state == 'ready' and heap[0][2] is job:
+            # The new job is now the domain's best; older ready entries for it go stale
+            heapq.heappush(self.ready, (job.priority, job.seq, job.domain))
+
+    def _cool(self, domain, available_at):
+        self.state[domain] = 'cooling'
+        heapq.heappush(self.cooling, (available_at, domain))
+
+    def _make_ready(self, domain):
+        heap = self.domains.get(domain)
+        if not heap:
+            self.domains.pop(domain, None)
+            self.state.pop(domain, None)
+            return
+        self.state[domain] = 'ready'
+        priority, seq, _ = heap[0]
+        heapq.heappush(self.ready, (priority, seq, domain))
+
+    def pop(self, now=None):
+        """The best job that may run now, or None; never blocks"""
+        with self.cond:
+            now = self.clock() if now is None else now
+            while self.cooling and self.cooling[0][0] <= now:
+                _, domain = heapq.heappop(self.cooling)
+                self._make_ready(domain)
+            while self.ready:
+                priority, seq, domain = heapq.heappop(self.ready)
+                heap = self.domains.get(domain)
+                if self.state.get(domain) != 'ready' or not heap or heap[0][1] != seq:
+                    continue
+                if heap[0][2].queued_at > now:
+                    # A delayed retry is at the front; hold the domain until it is due
+                    self._cool(domain, heap[0][2].queued_at)
+                    continue
+                if self.limiter and self.limiter.delay(domain) > 0:
+                    self.stats['throttled'] += 1
+                    self._cool(domain, now + self.limiter.delay(domain))
+                    continue
+                # Checked after the limiter so a half-open probe is only admitted when it will run
+                wait = self.breakers.wait(heap[0][2].broker['name'], now) if self.breakers else 0.0
+                if wait is None:
+                    self._abandon(domain, heap[0][2].broker['name'])
+                    continue
+                if wait > 0:
+                    self.stats['parked'] += 1
+                    self._cool(domain, now + wait)
+                    continue
+                if self.limiter:
+                    self.limiter.try_acquire(domain)
+                _, _, job = heapq.heappop(heap)
+                self.size -= 1
+                delay = self.limiter.delay(domain) if self.limiter and heap else 0.0
+                if delay > 0:
+                    # The domain's next job has to wait for a token: that is a cool-down too
+                    self.stats['throttled'] += 1
+                    self._cool(domain, now + delay)
+                else:
+                    self._make_ready(domain)
+                self._dispatched(job, now)
+                return job
+            return None
+
+    def _abandon(self, domain, name):
+        heap = self.domains[domain]
+        keep = [entry for entry in heap if entry[2].broker['name'] != name]
+        self.abandoned.extend(entry[2] for entry in heap if entry[2].broker['name'] == name)
+        self.size -= len(heap) - len(keep)
+        heapq.heapify(keep)
+        self.domains[domain] = keep
+        self._make_ready(domain)
+
+    def _dispatched(self, job, now):
+        self.in_flight += 1
+        self.stats['dispatched'] += 1
+        self.stats['depth_total'] += self.size
+        self.stats['wait_total'] += max(0.0, now - job.queued_at)
+        job.attempts += 1
+
+    def next_ready_in(self, now=None):
+        """Seconds until pop() may return a job (0 if it may now), or None if nothing is queued"""
+        with self.cond:
+            now = self.clock() if now is None else now
+            if not self.size:
+                # Cooling entries can outlive their domain's jobs (e.g. after a probe wakes it)
+                return None
+            if self.ready:
+                return 0.0
+            if self.cooling:
+                return max(0.0, self.cooling[0][0] - now)
+            return None
+
+    def get(self):
+        """Block until a job may run; None once the queue is empty and nothing is in flight"""
+        with self.cond:
+            while True:
+                job = self.pop()
+                if job is not None:
+                    return job
+                wait = self.next_ready_in()
+                if wait is None and self.in_flight == 0:
+                    self.cond.notify_all()
+                    return None
+                # A finished job may requeue a retry, so wait for it as well as for cooling domains
+                self.cond.wait(wait)
+
+    async def get_async(self, poll=0.05):
+        """get() for asyncio callers: sleeps on the event loop instead of blocking it"""
+        while True:
+            job = self.pop()
+            if job is not None:
+                return job
+            wait = self.next_ready_in()
+            if wait is None and self.in_flight == 0:
+                return None
+            await asyncio.sleep(wait if wait is not None else poll)
+
+    def done(self, job, result=None):
+        """Mark a dispatched job finished; returns True if it failed and was requeued to retry
+
+        Pass the job's result so the breakers see it. A job requeued here will be
+        handed out again, so its caller should not record the result.
+        """
+        with self.cond:
+            if self.breakers is not None and result is not None:
+                tripped = self.breakers.state(job.broker['name']) != CLOSED
+                failed = self.breakers.record(job.broker['name'], result)
+                if tripped and self.state.get(job.domain) == 'cooling':
+                    # A probe finished, so parked jobs may run now (or wait out a new cool-down).
+                    # Every check in pop() still applies, so the stale cooling entry is harmless.
+                    self._make_ready(job.domain)
+                if failed:
+                    delay = self.breakers.retry_delay(job.attempts)
+                    if delay is not None:
+                        self.stats['retried'] += 1
+                        self._requeue(job, PRIORITY_RETRY, delay)
+                        return True
+            self.in_flight -= 1
+            self.stats['completed'] += 1
+            key = PRIORITY_NAMES.get(job.priority, job.priority)
+            self.by_priority[key] = self.by_priority.get(key, 0) + 1
+            self.cond.notify_all()
+            return False
+
+    def drain(self):
+        """Remove and return every queued job (e.g. when no worker is left to run them)"""
+        with self.cond:
+            jobs = [job for heap in self.domains.values() for _, _, job in heap]
+            self.domains.clear()
+            self.ready.clear()
+            self.cooling.clear()
+            self.state.clear()
+            self.size = 0
+            self.cond.notify_all()
+            return jobs
+
+    def __len__(self):
+        return self.size
+
+    def summary(self, now=None):
+        elapsed = (self.clock() if now is None else now) - self.started
+        dispatched = self.stats['dispatched'] or 1
+        throughput = self.stats['completed'] / elapsed * 3600 if elapsed > 0 else 0
+        lines = [f"Scheduler: {self.stats['completed']} job(s) done, {throughput:.0f} jobs/hour",
+                 f"  Queue depth: max {self.stats['max_depth']}, average {self.stats['depth_total'] / dispatched:.0f} "
+                 f"at dispatch; average wait {self.stats['wait_total'] / dispatched:.1f}s",
+                 f"  Domain cool-downs: {self.stats['throttled']}"]
+        if self.breakers is not None:
+            lines.append(f"  Retries: {self.stats['retried']}; parked by an open breaker: {self.stats['parked']}; "
+                         f"abandoned: {len(self.abandoned)}")
+        if self.by_priority:
+            lines.append("  By priority: " + ", ".join(f"{name} {count}" for name, count in self.by_priority.items()))
+        return "\n".join(lines)
+
+class SimulatedClock:
+    """A clock that only moves when told to"""
+
+    def __init__(self, start=0.0):
+        self.now = start
+
+    def __call__(self):
+        return self.now
+
+def simulate(scheduler, clock, workers, service_time, outcome=None):
+    """Run a scheduler to completion with `workers` simulated workers; returns the finish time
+
+    `service_time(job)` is how long a job occupies a worker and `outcome(job)` its
+    result (passed to done() for the breakers).
+    """
+    free_at = [(clock.now, worker_id) for worker_id in range(workers)]
+    heapq.heapify(free_at)
+    running = []
+    finish = clock.now
+    while free_at:
+        at, worker_id = heapq.heappop(free_at)
+        # Finish every job that ends before this worker looks for more
+        while running and running[0][0] <= at:
+            end, _, job = heapq.heappop(running)
+            clock.now = end
+            scheduler.done(job, outcome(job) if outcome else None)
+        clock.now = max(clock.now, at)
+        job = scheduler.pop()
+        if job is not None:
+            end = clock.now + service_time(job)
+            heapq.heappush(running, (end, job.seq, job))
+            heapq.heappush(free_at, (end, worker_id))
+            finish = max(finish, end)
+            continue
+        wait = scheduler.next_ready_in()
+        if wait is None and running:
+            # A running job may still fail and come back as a retry
+            wait = running[0][0] - clock.now
+        if wait is not None:
+            heapq.heappush(free_at, (clock.now + max(wait, 1e-6), worker_id))
+    while running:
+        end, _, job = heapq.heappop(running)
+        clock.now = end
+        scheduler.done(job, outcome(job) if outcome else None)
+    clock.now = finish
+    return finish
+
+def main():
+    from pathlib import Path
+
+    from broker_registry import load_registry
+
+    parser = argparse.ArgumentParser(description="Simulate the opt-out job scheduler with a simulated clock")
+    parser.add_argument('--customers', type=int, default=100)
+    parser.add_argument('--rechecks', type=int, default=0, help="Extra recheck jobs queued behind the new customers")
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--broker-rate', default=DEFAULT_BROKER_RATE,
+                        help=f"Jobs per broker domain, or 'none' (default: {DEFAULT_BROKER_RATE})")
+    parser.add_argument('--service-time', type=float, default=5.0, help="Seconds one job occupies a worker")
+    parser.add_argument('--down', action='append', default=[], metavar='BROKER',
+                        help="Every job for this broker fails after --page-timeout (repeatable)")
+    parser.add_argument('--page-timeout', type=float, default=30.0, help="Seconds a failing job occupies a worker")
+    parser.add_argument('--retries', type=int, default=DEFAULT_RETRIES)
+    parser.add_argument('--breaker-threshold', type=int, default=DEFAULT_THRESHOLD)
+    parser.add_argument('--breaker-cooldown', type=float, default=DEFAULT_COOLDOWN)
+    args = parser.parse_args()
+
+    try:
+        rate = parse_broker_rate(args.broker_rate)
+    except ValueError as e:
+        parser.error(str(e))
+
+    brokers = load_registry(Path(__file__).parent / "data_brokers.json")
+    clock = SimulatedClock()
+    breakers = CircuitBreakers(args.retries, args.breaker_threshold, args.breaker_cooldown, clock=clock)
+    scheduler = JobScheduler(rate, broker_rates(brokers), clock=clock, breakers=breakers)
+    for idx in range(args.customers):
+        for broker in brokers:
+            scheduler.add({'customer_id': str(idx)}, broker)
+    for idx in range(args.rechecks):
+        broker = brokers.records[idx % len(brokers.records)]
+        scheduler.add({'customer_id': f"recheck-{idx}", 'only_brokers': [broker['name']]}, broker)
+
+    down = set(args.down)
+    finish = simulate(scheduler, clock, args.workers,
+                      lambda job: args.page_timeout if job.broker['name'] in down else args.service_time,
+                      lambda job: {'status': 'error' if job.broker['name'] in down else 'success'})
+    busy = scheduler.stats['completed'] * args.service_time / (args.workers * finish) if finish else 0
+    print(f"\nSimulated {scheduler.stats['queued']} job(s) on {args.workers} worker(s): "
+          f"{finish / 3600:.2f} simulated hours, workers busy {busy:.0%}")
+    print(scheduler.summary())
+    print(breakers.summary() + "\n")
+
+if __name__ == "__main__":
+    main()
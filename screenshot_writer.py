@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""
+Background Screenshot Writer
+The browser loop captures screenshots as in-memory PNG bytes and hands them to
+a writer thread, so it never waits on encoding or disk. The writer optionally
+downscales and re-encodes (WebP or quality-limited JPEG, needs Pillow) and
+deduplicates identical frames by content hash, hard-linking repeats instead of
+writing them again.
+"""
+
+import hashlib
+import io
+import os
+import queue
+import threading
+from datetime import datetime
+
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
+
+SCREENSHOT_FORMATS = ('png', 'webp', 'jpeg')
+EXTENSIONS = {'png': '.png', 'webp': '.webp', 'jpeg': '.jpg'}
+DEFAULT_QUALITY = 70
+QUEUE_SIZE = 256
+
+class ScreenshotWriter:
+    def __init__(self, log_dir, image_format='png', max_width=None, quality=DEFAULT_QUALITY):
+        if image_format != 'png' and Image is None:
+            print(f"  Warning: Pillow is not installed, saving screenshots as PNG instead of {image_format}")
+            print("    pip install Pillow")
+            image_format = 'png'
+        if max_width and Image is None:
+            max_width = None
+        self.log_dir = log_dir
+        self.image_format = image_format
+        self.max_width = max_width
+        self.quality = quality
+        self.queue = queue.Queue(maxsize=QUEUE_SIZE)
+        self.seen = {}
+        self.issued = set()
+        self.lock = threading.Lock()
+        self.stats = {'written': 0, 'deduplicated': 0, 'dropped': 0, 'bytes_captured': 0, 'bytes_written': 0}
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def path_for(self, broker_name, stage):
+        """Unique file path for a screenshot (same naming scheme as before)"""
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        base = f"{broker_name.replace(' ', '_')}_{stage}_{timestamp}"
+        ext = EXTENSIONS[self.image_format]
+        with self.lock:
+            name = base + ext
+            counter = 1
+            while name in self.issued:
+                counter += 1
+                name = f"{base}_{counter}{ext}"
+            self.issued.add(name)
+        return self.log_dir / name
+
+    def submit(self, png_bytes, filepath):
+        """Queue a captured PNG for writing; never blocks the caller"""
+        try:
+            self.queue.put_nowait((png_bytes, filepath))
+            return True
+        except queue.Full:
+            self._count('dropped')
+            return False
+
+    def _count(self, key, amount=1):
+        # submit() runs on the browser threads, _write() on the writer thread
+        with self.lock:
+            self.stats[key] += amount
+
+    def _run(self):
+        while True:
+            item = self.queue.get()
+            if item is None:
+                self.queue.task_done()
+                break
+            png_bytes, filepath = item
+            try:
+                self._write(png_bytes, filepath)
+            except Exception as e:
+                print(f"  Warning: Could not save screenshot: {e}")
+            finally:
+                self.queue.task_done()
+
+    def _write(self, png_bytes, filepath):
+        self._count('bytes_captured', len(png_bytes))
+        digest = hashlib.sha1(png_bytes).hexdigest()
+        existing = self.seen.get(digest)
+        if existing is not None and os.path.exists(existing):
+            try:
+                os.link(existing, filepath)
+                self._count('deduplicated')
+                return
+            except OSError:
+                # No hard links here (e.g. FAT or a network share); write the frame out instead
+                pass
+
+        data = self._encode(png_bytes)
+        with open(filepath, 'wb') as f:
+            f.write(data)
+        self.seen[digest] = filepath
+        self._count('written')
+        self._count('bytes_written', len(data))
+
+    def _encode(self, png_bytes):
+        if Image is None or (self.image_format == 'png' and not self.max_width):
+            return png_bytes
+        image = Image.open(io.BytesIO(png_bytes))
+        if self.max_width and image.width > self.max_width:
+            height = round(image.height * self.max_width / image.width)
+            image = image.resize((self.max_width, height))
+        out = io.BytesIO()
+        if self.image_format == 'jpeg':
+            image.convert('RGB').save(out, 'JPEG', quality=self.quality, optimize=True)
+        elif self.image_format == 'webp':
+            image.save(out, 'WEBP', quality=self.quality, method=4)
+        else:
+            image.save(out, 'PNG', optimize=True)
+        return out.getvalue()
+
+    def flush(self):
+        """Wait until every queued screenshot is on disk"""
+        self.queue.join()
+
+    def close(self):
+        """Flush and stop the writer thread"""
+        if self.thread.is_alive():
+            self.queue.put(None)
+            self.thread.join()
+
+    def summary(self):
+        with self.lock:
+            stats = dict(self.stats)
+        saved = stats['bytes_captured'] - stats['bytes_written']
+        line = (f"Screenshots: {stats['written']} written, {stats['deduplicated']} duplicates linked, "
+                f"{saved / 1024 / 1024:.1f} MB saved")
+        if stats['dropped']:
+            line += f", {stats['dropped']} dropped (queue full)"
+        return line
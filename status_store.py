@@ -0,0 +1,220 @@
+#!/usr/bin/env python3
+"""
+Removal Status Store
+A persistent SQLite database of customers, brokers and removal requests, so
+follow-up questions ("which customers still have pending Radaris requests older
+than 45 days?") are an indexed query instead of a scan over every
+optout_results_*.json file.
+
+Usage:
+  python3 status_store.py pending [--broker NAME] [--days 45]
+  python3 status_store.py summary
+  python3 status_store.py import logs/optout_results_*.json
+"""
+
+import argparse
+import json
+import sqlite3
+import sys
+import threading
+from datetime import datetime, timedelta
+from pathlib import Path
+
+DEFAULT_DB = Path(__file__).parent / "logs" / "removal_status.db"
+FOLLOW_UP_DAYS = 45
+
+# Statuses that still need a broker to act or a person to confirm
+OPEN_STATUSES = ('pending', 'submitted', 'success', 'manual', 'relisted')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS customers (
+    id INTEGER PRIMARY KEY,
+    customer_key TEXT NOT NULL UNIQUE,
+    name TEXT,
+    email TEXT,
+    created_at TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS brokers (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE,
+    website TEXT,
+    opt_out_url TEXT,
+    method TEXT,
+    email TEXT
+);
+CREATE TABLE IF NOT EXISTS requests (
+    id INTEGER PRIMARY KEY,
+    customer_id INTEGER NOT NULL REFERENCES customers(id),
+    broker_id INTEGER NOT NULL REFERENCES brokers(id),
+    status TEXT NOT NULL,
+    message TEXT,
+    submitted_at TEXT,
+    confirmed_at TEXT,
+    updated_at TEXT NOT NULL,
+    screenshots TEXT,
+    UNIQUE (customer_id, broker_id)
+);
+CREATE INDEX IF NOT EXISTS idx_requests_broker_status_submitted
+    ON requests (broker_id, status, submitted_at);
+CREATE INDEX IF NOT EXISTS idx_requests_status_submitted
+    ON requests (status, submitted_at);
+"""
+
+class StatusStore:
+    def __init__(self, db_path=DEFAULT_DB):
+        db_path = Path(db_path)
+        db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.db_path = db_path
+        # Pool workers may share one store, so allow use across threads (guarded by self.lock)
+        self.conn = sqlite3.connect(str(db_path), check_same_thread=False, timeout=30)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+        self.lock = threading.RLock()
+        self._customer_ids = {}
+        self._broker_ids = {}
+
+    def _customer_id(self, customer_key, name=None, email=None):
+        customer_id = self._customer_ids.get(customer_key)
+        if customer_id is None:
+            self.conn.execute(
+                "INSERT INTO customers (customer_key, name, email, created_at) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT(customer_key) DO UPDATE SET name = COALESCE(excluded.name, name), "
+                "email = COALESCE(excluded.email, email)",
+                (customer_key, name, email, _now()))
+            customer_id = self.conn.execute(
+                "SELECT id FROM customers WHERE customer_key = ?", (customer_key,)).fetchone()[0]
+            self._customer_ids[customer_key] = customer_id
+        return customer_id
+
+    def _broker_id(self, broker):
+        name = broker if isinstance(broker, str) else broker['name']
+        broker_id = self._broker_ids.get(name)
+        if broker_id is None:
+            if isinstance(broker, str):
+                self.conn.execute("INSERT OR IGNORE INTO brokers (name) VALUES (?)", (name,))
+            else:
+                self.conn.execute(
+                    "INSERT INTO brokers (name, website, opt_out_url, method, email) VALUES (?, ?, ?, ?, ?) "
+                    "ON CONFLICT(name) DO UPDATE SET website = excluded.website, opt_out_url = excluded.opt_out_url, "
+                    "method = excluded.method, email = excluded.email",
+                    (name, broker.get('website'), broker.get('opt_out_url'), broker.get('method'), broker.get('email')))
+            broker_id = self.conn.execute("SELECT id FROM brokers WHERE name = ?", (name,)).fetchone()[0]
+            self._broker_ids[name] = broker_id
+        return broker_id
+
+    def record_checklist(self, customer_key, name, email, brokers):
+        """Register pending requests for every broker on a generated checklist
+        
+        Checklist requests count as submitted from the day the checklist was generated.
+        """
+        self.record_checklists([(customer_key, name, email)], brokers)
+
+    def record_checklists(self, customers, brokers):
+        """Register pending requests for many (customer_key, name, email) tuples in one transaction"""
+        with self.lock, self.conn:
+            broker_ids = [self._broker_id(broker) for broker in brokers]
+            now = _now()
+            for customer_key, name, email in customers:
+                customer_id = self._customer_id(customer_key, name, email)
+                self.conn.executemany(
+                    "INSERT OR IGNORE INTO requests (customer_id, broker_id, status, submitted_at, updated_at) "
+                    "VALUES (?, ?, 'pending', ?, ?)",
+                    [(customer_id, broker_id, now, now) for broker_id in broker_ids])
+
+    def record_results(self, results):
+        """Upsert automation results (the same dicts written to optout_results_*.json)"""
+        with self.lock, self.conn:
+            for result in results:
+                self._upsert_result(result)
+
+    def _upsert_result(self, result):
+        customer_id = self._customer_id(result.get('customer') or 'unknown')
+        broker_id = self._broker_id(result['broker'])
+        timestamp = result.get('timestamp') or _now()
+        submitted_at = timestamp if result['status'] == 'success' else None
+        screenshots = json.dumps(result['screenshots']) if result.get('screenshots') else None
+        self.conn.execute(
+            "INSERT INTO requests (customer_id, broker_id, status, message, submitted_at, updated_at, screenshots) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?) "
+            "ON CONFLICT(customer_id, broker_id) DO UPDATE SET status = excluded.status, "
+            "message = excluded.message, submitted_at = COALESCE(excluded.submitted_at, submitted_at), "
+            "updated_at = excluded.updated_at, screenshots = COALESCE(excluded.screenshots, screenshots)",
+            (customer_id, broker_id, result['status'], result.get('message'), submitted_at, timestamp, screenshots))
+
+    def request_statuses(self, customer_key):
+        """{broker name: status} for one customer's requests"""
+        with self.lock:
+            return dict(self.conn.execute(
+                "SELECT b.name, r.status FROM requests r JOIN customers c ON c.id = r.customer_id "
+                "JOIN brokers b ON b.id = r.broker_id WHERE c.customer_key = ?", (customer_key,)).fetchall())
+
+    def mark_confirmed(self, customer_key, broker_name, confirmed_at=None):
+        """Record that a broker confirmed the removal"""
+        with self.lock, self.conn:
+            self.conn.execute(
+                "UPDATE requests SET status = 'confirmed', confirmed_at = ?, updated_at = ? "
+                "WHERE customer_id = ? AND broker_id = ?",
+                (confirmed_at or _now(), _now(), self._customer_id(customer_key), self._broker_id(broker_name)))
+
+    def pending_older_than(self, days=FOLLOW_UP_DAYS, broker_name=None):
+        """Unconfirmed requests submitted more than `days` ago (the 45-day follow-up)"""
+        cutoff = (datetime.now() - timedelta(days=days)).isoformat()
+        placeholders = ", ".join("?" * len(OPEN_STATUSES))
+        query = ("SELECT c.customer_key, c.name, c.email, b.name, r.status, r.submitted_at "
+                 "FROM requests r JOIN customers c ON c.id = r.customer_id JOIN brokers b ON b.id = r.broker_id "
+                 f"WHERE r.status IN ({placeholders}) AND r.submitted_at < ?")
+        params = list(OPEN_STATUSES) + [cutoff]
+        if broker_name:
+            query += " AND r.broker_id = (SELECT id FROM brokers WHERE name = ?)"
+            params.append(broker_name)
+        query += " ORDER BY r.submitted_at"
+        with self.lock:
+            return self.conn.execute(query, params).fetchall()
+
+    def status_counts(self):
+        with self.lock:
+            return self.conn.execute(
+                "SELECT status, COUNT(*) FROM requests GROUP BY status ORDER BY COUNT(*) DESC").fetchall()
+
+    def close(self):
+        self.conn.close()
+
+def _now():
+    return datetime.now().isoformat()
+
+def main():
+    parser = argparse.ArgumentParser(description="Query the removal status database")
+    parser.add_argument('--db', default=str(DEFAULT_DB), help="Path to the SQLite database")
+    sub = parser.add_subparsers(dest='command', required=True)
+    pending = sub.add_parser('pending', help="Requests still awaiting confirmation")
+    pending.add_argument('--broker', help="Only this broker")
+    pending.add_argument('--days', type=int, default=FOLLOW_UP_DAYS, help="Submitted more than N days ago")
+    sub.add_parser('summary', help="Request counts by status")
+    importer = sub.add_parser('import', help="Load existing optout_results_*.json files")
+    importer.add_argument('files', nargs='+')
+    args = parser.parse_args()
+
+    store = StatusStore(args.db)
+    if args.command == 'pending':
+        rows = store.pending_older_than(args.days, args.broker)
+        print(f"\n{len(rows)} request(s) pending for more than {args.days} days\n")
+        for customer_key, name, email, broker, status, submitted_at in rows:
+            print(f"  {broker:<20} {customer_key:<24} {status:<10} submitted {submitted_at[:10]}")
+    elif args.command == 'summary':
+        print()
+        for status, count in store.status_counts():
+            print(f"  {status:<12} {count}")
+    elif args.command == 'import':
+        for path in args.files:
+            with open(path, 'r') as f:
+                store.record_results(json.load(f)['results'])
+            print(f"✓ Imported {path}")
+    print()
+    store.close()
+
+if __name__ == "__main__":
+    try:
+        main()
+    except KeyboardInterrupt:
+        sys.exit(0)
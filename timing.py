@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+"""
+Per-Stage Timing
+Records a span (name, start, duration) for every stage of every broker:
+driver.get, the readiness wait, field discovery, filling, screenshots, submit,
+confirmation and time spent waiting for the user. Spans are stored with each
+result in the results JSON, summarised as a time breakdown at the end of a run
+and can be exported as a Chrome trace (chrome://tracing, Perfetto) or as
+OTLP/JSON for OpenTelemetry tooling.
+
+Usage: python3 timing.py logs/optout_results_*.json [--trace trace.json] [--otlp spans.json]
+"""
+
+import argparse
+import json
+import os
+import time
+from contextlib import contextmanager
+
+# Spans named here are reported as one group in the breakdown
+STAGE_GROUPS = {
+    'driver.get': 'page loads',
+    'wait': 'readiness waits',
+    'block_resources': 'page loads',
+    'discover_fields': 'form filling',
+    'fill': 'form filling',
+    'screenshot': 'screenshots',
+    'user_wait': 'waiting for user',
+    'submit': 'submit/confirm',
+    'confirm': 'submit/confirm',
+    'defer': 'review queue',
+}
+
+class SpanRecorder:
+    """Collects the spans of the broker currently being processed
+
+    Span starts are seconds after the broker started; job_started_at is the
+    broker's wall-clock start, so spans from different runs can be combined.
+    """
+
+    def __init__(self):
+        self.spans = []
+        self.job_start = time.perf_counter()
+        self.job_started_at = time.time()
+
+    def reset(self):
+        """Start timing a new broker"""
+        self.spans = []
+        self.job_start = time.perf_counter()
+        self.job_started_at = time.time()
+
+    def finish(self, result):
+        """Attach the broker's spans, start time and total time to its result"""
+        result['job_started_at'] = round(self.job_started_at, 6)
+        result['job_time'] = round(time.perf_counter() - self.job_start, 6)
+        result['spans'] = self.spans
+        return result
+
+    @contextmanager
+    def span(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, start, time.perf_counter() - start)
+
+    def add(self, name, start, duration):
+        """Record a span from a perf_counter() start and a duration in seconds"""
+        self.spans.append({'name': name, 'start': round(start - self.job_start, 6), 'duration': round(duration, 6)})
+
+def stage_breakdown(results):
+    """Seconds per stage group across results, with unattributed time as 'other'"""
+    totals = {}
+    for result in results:
+        spans = result.get('spans') or []
+        covered = 0.0
+        for span in spans:
+            group = STAGE_GROUPS.get(span['name'], span['name'])
+            totals[group] = totals.get(group, 0.0) + span['duration']
+            covered += span['duration']
+        if 'job_time' in result:
+            totals['other'] = totals.get('other', 0.0) + max(result['job_time'] - covered, 0.0)
+    return totals
+
+def format_breakdown(totals):
+    """'41% readiness waits, 38% screenshots, ...' largest first"""
+    total = sum(totals.values())
+    if total <= 0:
+        return ""
+    parts = sorted(totals.items(), key=lambda item: item[1], reverse=True)
+    return ", ".join(f"{seconds / total:.0%} {group}" for group, seconds in parts if seconds / total >= 0.005)
+
+def _lanes(results):
+    """Track id per worker so parallel jobs render as parallel rows"""
+    lanes = {}
+    for result in results:
+        lanes.setdefault(result.get('worker', 0), len(lanes) + 1)
+    return lanes
+
+def chrome_trace(results):
+    """Trace-event JSON (one complete 'X' event per broker and per span)"""
+    lanes = _lanes(results)
+    origin = min((r['job_started_at'] for r in results if 'job_started_at' in r), default=0.0)
+    events = [{'name': 'thread_name', 'ph': 'M', 'pid': os.getpid(), 'tid': tid, 'args': {'name': f"worker {worker}"}}
+              for worker, tid in lanes.items()]
+    for result in results:
+        if 'job_started_at' not in result:
+            continue
+        tid = lanes[result.get('worker', 0)]
+        args = {'broker': result.get('broker'), 'customer': result.get('customer'), 'status': result.get('status')}
+        start = result['job_started_at'] - origin
+        events.append({'name': result.get('broker', 'broker'), 'cat': 'broker', 'ph': 'X', 'pid': os.getpid(),
+                       'tid': tid, 'ts': start * 1e6, 'dur': result['job_time'] * 1e6, 'args': args})
+        for span in result.get('spans') or []:
+            events.append({'name': span['name'], 'cat': 'stage', 'ph': 'X', 'pid': os.getpid(), 'tid': tid,
+                           'ts': (start + span['start']) * 1e6, 'dur': span['duration'] * 1e6, 'args': args})
+    return {'traceEvents': events, 'displayTimeUnit': 'ms'}
+
+def otlp_spans(results, service_name="data-broker-optout"):
+    """OTLP/JSON export (one trace per broker, stages as child spans)"""
+    def attrs(values):
+        return [{'key': key, 'value': {'stringValue': str(value)}} for key, value in values.items() if value is not None]
+
+    def unix_nano(seconds):
+        return str(int(seconds * 1e9))
+
+    spans = []
+    for result in results:
+        if 'job_started_at' not in result:
+            continue
+        job_start = result['job_started_at']
+        trace_id = os.urandom(16).hex()
+        root_id = os.urandom(8).hex()
+        common = {'broker': result.get('broker'), 'customer': result.get('customer')}
+        spans.append({'traceId': trace_id, 'spanId': root_id, 'name': f"optout {result.get('broker')}", 'kind': 1,
+                      'startTimeUnixNano': unix_nano(job_start),
+                      'endTimeUnixNano': unix_nano(job_start + result['job_time']),
+                      'attributes': attrs(dict(common, status=result.get('status')))})
+        for span in result.get('spans') or []:
+            spans.append({'traceId': trace_id, 'spanId': os.urandom(8).hex(), 'parentSpanId': root_id,
+                          'name': span['name'], 'kind': 1,
+                          'startTimeUnixNano': unix_nano(job_start + span['start']),
+                          'endTimeUnixNano': unix_nano(job_start + span['start'] + span['duration']),
+                          'attributes': attrs(common)})
+    return {'resourceSpans': [{
+        'resource': {'attributes': attrs({'service.name': service_name})},
+        'scopeSpans': [{'scope': {'name': 'timing'}, 'spans': spans}],
+    }]}
+
+def write_trace(results, path, trace_format='chrome'):
+    """Write results' spans as a Chrome trace or OTLP/JSON file"""
+    payload = otlp_spans(results) if trace_format == 'otlp' else chrome_trace(results)
+    with open(path, 'w') as f:
+        json.dump(payload, f)
+    return path
+
+def main():
+    parser = argparse.ArgumentParser(description="Time breakdown and trace export for saved results")
+    parser.add_argument('files', nargs='+', help="optout_results_*.json files")
+    parser.add_argument('--trace', metavar='FILE', help="Write a Chrome trace-event file")
+    parser.add_argument('--otlp', metavar='FILE', help="Write an OTLP/JSON span file")
+    args = parser.parse_args()
+
+    results = []
+    for path in args.files:
+        with open(path, 'r') as f:
+            results.extend(json.load(f)['results'])
+    totals = stage_breakdown(results)
+    print(f"\n{len(results)} result(s)")
+    for group, seconds in sorted(totals.items(), key=lambda item: item[1], reverse=True):
+        print(f"  {group:<20} {seconds:>9.1f}s")
+    print(f"\nTime breakdown: {format_breakdown(totals)}\n")
+    if args.trace:
+        print(f"✓ Chrome trace written to {write_trace(results, args.trace)}")
+    if args.otlp:
+        print(f"✓ OTLP spans written to {write_trace(results, args.otlp, 'otlp')}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,737 @@
+#!/usr/bin/env python3
+"""
+Distributed Work Queue
+Spreads a roster's opt-out jobs over several machines. Each (customer, broker)
+pair becomes a task (customer_id, broker_name, recipe_version) in a shared
+queue. Worker nodes claim tasks under a lease, keep it alive with heartbeats
+while the browser works, and report each result back:
+
+- The queue is a SQLite database (WAL mode). Processes on one machine can open
+  it directly. Other machines reach it through `work_queue.py serve`, a small
+  HTTP front end, because SQLite locking is not safe over network filesystems.
+- A claim leases a task for --lease seconds. A node that dies stops sending
+  heartbeats, its leases expire and another node claims the task again. A
+  result from a node whose lease was taken over is refused, so every task is
+  finished exactly once. A task whose lease expires --max-attempts times is
+  dead-lettered.
+- A task that errors is released with exponential backoff and retried, up to
+  --max-attempts. A node whose copy of a broker's recipe differs from the
+  queued recipe_version hands the task back for an up-to-date node.
+- Enqueuing is idempotent: a pair that is already queued (or done) is not
+  added again.
+
+The server speaks plain HTTP and hands out full customer records, so it
+listens on 127.0.0.1 by default and every request must carry the shared token
+(--token or $OPTOUT_QUEUE_TOKEN; serve prints a new one if neither is set).
+Reach it from other machines through an SSH tunnel, or put it behind a
+TLS-terminating proxy and use an https:// queue URL. Never expose the port
+itself on an untrusted network.
+
+Usage:
+  export OPTOUT_QUEUE_TOKEN=...                             # the same secret on every machine
+  python3 work_queue.py enqueue --roster roster.csv [--queue logs/work_queue.db]
+  python3 work_queue.py serve --port 8700                   # on the queue host
+  ssh -N -L 8700:127.0.0.1:8700 queue-host &                # on each node
+  python3 work_queue.py work --queue http://127.0.0.1:8700 --workers 4
+  python3 work_queue.py status --queue http://127.0.0.1:8700
+  python3 work_queue.py collect                             # results file + status database
+
+Each node applies its own --broker-rate limit and circuit breakers, not a
+cluster-wide one: a task this node may not run yet goes back to the queue for
+the others, and a broker this node gave up on is left for another node.
+benchmark_distributed.py runs the whole setup on one machine.
+"""
+
+import argparse
+import hashlib
+import hmac
+import itertools
+import json
+import os
+import platform
+import secrets
+import socket
+import sqlite3
+import threading
+import time
+import urllib.request
+import uuid
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+from circuit_breaker import (DEFAULT_COOLDOWN, DEFAULT_MAX_TRIPS, DEFAULT_RETRIES, DEFAULT_THRESHOLD, CircuitBreakers,
+                             is_failure)
+from rate_limit import DomainLimiter, backoff_delay
+from results_journal import customer_key
+from scheduler import (DEFAULT_BROKER_RATE, PRIORITY_NEW, PRIORITY_RETRY, Job, broker_domain, broker_rates,
+                       parse_broker_rate)
+
+DEFAULT_QUEUE = Path(__file__).parent / "logs" / "work_queue.db"
+DEFAULT_PORT = 8700
+DEFAULT_HOST = '127.0.0.1'
+# Shared secret between a QueueServer and its clients
+TOKEN_ENV = 'OPTOUT_QUEUE_TOKEN'
+DEFAULT_LEASE = 300.0
+DEFAULT_MAX_ATTEMPTS = 3
+DEFAULT_POLL = 2.0
+# Customers per /enqueue request
+ENQUEUE_BATCH = 500
+# How long a node with a different recipe leaves a task for other nodes
+MISMATCH_DELAY = 60.0
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS customers (
+    customer_id TEXT PRIMARY KEY,
+    data TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS tasks (
+    id INTEGER PRIMARY KEY,
+    customer_id TEXT NOT NULL REFERENCES customers(customer_id),
+    broker_name TEXT NOT NULL,
+    recipe_version TEXT NOT NULL,
+    state TEXT NOT NULL DEFAULT 'queued',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    not_before REAL NOT NULL DEFAULT 0,
+    lease_owner TEXT,
+    lease_expires REAL,
+    enqueued_at REAL NOT NULL,
+    finished_at REAL,
+    last_error TEXT,
+    result TEXT,
+    UNIQUE (customer_id, broker_name)
+);
+CREATE INDEX IF NOT EXISTS idx_tasks_state_not_before ON tasks (state, not_before);
+CREATE INDEX IF NOT EXISTS idx_tasks_state_lease ON tasks (state, lease_expires);
+"""
+
+def recipe_version(broker):
+    """Short hash of a broker's recipe ('generic' for brokers without one)"""
+    recipe = broker.get('recipe')
+    if not recipe:
+        return 'generic'
+    return hashlib.sha256(json.dumps(recipe, sort_keys=True).encode('utf-8')).hexdigest()[:12]
+
+def task_pairs(customers, brokers):
+    """(customer, broker) pairs to enqueue, honouring each customer's only_brokers"""
+    for customer in customers:
+        only = customer.get('only_brokers')
+        for broker in brokers:
+            if only is None or broker['name'] in only:
+                yield customer, broker
+
+class SQLiteWorkQueue:
+    """The task queue itself; safe to share between threads and between processes on one host"""
+
+    def __init__(self, db_path=DEFAULT_QUEUE, max_attempts=DEFAULT_MAX_ATTEMPTS, clock=time.time):
+        db_path = Path(db_path)
+        db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.db_path = db_path
+        # Leases that expire this many times dead-letter the task
+        self.max_attempts = max_attempts
+        # Lease times come from this clock; over HTTP that is the queue host's clock
+        self.clock = clock
+        self.conn = sqlite3.connect(str(db_path), check_same_thread=False, timeout=30, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+        self.lock = threading.RLock()
+        self.stats = {'claimed': 0, 'reclaimed': 0, 'completed': 0, 'released': 0, 'refused': 0, 'dead': 0}
+
+    def enqueue(self, customers, brokers):
+        """Add a task per (customer, broker) pair; returns how many were new"""
+        now = self.clock()
+        added = 0
+        with self.lock:
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                for customer, broker in task_pairs(customers, brokers):
+                    key = customer_key(customer)
+                    self.conn.execute("INSERT OR REPLACE INTO customers (customer_id, data) VALUES (?, ?)",
+                                      (key, json.dumps(customer)))
+                    added += self.conn.execute(
+                        "INSERT OR IGNORE INTO tasks (customer_id, broker_name, recipe_version, enqueued_at) "
+                        "VALUES (?, ?, ?, ?)", (key, broker['name'], recipe_version(broker), now)).rowcount
+                self.conn.execute("COMMIT")
+            except BaseException:
+                self.conn.execute("ROLLBACK")
+                raise
+        return added
+
+    def claim(self, worker, lease=DEFAULT_LEASE, limit=1):
+        """Lease up to `limit` runnable tasks to `worker`; returns them with their customer record"""
+        now = self.clock()
+        with self.lock:
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                dead = self.conn.execute(
+                    "UPDATE tasks SET state = 'dead', finished_at = ?, lease_owner = NULL, "
+                    "last_error = 'Lease expired ' || attempts || ' time(s) without a result' "
+                    "WHERE state = 'leased' AND lease_expires <= ? AND attempts >= ?",
+                    (now, now, self.max_attempts)).rowcount
+                # Tasks abandoned by a dead node first, then the queue in order; both walk an index
+                rows = self.conn.execute(
+                    "SELECT id, state FROM tasks WHERE state = 'leased' AND lease_expires <= ? "
+                    "ORDER BY lease_expires LIMIT ?", (now, limit)).fetchall()
+                if len(rows) < limit:
+                    rows += self.conn.execute(
+                        "SELECT id, state FROM tasks WHERE state = 'queued' AND not_before <= ? "
+                        "ORDER BY not_before, id LIMIT ?", (now, limit - len(rows))).fetchall()
+                self.conn.executemany(
+                    "UPDATE tasks SET state = 'leased', lease_owner = ?, lease_expires = ?, attempts = attempts + 1 "
+                    "WHERE id = ?", [(worker, now + lease, task_id) for task_id, _ in rows])
+                tasks = [self._task(task_id) for task_id, _ in rows]
+                self.conn.execute("COMMIT")
+            except BaseException:
+                self.conn.execute("ROLLBACK")
+                raise
+            self.stats['dead'] += dead
+            self.stats['claimed'] += len(rows)
+            self.stats['reclaimed'] += sum(1 for _, state in rows if state == 'leased')
+        return tasks
+
+    def _task(self, task_id):
+        row = self.conn.execute(
+            "SELECT t.id, t.customer_id, t.broker_name, t.recipe_version, t.attempts, c.data "
+            "FROM tasks t JOIN customers c ON c.customer_id = t.customer_id WHERE t.id = ?", (task_id,)).fetchone()
+        return {'id': row[0], 'customer_id': row[1], 'broker_name': row[2], 'recipe_version': row[3],
+                'attempts': row[4], 'customer': json.loads(row[5])}
+
+    def heartbeat(self, worker, task_ids, lease=DEFAULT_LEASE):
+        """Extend `worker`'s leases; returns the ids it still holds (the rest were taken over)"""
+        now = self.clock()
+        held = []
+        with self.lock:
+            for task_id in task_ids:
+                if self.conn.execute(
+                        "UPDATE tasks SET lease_expires = ? WHERE id = ? AND state = 'leased' AND lease_owner = ?",
+                        (now + lease, task_id, worker)).rowcount:
+                    held.append(task_id)
+        return held
+
+    def complete(self, worker, task_id, result):
+        """Store a task's result; False if `worker` no longer holds its lease"""
+        with self.lock:
+            done = self.conn.execute(
+                "UPDATE tasks SET state = 'done', result = ?, finished_at = ?, lease_owner = NULL "
+                "WHERE id = ? AND state = 'leased' AND lease_owner = ?",
+                (json.dumps(result), self.clock(), task_id, worker)).rowcount
+            self.stats['completed' if done else 'refused'] += 1
+        return bool(done)
+
+    def release(self, worker, task_id, delay=0.0, error=None, refund=False):
+        """Hand a leased task back to the queue, runnable again after `delay` seconds
+
+        refund gives back the claim's attempt, for tasks handed back without being run.
+        """
+        with self.lock:
+            released = self.conn.execute(
+                "UPDATE tasks SET state = 'queued', not_before = ?, lease_owner = NULL, lease_expires = NULL, "
+                "attempts = attempts - ?, last_error = COALESCE(?, last_error) "
+                "WHERE id = ? AND state = 'leased' AND lease_owner = ?",
+                (self.clock() + delay, 1 if refund else 0, error, task_id, worker)).rowcount
+            self.stats['released' if released else 'refused'] += 1
+        return bool(released)
+
+    def counts(self):
+        """{state: tasks} for queued, leased, done and dead"""
+        with self.lock:
+            return dict(self.conn.execute("SELECT state, COUNT(*) FROM tasks GROUP BY state").fetchall())
+
+    def results(self):
+        """Every finished task's result; dead-lettered tasks come back as errors"""
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT customer_id, broker_name, state, attempts, finished_at, last_error, result FROM tasks "
+                "WHERE state IN ('done', 'dead') ORDER BY id").fetchall()
+        results = []
+        for customer, broker, state, attempts, finished_at, last_error, result in rows:
+            if state == 'done':
+                result = json.loads(result)
+            else:
+                result = {'status': 'error', 'message': f"Dead-lettered: {last_error}"}
+            result.setdefault('broker', broker)
+            result.setdefault('customer', customer)
+            result.setdefault('attempts', attempts)
+            result.setdefault('timestamp', datetime.fromtimestamp(finished_at).isoformat())
+            results.append(result)
+        return results
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+class QueueRequestHandler(BaseHTTPRequestHandler):
+    """JSON-over-HTTP access to a SQLiteWorkQueue: POST /<method> with the method's arguments
+
+    Every request needs "Authorization: Bearer <token>" with the server's token.
+    """
+    protocol_version = "HTTP/1.1"
+
+    METHODS = ('enqueue', 'claim', 'heartbeat', 'complete', 'release')
+
+    def _authorized(self):
+        supplied = self.headers.get('Authorization', '').encode('utf-8')
+        if hmac.compare_digest(supplied, f"Bearer {self.server.token}".encode('utf-8')):
+            return True
+        # The request body was not read, so the connection cannot carry another request
+        self.close_connection = True
+        self._send(401, {'error': "missing or wrong queue token"})
+        return False
+
+    def do_GET(self):
+        if not self._authorized():
+            return
+        queue = self.server.queue
+        if self.path == '/counts':
+            self._send(200, queue.counts())
+        elif self.path == '/stats':
+            self._send(200, dict(queue.stats))
+        elif self.path == '/results':
+            self._send(200, queue.results())
+        else:
+            self._send(404, {'error': f"unknown path {self.path}"})
+
+    def do_POST(self):
+        if not self._authorized():
+            return
+        name = self.path.strip('/')
+        if name not in self.METHODS:
+            self._send(404, {'error': f"unknown method {name}"})
+            return
+        length = int(self.headers.get('Content-Length', 0))
+        try:
+            args = json.loads(self.rfile.read(length) or b'{}')
+            self._send(200, getattr(self.server.queue, name)(**args))
+        except (TypeError, ValueError, sqlite3.Error) as e:
+            self._send(400, {'error': str(e)})
+
+    def _send(self, status, payload):
+        data = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+class _QueueHTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+class QueueServer:
+    """Serves a SQLiteWorkQueue to other machines; usable as a context manager
+
+    Clients must send `token`; a random one is made (see .token) if none is given.
+    """
+
+    def __init__(self, queue, host=DEFAULT_HOST, port=DEFAULT_PORT, token=None):
+        self.queue = queue
+        self.token = token or secrets.token_urlsafe(32)
+        self.httpd = _QueueHTTPServer((host, port), QueueRequestHandler)
+        self.httpd.disable_nagle_algorithm = True
+        self.httpd.queue = queue
+        self.httpd.token = self.token
+        self.thread = None
+
+    @property
+    def url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{'127.0.0.1' if host == '0.0.0.0' else host}:{port}"
+
+    def start(self):
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+class HTTPWorkQueue:
+    """Client for a QueueServer with the same methods as SQLiteWorkQueue"""
+
+    def __init__(self, url, token=None, timeout=30):
+        self.url = url.rstrip('/')
+        self.token = token or os.environ.get(TOKEN_ENV, '')
+        self.timeout = timeout
+
+    def _call(self, path, payload=None):
+        data = json.dumps(payload).encode('utf-8') if payload is not None else None
+        request = urllib.request.Request(self.url + path, data=data, headers={
+            'Content-Type': 'application/json', 'Authorization': f"Bearer {self.token}"})
+        with urllib.request.urlopen(request, timeout=self.timeout) as response:
+            return json.loads(response.read())
+
+    def enqueue(self, customers, brokers, batch=ENQUEUE_BATCH):
+        # Only the fields enqueue reads travel over the wire
+        brokers = [{'name': broker['name'], 'recipe': broker.get('recipe')} for broker in brokers]
+        added = 0
+        customers = iter(customers)
+        while True:
+            chunk = list(itertools.islice(customers, batch))
+            if not chunk:
+                return added
+            added += self._call('/enqueue', {'customers': chunk, 'brokers': brokers})
+
+    def claim(self, worker, lease=DEFAULT_LEASE, limit=1):
+        return self._call('/claim', {'worker': worker, 'lease': lease, 'limit': limit})
+
+    def heartbeat(self, worker, task_ids, lease=DEFAULT_LEASE):
+        return self._call('/heartbeat', {'worker': worker, 'task_ids': list(task_ids), 'lease': lease})
+
+    def complete(self, worker, task_id, result):
+        return self._call('/complete', {'worker': worker, 'task_id': task_id, 'result': result})
+
+    def release(self, worker, task_id, delay=0.0, error=None, refund=False):
+        return self._call('/release', {'worker': worker, 'task_id': task_id, 'delay': delay, 'error': error,
+                                       'refund': refund})
+
+    def counts(self):
+        return self._call('/counts')
+
+    @property
+    def stats(self):
+        return self._call('/stats')
+
+    def results(self):
+        return self._call('/results')
+
+    def close(self):
+        pass
+
+def open_queue(spec=None, max_attempts=DEFAULT_MAX_ATTEMPTS, token=None):
+    """An http(s):// URL opens a QueueServer client; anything else is a SQLite queue file"""
+    spec = str(spec or DEFAULT_QUEUE)
+    if spec.startswith(('http://', 'https://')):
+        return HTTPWorkQueue(spec, token)
+    return SQLiteWorkQueue(spec, max_attempts)
+
+class QueueJob(Job):
+    """A Job leased from the work queue"""
+    __slots__ = ('task_id',)
+
+class QueueScheduler:
+    """Feeds an OptOutWorkerPool from a work queue instead of a local JobScheduler
+
+    get() claims a task and blocks while other nodes still hold leases (their
+    tasks may come back if a node dies); done() reports the result or releases
+    a failed task for a retry. A heartbeat thread keeps this node's leases alive.
+
+    A claimed task whose domain is over this node's rate limit, or whose broker's
+    breaker is open, is handed back to run later instead of holding a worker.
+    """
+
+    def __init__(self, queue, brokers, node_id=None, lease=DEFAULT_LEASE, max_attempts=DEFAULT_MAX_ATTEMPTS,
+                 poll=DEFAULT_POLL, backoff_base=5.0, backoff_cap=120.0, follow=False, rate=None, breakers=None):
+        self.queue = queue
+        self.brokers = brokers
+        self.versions = {broker['name']: recipe_version(broker) for broker in brokers}
+        self.node_id = node_id or f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.lease = lease
+        self.max_attempts = max_attempts
+        self.poll = poll
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+        # Keep waiting for new tasks once the queue is empty
+        self.follow = follow
+        self.held = {}
+        # Tasks this node handed back because its recipe differs; other nodes may run them
+        self.passed = set()
+        # Brokers whose breaker gave up on this node
+        self.given_up = set()
+        self.lock = threading.Lock()
+        self.stopping = threading.Event()
+        self.heartbeats = None
+        self.started = time.monotonic()
+        self.stats = {'claimed': 0, 'completed': 0, 'retried': 0, 'mismatched': 0, 'lost': 0, 'heartbeats': 0,
+                      'throttled': 0, 'parked': 0, 'gave_up': 0}
+        # rate is jobs per second per domain on this node; None means no limit
+        self.limiter = DomainLimiter(rate, overrides=broker_rates(brokers)) if rate else None
+        # Optional CircuitBreakers; with them their retry policy replaces backoff_base/backoff_cap
+        self.breakers = breakers
+
+    def _start_heartbeats(self):
+        with self.lock:
+            if self.heartbeats is None:
+                self.heartbeats = threading.Thread(target=self._heartbeat_loop, daemon=True)
+                self.heartbeats.start()
+
+    def _heartbeat_loop(self):
+        while not self.stopping.wait(self.lease / 3):
+            with self.lock:
+                task_ids = list(self.held)
+            if not task_ids:
+                continue
+            try:
+                kept = set(self.queue.heartbeat(self.node_id, task_ids, self.lease))
+            except OSError as e:
+                print(f"  Warning: Heartbeat to the work queue failed: {e}")
+                continue
+            with self.lock:
+                self.stats['heartbeats'] += 1
+                for task_id in task_ids:
+                    if task_id not in kept and self.held.pop(task_id, None) is not None:
+                        self.stats['lost'] += 1
+
+    def get(self):
+        """Block until a task is leased to this node; None once the queue has nothing left to run"""
+        self._start_heartbeats()
+        while not self.stopping.is_set():
+            tasks = self.queue.claim(self.node_id, self.lease)
+            if tasks:
+                job = self._job(tasks[0])
+                if job is not None:
+                    return job
+                continue
+            counts = self.queue.counts()
+            if not self.follow and counts.get('queued', 0) <= len(self.passed) and not counts.get('leased'):
+                return None
+            time.sleep(self.poll)
+        return None
+
+    def _job(self, task):
+        broker = self.brokers.get(task['broker_name'])
+        if broker is None:
+            self.queue.complete(self.node_id, task['id'], {
+                'status': 'error', 'message': f"Unknown broker on node {self.node_id}"})
+            return None
+        if self.versions[broker['name']] != task['recipe_version']:
+            message = (f"Recipe version {self.versions[broker['name']]} on {self.node_id}, "
+                       f"queued {task['recipe_version']}")
+            with self.lock:
+                self.stats['mismatched'] += 1
+                first = task['id'] not in self.passed
+                self.passed.add(task['id'])
+            if first:
+                print(f"  Warning: {broker['name']}: {message}; leaving the task for another node")
+            self.queue.release(self.node_id, task['id'], MISMATCH_DELAY, message, refund=True)
+            return None
+        job = QueueJob(task['customer'], broker, broker_domain(broker), PRIORITY_NEW, task['id'], time.monotonic())
+        job.task_id = task['id']
+        job.attempts = task['attempts']
+        wait = self._wait(job)
+        if wait is None:
+            with self.lock:
+                self.stats['gave_up'] += 1
+                self.passed.add(task['id'])
+                first = broker['name'] not in self.given_up
+                self.given_up.add(broker['name'])
+            if first:
+                print(f"  Warning: {broker['name']}: circuit breaker gave up on {self.node_id}; "
+                      f"leaving the task for another node")
+            self.queue.release(self.node_id, task['id'], MISMATCH_DELAY, refund=True)
+            return None
+        if wait > 0:
+            self.queue.release(self.node_id, task['id'], wait, refund=True)
+            return None
+        with self.lock:
+            self.held[job.task_id] = job
+            self.stats['claimed'] += 1
+        return job
+
+    def _wait(self, job):
+        """Seconds before this node may run `job` (0 if it may now), or None once its breaker gave up"""
+        with self.lock:
+            if self.limiter and self.limiter.delay(job.domain) > 0:
+                self.stats['throttled'] += 1
+                return self.limiter.delay(job.domain)
+            # Checked after the limiter so a half-open probe is only admitted when it will run
+            wait = self.breakers.wait(job.broker['name']) if self.breakers else 0.0
+            if wait is None:
+                return None
+            if wait > 0:
+                self.stats['parked'] += 1
+                return wait
+            if self.limiter:
+                self.limiter.try_acquire(job.domain)
+            return 0.0
+
+    def _retry_delay(self, attempts):
+        if self.breakers is not None:
+            return self.breakers.retry_delay(attempts)
+        return backoff_delay(attempts, self.backoff_base, self.backoff_cap)
+
+    def done(self, job, result=None):
+        """Report a finished job; returns True if it failed and was released to retry"""
+        with self.lock:
+            if self.held.pop(job.task_id, None) is None:
+                # The lease was lost to another node, which will report this task
+                return False
+        if result is None:
+            if self.breakers is not None:
+                self.breakers.release(job.broker['name'])
+            self.queue.release(self.node_id, job.task_id)
+            return False
+        if self.breakers is not None:
+            self.breakers.record(job.broker['name'], result)
+        delay = self._retry_delay(job.attempts) if is_failure(result) and job.attempts < self.max_attempts else None
+        if delay is not None:
+            if self.queue.release(self.node_id, job.task_id, delay, result.get('message')):
+                with self.lock:
+                    self.stats['retried'] += 1
+                return True
+            return False
+        result = dict(result, node=self.node_id, attempts=job.attempts, broker=job.broker['name'],
+                      customer=customer_key(job.customer), timestamp=datetime.now().isoformat())
+        if self.queue.complete(self.node_id, job.task_id, result):
+            with self.lock:
+                self.stats['completed'] += 1
+        else:
+            with self.lock:
+                self.stats['lost'] += 1
+        return False
+
+    def requeue(self, job, priority=PRIORITY_RETRY, delay=0.0):
+        """Hand a job back without running it (e.g. this node could not start a browser)"""
+        with self.lock:
+            self.held.pop(job.task_id, None)
+        if self.breakers is not None:
+            self.breakers.release(job.broker['name'])
+        self.queue.release(self.node_id, job.task_id, delay, refund=True)
+
+    def drain(self):
+        """Nothing to drain: unclaimed tasks stay queued for other nodes"""
+        return []
+
+    def close(self):
+        self.stopping.set()
+        if self.heartbeats is not None:
+            self.heartbeats.join()
+
+    def summary(self):
+        elapsed = time.monotonic() - self.started
+        throughput = self.stats['completed'] / elapsed * 3600 if elapsed > 0 else 0
+        return (f"Node {self.node_id}: {self.stats['completed']} task(s) done, {throughput:.0f} tasks/hour; "
+                f"{self.stats['retried']} released to retry, {self.stats['mismatched']} recipe mismatch(es), "
+                f"{self.stats['lost']} lease(s) lost; {self.stats['throttled']} throttled, "
+                f"{self.stats['parked']} parked, {self.stats['gave_up']} left after the breaker gave up")
+
+def run_node(queue, tool_class, workers=4, tool_options=None, lease=DEFAULT_LEASE,
+             max_attempts=DEFAULT_MAX_ATTEMPTS, node_id=None, follow=False, poll=DEFAULT_POLL, broker_rate=None,
+             breakers=None):
+    """Work through a queue with `workers` browsers on this machine; returns this node's results"""
+    from optout_pool import OptOutWorkerPool
+
+    brokers = tool_class(headless=True, interactive=False, **(tool_options or {})).brokers
+    scheduler = QueueScheduler(queue, brokers, node_id, lease, max_attempts, poll, follow=follow,
+                               rate=broker_rate, breakers=breakers)
+    pool = OptOutWorkerPool(tool_class, workers=workers, headless=True, tool_options=tool_options,
+                            scheduler=scheduler)
+    print(f"Node {pool.scheduler.node_id}: {pool.workers} worker(s), lease {lease:.0f}s")
+    try:
+        results = pool.run()
+    finally:
+        pool.scheduler.close()
+    print(pool.driver_pool.summary())
+    print(pool.scheduler.summary())
+    if breakers is not None:
+        print(breakers.summary())
+    return results
+
+def collect(queue, log_dir, status_store=None):
+    """Write every finished task's result to one optout_results file; returns the results"""
+    results = queue.results()
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    results_file = Path(log_dir) / f"optout_results_{timestamp}.json"
+    with open(results_file, 'w') as f:
+        json.dump({'timestamp': timestamp, 'total_processed': len(results), 'results': results}, f, indent=2)
+    print(f"✓ {len(results)} result(s) saved to: {results_file}")
+    if status_store:
+        status_store.record_results(results)
+        print(f"✓ Status database updated: {status_store.db_path}")
+    return results
+
+def print_counts(queue):
+    counts = queue.counts()
+    print("Tasks: " + ", ".join(f"{state} {counts.get(state, 0)}" for state in ('queued', 'leased', 'done', 'dead')))
+    if isinstance(queue, HTTPWorkQueue):
+        # A server's counters cover every node since it started; a local file has none to show
+        print("Queue: " + ", ".join(f"{key} {value}" for key, value in queue.stats.items()))
+
+def main():
+    from broker_registry import load_registry
+
+    parser = argparse.ArgumentParser(description="Run opt-out jobs from a shared work queue on several machines")
+    parser.add_argument('command', choices=('enqueue', 'serve', 'work', 'status', 'collect'))
+    parser.add_argument('--queue', default=str(DEFAULT_QUEUE),
+                        help=f"SQLite queue file or http://host:port of a queue server (default: {DEFAULT_QUEUE})")
+    parser.add_argument('--roster', metavar='FILE', help="CSV or JSONL roster to enqueue")
+    parser.add_argument('--host', default=DEFAULT_HOST,
+                        help=f"Address for serve (default: {DEFAULT_HOST}; reach it over SSH or a TLS proxy)")
+    parser.add_argument('--token', default=os.environ.get(TOKEN_ENV),
+                        help=f"Shared secret between serve and its clients (default: ${TOKEN_ENV})")
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT, help=f"Port for serve (default: {DEFAULT_PORT})")
+    parser.add_argument('--workers', type=int, default=4, help="Headless browsers on this node (default: 4)")
+    parser.add_argument('--lease', type=float, default=DEFAULT_LEASE,
+                        help=f"Seconds a claimed task stays leased without a heartbeat (default: {DEFAULT_LEASE:.0f})")
+    parser.add_argument('--max-attempts', type=int, default=DEFAULT_MAX_ATTEMPTS,
+                        help=f"Attempts before a task is given up (default: {DEFAULT_MAX_ATTEMPTS})")
+    parser.add_argument('--follow', action='store_true', help="work: keep waiting for tasks once the queue is empty")
+    parser.add_argument('--broker-rate', default=DEFAULT_BROKER_RATE,
+                        help=f"work: jobs per broker domain on this node, or 'none' (default: {DEFAULT_BROKER_RATE})")
+    parser.add_argument('--retries', type=int, default=DEFAULT_RETRIES,
+                        help=f"work: retries for a broker that errors, with backoff (default: {DEFAULT_RETRIES})")
+    parser.add_argument('--breaker-threshold', type=int, default=DEFAULT_THRESHOLD,
+                        help=f"work: park a broker after this many errors in a row, 0 to never (default: {DEFAULT_THRESHOLD})")
+    parser.add_argument('--breaker-cooldown', type=float, default=DEFAULT_COOLDOWN,
+                        help=f"work: seconds a tripped broker is parked (default: {DEFAULT_COOLDOWN:.0f})")
+    parser.add_argument('--breaker-max-trips', type=int, default=DEFAULT_MAX_TRIPS,
+                        help=f"work: leave a broker to other nodes after this many trips (default: {DEFAULT_MAX_TRIPS})")
+    args = parser.parse_args()
+    try:
+        broker_rate = parse_broker_rate(args.broker_rate)
+    except ValueError as e:
+        parser.error(str(e))
+
+    if args.command == 'serve':
+        if args.queue.startswith(('http://', 'https://')):
+            parser.error("serve needs a SQLite queue file")
+        server = QueueServer(SQLiteWorkQueue(args.queue, args.max_attempts), args.host, args.port, args.token)
+        print(f"Serving {args.queue} at {server.url} (Ctrl-C to stop)")
+        if not args.token:
+            print(f"Queue token (set {TOKEN_ENV} to this on every node): {server.token}")
+        try:
+            server.httpd.serve_forever()
+        except KeyboardInterrupt:
+            server.stop()
+        return
+
+    queue = open_queue(args.queue, args.max_attempts, args.token)
+    if args.command == 'enqueue':
+        if not args.roster:
+            parser.error("enqueue needs --roster")
+        from remove_data import load_roster
+        brokers = load_registry(Path(__file__).parent / "data_brokers.json")
+        added = queue.enqueue(load_roster(args.roster), brokers)
+        print(f"✓ Enqueued {added} new task(s)")
+        print_counts(queue)
+    elif args.command == 'work':
+        if platform.system() == "Windows":
+            from auto_optout_windows import AutoOptOutTool
+        else:
+            from auto_optout import AutoOptOutTool
+        from review_queue import ReviewQueue
+        log_dir = Path(__file__).parent / "logs"
+        breakers = CircuitBreakers(args.retries, args.breaker_threshold, args.breaker_cooldown,
+                                   max_trips=args.breaker_max_trips)
+        run_node(queue, AutoOptOutTool, args.workers, {'review_queue': ReviewQueue(log_dir)}, args.lease,
+                 args.max_attempts, follow=args.follow, broker_rate=broker_rate, breakers=breakers)
+    elif args.command == 'status':
+        print_counts(queue)
+    elif args.command == 'collect':
+        from status_store import StatusStore
+        log_dir = Path(__file__).parent / "logs"
+        log_dir.mkdir(exist_ok=True)
+        collect(queue, log_dir, StatusStore())
+    queue.close()
+
+if __name__ == "__main__":
+    main()